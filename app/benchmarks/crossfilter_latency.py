@@ -0,0 +1,70 @@
+"""
+Measures the server time of rendering a filtered Analysis tab, as when the year slider is dragged.
+
+The processed incidents are stacked --repeat times. For every tab, the figure cache is cleared and
+the tab is rendered for a few year ranges, and the fastest render is reported together with the
+time the query engine alone spends selecting and aggregating the rows.
+
+Usage:
+    python crossfilter_latency.py [--repeat N] [--runs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import app  # noqa: E402,F401  Registers the pages.
+from pages import analysis  # noqa: E402
+from pages.aggregates import group_totals  # noqa: E402
+from pages.bitmap_index import build_index  # noqa: E402
+from pages.crossfilter import select_rows  # noqa: E402
+from pages.datastore import get_dataset, PROCESSED_DATA  # noqa: E402
+from pages.figure_cache import FIGURE_CACHE  # noqa: E402
+
+FILTERS = {'Region': ['Europe'], 'Crash cause': ['Human factor', 'Weather']}
+
+
+def stacked_rows(repeat):
+    """Returns the processed incidents stacked repeat times, keeping their categorical dtypes."""
+    rows = get_dataset(PROCESSED_DATA)
+    stacked = pd.concat([rows] * repeat, ignore_index=True)
+    return stacked.astype({column: rows[column].dtype for column in rows.columns})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='Copies of the processed incidents stacked together.')
+    parser.add_argument('--runs', type=int, default=5, help='Number of year ranges rendered per tab.')
+    args = parser.parse_args()
+
+    rows = stacked_rows(args.repeat)
+    start = time.perf_counter()
+    index = build_index(rows, f'stacked-{args.repeat}')
+    print(f'{len(rows)} rows, index built in {(time.perf_counter() - start) * 1000:.0f} ms')
+    analysis.dataset_index = lambda filename=PROCESSED_DATA: index
+
+    engine = []
+    for first in range(1950, 1950 + args.runs):
+        start = time.perf_counter()
+        selection = select_rows(index, {**FILTERS, 'Year': [first, 1990]})
+        for dimensions in (['Year'], ['Season'], ['Crash cause', 'Season']):
+            group_totals(selection, dimensions)
+        engine.append(time.perf_counter() - start)
+    print(f'query engine, 3 groupings: {min(engine) * 1000:.1f} ms')
+
+    for tab, label in analysis.ANALYSIS_TABS.items():
+        renders = []
+        for first in range(1950, 1950 + args.runs):
+            FIGURE_CACHE.clear()
+            start = time.perf_counter()
+            analysis.tab_layout(tab, {**FILTERS, 'Year': [first, 1990]})
+            renders.append(time.perf_counter() - start)
+        print(f'{label:>9}: {min(renders) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Reports the bytes each Analysis figure adds to a callback response, verbose and compact.
+
+The verbose size is the figure's plain Plotly JSON, as callbacks sent it before compact_figure.
+The compact sizes are what the figure cache stores and sends, with plain JSON lists and with base64
+typed arrays, which need plotly.js 2.28 or later in the browser. The time to encode the figure and
+to parse the result back is the fastest of a few runs.
+
+Usage:
+    python figure_payload.py [--runs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import app  # noqa: E402,F401  Registers the pages.
+from pages import analysis  # noqa: E402
+from pages.datastore import get_dataset  # noqa: E402
+from pages.figure_json import compact_figure, dumps, loads, TYPED_ARRAYS  # noqa: E402
+
+FIGURES = [
+    analysis.create_yearly_incidents_figure,
+    analysis.create_seasonal_distribution_figure,
+    analysis.create_location_graph,
+    analysis.create_top_locations_figure,
+    analysis.create_most_crashes_by_destination_figure,
+    analysis.create_top_causes_figure,
+    analysis.create_casualties_by_cause_figure,
+    analysis.create_operator_figure,
+    analysis.create_aircraft_figure,
+    analysis.create_survival_figure,
+    analysis.create_casualty_season_plots,
+]
+
+
+def fastest(function, runs):
+    """Returns the result of function and the fastest of its run times, in milliseconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Number of runs, the fastest one is reported.')
+    args = parser.parse_args()
+
+    totals = [0, 0, 0]
+    print(f'typed arrays read by the bundled plotly.js: {TYPED_ARRAYS}')
+    print(f'{"figure":<45} {"verbose":>8} {"lists":>8} {"typed":>8} {"encode ms":>10} {"parse ms":>9}')
+    for builder in FIGURES:
+        fig = builder(get_dataset(analysis.analysis_dataset(builder)))
+        verbose = len(fig.to_json())
+        lists = len(dumps(compact_figure(fig, typed_arrays=False)))
+        serialized, encode_ms = fastest(lambda: dumps(compact_figure(fig, typed_arrays=True)), args.runs)
+        _, parse_ms = fastest(lambda: loads(serialized), args.runs)
+        for index, size in enumerate((verbose, lists, len(serialized))):
+            totals[index] += size
+        print(f'{builder.__name__:<45} {verbose:>8} {lists:>8} {len(serialized):>8} {encode_ms:>10.1f} {parse_ms:>9.2f}')
+    print(f'{"total":<45} {totals[0]:>8} {totals[1]:>8} {totals[2]:>8}')
+
+
+if __name__ == '__main__':
+    main()
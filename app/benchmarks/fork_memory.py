@@ -0,0 +1,102 @@
+"""
+Measures the memory each forked worker adds, depending on how the datasets are loaded.
+
+Forks the given number of workers from a parent that imported the app, the way a pre-forking WSGI
+server does. The datasets are loaded by each worker on first use (lazy), by the parent before
+forking (preloaded, as with gunicorn --preload), or attached to memory-mapped snapshots in a shared
+folder (mapped). Each worker serves a table page, a filtered page and a chart of every dataset.
+While all of them are alive, the proportional set size (PSS) of every process is summed, which
+splits each shared page among the processes mapping it, so the total is the memory the host spends.
+--repeat stacks copies of the datasets to see how this scales with their size. Linux only, as it
+reads /proc/<pid>/smaps_rollup.
+
+Usage:
+    python fork_memory.py [--workers N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+WORKER = '''
+import json, os, sys
+sys.path.insert(0, {src!r})
+os.environ.update({environment!r})
+import pandas as pd
+from pages import datastore
+
+read_dataset = datastore.read_dataset
+datastore.read_dataset = lambda filename: pd.concat([read_dataset(filename)] * {repeat}, ignore_index=True)
+
+import app
+from pages.aggregates import CUBE_DATA, group_totals
+from pages.datastore import get_dataset, PROCESSED_DATA
+from pages.table_query import query_page
+
+
+def pss_kb(pid='self'):
+    with open(f'/proc/{{pid}}/smaps_rollup') as file:
+        return sum(int(line.split()[1]) for line in file if line.startswith('Pss:'))
+
+
+def serve():
+    for filename in (PROCESSED_DATA, CUBE_DATA):
+        data = get_dataset(filename)
+        query_page(data, 3, 20)
+        query_page(data, 0, 20, '{{Region}} = Europe', [{{'column_id': 'Operator', 'direction': 'asc'}}])
+    group_totals(get_dataset(CUBE_DATA), ['Year'])
+
+
+parent = pss_kb()
+workers = []
+for _ in range({workers}):
+    done_read, done_write = os.pipe()
+    exit_read, exit_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        serve()
+        os.write(done_write, b'.')
+        os.read(exit_read, 1)
+        os._exit(0)
+    workers.append((pid, done_read, exit_write))
+for _, done_read, _ in workers:
+    os.read(done_read, 1)
+total = pss_kb() + sum(pss_kb(pid) for pid, _, _ in workers)
+for pid, _, exit_write in workers:
+    os.write(exit_write, b'.')
+    os.waitpid(pid, 0)
+print(json.dumps([parent, total]))
+'''
+
+def fork_workers(workers, environment, repeat=1):
+    """Runs the parent in a fresh interpreter and returns its PSS alone and the PSS of all processes, in kB."""
+    code = WORKER.format(src=SRC_FOLDER, environment=environment, workers=workers, repeat=repeat)
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_FOLDER, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='Number of forked workers.')
+    parser.add_argument('--repeat', type=int, default=1, help='Copies of the datasets stacked on each other.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        modes = {
+            'lazy': {},
+            'preloaded': {'AIR_CRASHES_PRELOAD': '1'},
+            'mapped': {'AIR_CRASHES_SHARED_FOLDER': folder},
+        }
+        for mode, environment in modes.items():
+            parent, total = fork_workers(args.workers, environment, args.repeat)
+            print(f"{mode:>9}: {args.workers} workers, {total / 1024:.1f} MB in all, "
+                  f"{(total - parent) / 1024 / args.workers:.1f} MB per worker")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Reports what starting the Dash app costs at import time, per module, from python -X importtime.
+
+Each run imports the module in a fresh interpreter. The report lists the cumulative import time of
+the app's own modules and the time spent in each third-party package, summed over its submodules.
+Pages registered by Dash are executed without an import statement, so their own lines are missing,
+but the libraries they import are still listed.
+
+Usage:
+    python import_time.py [--module app] [--top N] [--runs N] [--warm-up]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+APP_PACKAGES = ('app', 'navbar', 'pages', 'helpers')
+
+
+def import_times(module, warm_up=False):
+    """
+    Imports a module in a fresh interpreter and parses its -X importtime output.
+
+    Args:
+        module (str): The module to import, relative to the src folder.
+        warm_up (bool): Whether to also run the background warm-up, synchronously.
+
+    Returns:
+        tuple: The self and cumulative microseconds per imported module, in import order, and the total seconds.
+    """
+    code = f'import time; start = time.perf_counter(); import {module}; '
+    if warm_up:
+        code += 'from pages.warmup import warm_up; warm_up(); '
+    code += 'print(time.perf_counter() - start)'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SRC_FOLDER,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times, float(result.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app', help='Module to import.')
+    parser.add_argument('--top', type=int, default=15, help='Number of third-party packages to list.')
+    parser.add_argument('--runs', type=int, default=3, help='Number of imports, the fastest one is reported.')
+    parser.add_argument('--warm-up', action='store_true', help='Also run the warm-up after the import.')
+    args = parser.parse_args()
+
+    runs = [import_times(args.module, args.warm_up) for _ in range(args.runs)]
+    times, seconds = min(runs, key=lambda run: run[1])
+
+    print(f'import {args.module}: {seconds * 1000:.0f} ms, {len(times)} modules')
+    print('\napp modules (cumulative ms)')
+    for name, (_, cumulative) in times.items():
+        if name.split('.')[0] in APP_PACKAGES:
+            print(f'  {cumulative / 1000:8.1f}  {name}')
+
+    packages = {}
+    for name, (own, _) in times.items():
+        package = name.split('.')[0]
+        if package not in APP_PACKAGES:
+            packages[package] = packages.get(package, 0) + own
+    print('\nslowest third-party packages (ms in their own modules)')
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {micros / 1000:8.1f}  {package}')
+
+
+if __name__ == '__main__':
+    main()
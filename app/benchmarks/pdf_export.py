@@ -0,0 +1,90 @@
+"""
+Measures the PDF export in pages per second, before and after the chunked, parallel engine.
+
+Usage:
+    python pdf_export.py [--rows N] [--workers N]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from reportlab.pdfgen import canvas
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.datastore import get_dataset, PROCESSED_DATA
+from pages.pdf_export import generate_pdf, rows_per_page
+
+
+def truncate_string(s, max_length):
+    if len(s) > max_length:
+        return s[:max_length] + '...'
+    return s
+
+
+def generate_pdf_per_cell(data, pdf_path):
+    """The previous export: one drawString call per cell, in the calling thread."""
+    custom_page_width = 1800
+    custom_page_height = 600
+    c = canvas.Canvas(pdf_path, pagesize=(custom_page_width, custom_page_height))
+    width, height = custom_page_width, custom_page_height
+    font_size = 8
+    c.setFont("Helvetica", font_size)
+
+    x_offset = 40
+    y_offset = height - 40
+    row_height = 12
+
+    columns = data.columns.tolist()
+    col_widths = {col: (width - 2 * x_offset) / len(columns) for col in columns}
+    x_positions = [x_offset + sum(col_widths[columns[i]] for i in range(j)) for j in range(len(columns))]
+
+    for i, column in enumerate(columns):
+        c.drawString(x_positions[i], y_offset, truncate_string(column, 14))
+    y_offset -= row_height
+
+    for i, row in enumerate(data.itertuples(index=False, name=None)):
+        if y_offset < row_height:
+            c.showPage()
+            c.setFont("Helvetica", font_size)
+            y_offset = height - 40
+            for i, column in enumerate(columns):
+                c.drawString(x_positions[i], y_offset, truncate_string(column, 14))
+            y_offset -= row_height
+
+        for j, cell in enumerate(row):
+            c.drawString(x_positions[j], y_offset, truncate_string(str(cell), 14))
+        y_offset -= row_height
+
+    c.save()
+
+
+def measure(name, export, data, pages):
+    start = time.perf_counter()
+    export(data, io.BytesIO())
+    elapsed = time.perf_counter() - start
+    print(f'{name:<28} {elapsed:8.2f} s {pages / elapsed:10.1f} pages/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=None, help='Number of rows to export, all by default.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes of the new engine.')
+    args = parser.parse_args()
+
+    data = get_dataset(PROCESSED_DATA)
+    data['Date'] = data['Date'].dt.strftime('%Y-%m-%d')
+    if args.rows:
+        data = data.head(args.rows)
+    pages = max(1, -(-len(data) // rows_per_page()))
+    print(f'{len(data)} rows, {pages} pages, {os.cpu_count()} CPUs')
+
+    measure('per-cell drawString', generate_pdf_per_cell, data, pages)
+    measure('chunked engine, 1 process', lambda d, out: generate_pdf(d, out, workers=1), data, pages)
+    measure('chunked engine, parallel', lambda d, out: generate_pdf(d, out, workers=args.workers), data, pages)
+
+
+if __name__ == '__main__':
+    main()
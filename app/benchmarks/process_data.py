@@ -0,0 +1,72 @@
+"""
+Measures the throughput and peak memory of the processing pipeline on a synthetic raw export.
+
+Usage:
+    python process_data.py [--rows N] [--chunk-rows N] [--folder PATH]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from helpers.process_data import update, CHUNK_ROWS
+
+
+def write_raw(path, rows, chunk_rows=CHUNK_ROWS, seed=0):
+    """Writes a synthetic raw export with the columns of crashes-raw.csv, chunk by chunk."""
+    rng = np.random.default_rng(seed)
+    header = True
+    for start in range(0, rows, chunk_rows):
+        count = min(chunk_rows, rows - start)
+        days = rng.integers(0, 365 * 100, count)
+        index = np.arange(start, start + count)
+        pd.DataFrame({
+            'Date': (np.datetime64('1920-01-01') + days).astype(str),
+            'Country': np.char.add('Country ', (index % 200).astype(str)),
+            'Region': np.char.add('Region ', (index % 8).astype(str)),
+            'Aircraft': np.char.add('Aircraft ', rng.integers(0, 2000, count).astype(str)),
+            'Operator': np.char.add('Operator ', rng.integers(0, 5000, count).astype(str)),
+            'Schedule': np.char.add('City - City ', index.astype(str)),
+            'Crew on board': rng.integers(0, 10, count),
+            'Pax on board': rng.integers(0, 300, count),
+            'Survivors': np.where(rng.random(count) < 0.5, 'Yes', 'No'),
+            'Total fatalities': rng.integers(0, 300, count),
+            'Crash cause': np.char.add('Cause ', (index % 7).astype(str)),
+        }).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Number of synthetic raw rows.')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Number of rows processed at once.')
+    parser.add_argument('--folder', default=None, help='Where to write the files, a temporary folder by default.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        raw_path = os.path.join(folder, 'raw.csv')
+        processed_path = os.path.join(folder, 'processed.csv')
+        cube_path = os.path.join(folder, 'cube.csv')
+        write_raw(raw_path, args.rows)
+
+        start = time.perf_counter()
+        update(raw_path, processed_path, cube_path, full=True, chunk_rows=args.chunk_rows)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f'{args.rows} rows in {elapsed:.2f} s, {args.rows / elapsed:,.0f} rows/s, peak RSS {peak:.0f} MB')
+
+        pd.DataFrame(pd.read_csv(raw_path, nrows=1000)).to_csv(raw_path, mode='a', header=False, index=False)
+        start = time.perf_counter()
+        processed, _ = update(raw_path, processed_path, cube_path, chunk_rows=args.chunk_rows)
+        print(f'incremental run with {processed} new rows in {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,21 @@
+import gc
+import os
 import dash
-from dash import html, dcc
+from dash import html
 import dash_bootstrap_components as dbc
 from navbar import create_navbar
+from pages.api import register_api_routes
+from pages.export import register_export_routes
+from pages.warmup import start_warm_up, warm_up
 from flask import request
 
 NAVBAR = create_navbar()
 FA621 = "https://use.fontawesome.com/releases/v6.2.1/css/all.css"
 APP_TITLE = "Air crashes"
+WARMUP_VARIABLE = 'AIR_CRASHES_WARMUP'
+PRELOAD_VARIABLE = 'AIR_CRASHES_PRELOAD'
 
-dash_app = dash.Dash(
-    __name__,
-    suppress_callback_exceptions=True,
-    external_stylesheets=[
-        dbc.themes.LUX,
-        FA621,
-    ],
-    title=APP_TITLE,
-    use_pages=True,
-)
-
-dash_app.index_string = f'''
+INDEX_STRING = f'''
 <!DOCTYPE html>
 <html>
     <head>
@@ -40,22 +36,9 @@ dash_app.index_string = f'''
 </html>
 '''
 
-dash_app.layout = dcc.Loading(
-    id='loading_page_content',
-    children=[
-        html.Div([
-            NAVBAR,
-            dash.page_container
-        ])
-    ],
-    color='primary',
-    fullscreen=True
-)
+_app = None
 
-server = dash_app.server
 
-
-@server.route('/_shutdown', methods=['POST'])
 def shutdown():
     func = request.environ.get('werkzeug.server.shutdown')
     if func is None:
@@ -64,5 +47,60 @@ def shutdown():
     return 'Server shutting down...'
 
 
+def create_app(preload=False):
+    """
+    Builds the Dash app, once per process; later calls return the same app.
+
+    With preload, the datasets and the libraries pages load on first use are loaded before the server
+    forks its workers, for example under gunicorn --preload. The datasets are held in numpy buffers,
+    and gc.freeze() keeps the garbage collector from touching the objects created so far, so the
+    workers share those pages copy-on-write instead of each holding its own copy.
+
+    Args:
+        preload (bool): Whether to load the datasets now rather than on first use.
+
+    Returns:
+        dash.Dash: The app.
+    """
+    global _app
+    if _app is None:
+        dash_app = dash.Dash(
+            __name__,
+            suppress_callback_exceptions=True,
+            external_stylesheets=[
+                dbc.themes.LUX,
+                FA621,
+            ],
+            title=APP_TITLE,
+            use_pages=True,
+        )
+
+        dash_app.index_string = INDEX_STRING
+
+        dash_app.layout = html.Div([
+            NAVBAR,
+            dash.page_container
+        ])
+
+        register_export_routes(dash_app.server)
+        register_api_routes(dash_app.server)
+        dash_app.server.add_url_rule('/_shutdown', view_func=shutdown, methods=['POST'])
+        _app = dash_app
+
+    if preload:
+        warm_up()
+        gc.freeze()
+    elif os.environ.get(WARMUP_VARIABLE) == '1':
+        start_warm_up()
+    return _app
+
+
+# The worker processes of the PDF export import the main module again as __mp_main__, and must not
+# build the app, warm it up or freeze it.
+if __name__ != '__mp_main__':
+    dash_app = create_app(preload=os.environ.get(PRELOAD_VARIABLE) == '1')
+    server = dash_app.server
+
+
 if __name__ == '__main__':
     dash_app.run_server(debug=True)
@@ -1,45 +1,349 @@
-import pandas as pd
+"""
+Builds crashes-processed.csv and the aggregate cube from crashes-raw.csv.
+
+The raw export is streamed in chunks through the parse, derive, cast and write stages, so memory
+stays bounded by the chunk size. By default only raw rows that are new or changed since the previous
+run are processed: they are appended to the processed file and applied to the cube as a delta.
+Use --full to rebuild everything.
 
-csv_file_path = '../data/crashes-raw.csv'
-df = pd.read_csv(csv_file_path)
+Usage:
+    python process_data.py [--full] [--chunk-rows N]
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
 
-crew_numeric = pd.to_numeric(df['Crew on board'], errors='coerce')
-pax_numeric = pd.to_numeric(df['Pax on board'], errors='coerce')
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 
-df['Total on board'] = crew_numeric + pax_numeric
-df['Total on board'] = df['Total on board'].fillna('NA')
-df['Season'] = None
+from pages.aggregates import build_cube, CubeAccumulator, CUBE_DATA, CUBE_SCHEMA
+from pages.columnar_cache import cache_path, extend_cache, read_cache
+from pages.datastore import cast_columns, file_version, DATASET_SCHEMAS, PROCESSED_DATA, RAW_DATA
+from pages.helpers import load_data
 
-columns_to_keep = [
+INPUT_COLUMNS = [
+    'Date', 'Country', 'Region', 'Aircraft', 'Operator', 'Schedule',
+    'Crew on board', 'Pax on board', 'Survivors', 'Total fatalities', 'Crash cause'
+]
+COLUMNS_TO_KEEP = [
     'Date', 'Season', 'Country', 'Region', 'Aircraft', 'Operator',
     'Schedule', 'Total on board', 'Survivors', 'Total fatalities', 'Crash cause'
 ]
+INT_COLUMNS = ['Total on board', 'Total fatalities']
+DATE_FORMAT = '%Y-%m-%d'
+CHUNK_ROWS = 100_000
+STATE_SUFFIX = '.state.npz'
+OCCURRENCE_SALT = np.uint64(0x9E3779B97F4A7C15)
 
-df = df[columns_to_keep]
+# Season of every month number, with None at index 0 for rows without a date.
+MONTH_SEASONS = np.array([
+    None,
+    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+    'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter',
+], dtype=object)
 
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
 
+def parse(raw_path, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the raw export in chunks, with every field kept as text.
 
-def get_season(month):
-    if month in (12, 1, 2):
-        return 'Winter'
-    elif month in (3, 4, 5):
-        return 'Spring'
-    elif month in (6, 7, 8):
-        return 'Summer'
-    elif month in (9, 10, 11):
-        return 'Autumn'
+    Keeping text makes fingerprints independent of type inference, which varies between chunks.
 
+    Args:
+        raw_path (str): Path of the raw export.
+        chunk_rows (int): Number of rows per chunk.
 
-df['Season'] = df['Date'].dt.month.apply(get_season)
+    Yields:
+        pd.DataFrame: The next chunk of raw rows, indexed by row position in the file.
+    """
+    yield from pd.read_csv(raw_path, dtype=str, usecols=INPUT_COLUMNS, chunksize=chunk_rows)
 
-int_columns = [
-    'Total on board', 'Total fatalities'
-]
-for column in int_columns:
-    df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
 
-new_csv_file_path = '../data/crashes-processed.csv'
-df.to_csv(new_csv_file_path, index=False)
+def derive(raw):
+    """
+    Computes the derived columns of raw rows.
+
+    Args:
+        raw (pd.DataFrame): Rows of the raw export.
+
+    Returns:
+        pd.DataFrame: The processed columns, with Date parsed.
+    """
+    df = raw.reindex(columns=COLUMNS_TO_KEEP)
+    df['Date'] = pd.to_datetime(raw['Date'], errors='coerce', format='ISO8601')
+    on_board = raw[['Crew on board', 'Pax on board']].apply(pd.to_numeric, errors='coerce')
+    df['Total on board'] = on_board['Crew on board'] + on_board['Pax on board']
+    months = df['Date'].dt.month.fillna(0).to_numpy(dtype=np.intp)
+    df['Season'] = MONTH_SEASONS[months]
+    return df
+
+
+def cast(df):
+    """Casts the integer columns of derived rows in one pass."""
+    df[INT_COLUMNS] = df[INT_COLUMNS].apply(pd.to_numeric, errors='coerce').astype('Int64')
+    return df
+
+
+def process_rows(raw):
+    """
+    Runs raw rows through the derive and cast stages.
+
+    Args:
+        raw (pd.DataFrame): Rows of the raw export.
+
+    Returns:
+        pd.DataFrame: The processed rows.
+    """
+    return cast(derive(raw)).reset_index(drop=True)
+
+
+def write(chunks, path, append=False):
+    """
+    Writes processed chunks to a CSV file, through a temporary file unless appending.
+
+    Appended rows are flushed to disk before returning.
+
+    Args:
+        chunks (iterable): Processed data frames.
+        path (str): Path of the CSV file.
+        append (bool): Whether to append to an existing file instead of replacing it.
+
+    Returns:
+        int: The number of rows written.
+    """
+    target = path if append else f'{path}.{os.getpid()}.tmp'
+    rows = 0
+    header = not append
+    with open(target, 'ab' if append else 'wb') as file:
+        for chunk in chunks:
+            file.write(chunk.to_csv(index=False, header=header, date_format=DATE_FORMAT).encode('utf-8'))
+            header = False
+            rows += len(chunk)
+        if header:
+            file.write(pd.DataFrame(columns=COLUMNS_TO_KEEP).to_csv(index=False).encode('utf-8'))
+        file.flush()
+        os.fsync(file.fileno())
+    if not append:
+        os.replace(target, path)
+    return rows
+
+
+def row_hashes(raw):
+    """Hashes every raw row from its input fields."""
+    return pd.util.hash_pandas_object(raw[INPUT_COLUMNS], index=False).to_numpy()
+
+
+def row_fingerprints(hashes):
+    """
+    Turns the row hashes of a whole raw export into fingerprints.
+
+    Identical rows get distinct fingerprints through their occurrence number, so a repeated
+    incident appended later is still recognised as new.
+
+    Args:
+        hashes (np.ndarray): The row hashes, in file order.
+
+    Returns:
+        np.ndarray: One uint64 fingerprint per row.
+    """
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy().astype(np.uint64)
+    return pd.util.hash_array(hashes ^ (occurrence * OCCURRENCE_SALT))
+
+
+def state_path(processed_path):
+    return os.path.splitext(processed_path)[0] + STATE_SUFFIX
+
+
+def load_state(processed_path):
+    """
+    Reads the fingerprints and commit record written by the previous run.
+
+    Args:
+        processed_path (str): Path of the processed file.
+
+    Returns:
+        dict: The fingerprints of the processed rows, in file order, the size of the processed file
+        and the version of the cube at the last commit, or None when there is no usable state.
+    """
+    try:
+        with np.load(state_path(processed_path), allow_pickle=False) as arrays:
+            return {
+                'fingerprints': arrays['fingerprints'],
+                'processed_size': int(arrays['processed_size']),
+                'cube_version': str(arrays['cube_version']),
+            }
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_state(processed_path, cube_path, fingerprints):
+    """Commits a run by atomically replacing the state file."""
+    path = state_path(processed_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, fingerprints=fingerprints, processed_size=np.int64(os.path.getsize(processed_path)),
+                 cube_version=np.array(file_version(cube_path)))
+    os.replace(tmp_path, path)
+
+
+def read_processed(processed_path, chunk_rows=CHUNK_ROWS):
+    """Streams the processed file as text chunks, so rewritten rows keep their exact values."""
+    yield from pd.read_csv(processed_path, dtype=str, chunksize=chunk_rows)
+
+
+def cast_processed(chunk):
+    return cast_columns(chunk.copy(), DATASET_SCHEMAS[PROCESSED_DATA])
+
+
+def read_cube(cube_path):
+    text_columns = {column: str for column in CUBE_SCHEMA['categories']}
+    return cast_columns(pd.read_csv(cube_path, dtype=text_columns), CUBE_SCHEMA)
+
+
+def write_cube(cube, cube_path):
+    tmp_path = f'{cube_path}.{os.getpid()}.tmp'
+    cube.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, cube_path)
+
+
+def empty_cube():
+    return build_cube(process_rows(pd.DataFrame(columns=INPUT_COLUMNS, dtype=str)))
+
+
+def recover(processed_path, cube_path, chunk_rows=CHUNK_ROWS):
+    """
+    Loads the state of the previous run and brings the output files back to it.
+
+    A processed file longer than its commit record holds a torn append, which is cut off. A cube
+    that does not match the commit record is rebuilt from the processed file.
+
+    Args:
+        processed_path (str): Path of the processed file.
+        cube_path (str): Path of the cube file.
+        chunk_rows (int): Number of rows per chunk.
+
+    Returns:
+        dict: The state, or None when a full rebuild is needed.
+    """
+    state = load_state(processed_path)
+    if state is None or not os.path.exists(processed_path):
+        return None
+    size = os.path.getsize(processed_path)
+    if size < state['processed_size']:
+        return None
+    if size > state['processed_size']:
+        with open(processed_path, 'r+b') as file:
+            file.truncate(state['processed_size'])
+    if not os.path.exists(cube_path) or file_version(cube_path) != state['cube_version']:
+        cube = CubeAccumulator(empty_cube())
+        for chunk in read_processed(processed_path, chunk_rows):
+            cube.add(cast_processed(chunk))
+        write_cube(cube.result(), cube_path)
+        save_state(processed_path, cube_path, state['fingerprints'])
+        state = load_state(processed_path)
+    return state
+
+
+def rebuild(raw_path, processed_path, cube_path, chunk_rows=CHUNK_ROWS):
+    """Processes every raw row and rewrites the processed file and the cube."""
+    hashes = []
+    cube = CubeAccumulator(empty_cube())
+
+    def processed_chunks():
+        for raw in parse(raw_path, chunk_rows):
+            hashes.append(row_hashes(raw))
+            rows = process_rows(raw)
+            cube.add(rows)
+            yield rows
+
+    rows = write(processed_chunks(), processed_path)
+    write_cube(cube.result(), cube_path)
+    fingerprints = row_fingerprints(np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64))
+    save_state(processed_path, cube_path, fingerprints)
+    return rows, 0
+
+
+def update(raw_path, processed_path, cube_path, full=False, chunk_rows=CHUNK_ROWS):
+    """
+    Brings the processed file and the cube up to date with the raw export.
+
+    A first pass over the raw export only hashes rows. New rows are then processed in a second pass,
+    appended to the processed file and its binary cache, and added to the cube as a delta. When raw
+    rows were removed or changed, the processed file is rewritten without them through a temporary
+    file and the cube is corrected by their delta.
+
+    Args:
+        raw_path (str): Path of the raw export.
+        processed_path (str): Path of the processed file.
+        cube_path (str): Path of the cube file.
+        full (bool): Whether to rebuild everything.
+        chunk_rows (int): Number of rows per chunk.
+
+    Returns:
+        tuple: The number of rows processed and the number of rows removed.
+    """
+    state = None if full else recover(processed_path, cube_path, chunk_rows)
+    if state is None:
+        return rebuild(raw_path, processed_path, cube_path, chunk_rows)
+
+    hashes = [row_hashes(raw) for raw in parse(raw_path, chunk_rows)]
+    fingerprints = row_fingerprints(np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64))
+    stored = state['fingerprints']
+    removed = ~np.isin(stored, fingerprints)
+    added = ~np.isin(fingerprints, stored)
+    if not removed.any() and not added.any():
+        return 0, 0
+
+    cube = CubeAccumulator(read_cube(cube_path))
+    cached = None if removed.any() else read_cache(cache_path(processed_path), processed_path)
+    new_chunks = []
+
+    def new_rows():
+        for raw in parse(raw_path, chunk_rows):
+            raw = raw[added[raw.index.to_numpy()]]
+            if raw.empty:
+                continue
+            rows = process_rows(raw)
+            cube.add(rows)
+            if cached is not None:
+                new_chunks.append(cast_processed(rows))
+            yield rows
+
+    def rewritten_rows():
+        for chunk in read_processed(processed_path, chunk_rows):
+            chunk_removed = removed[chunk.index.to_numpy()]
+            if chunk_removed.any():
+                cube.add(cast_processed(chunk[chunk_removed]), sign=-1)
+            yield chunk[~chunk_removed]
+        yield from new_rows()
+
+    if removed.any():
+        write(rewritten_rows(), processed_path)
+    else:
+        write(new_rows(), processed_path, append=True)
+        if cached is not None:
+            extend_cache(processed_path, cached, pd.concat(new_chunks, ignore_index=True))
+
+    write_cube(cube.result(), cube_path)
+    save_state(processed_path, cube_path, np.concatenate([stored[~removed], fingerprints[added]]))
+    return int(added.sum()), int(removed.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--full', action='store_true', help='Rebuild everything instead of processing the delta.')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Number of raw rows processed at once.')
+    args = parser.parse_args()
+
+    processed_path = load_data(PROCESSED_DATA)
+    cube_path = load_data(CUBE_DATA)
+    processed, removed = update(load_data(RAW_DATA), processed_path, cube_path, full=args.full,
+                                chunk_rows=args.chunk_rows)
+
+    print(f"Processed {processed} rows and removed {removed} rows in: {processed_path}")
+    print(f"Aggregate cube saved to: {cube_path}")
+
 
-print(f"New CSV with selected columns saved to: {new_csv_file_path}")
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,457 @@
+"""
+Trains the ARIMA model behind the Forecast tab.
+
+Searches a grid of (p,d,q) orders, and optionally seasonal orders, in a process pool, ranks the
+candidates by AIC or BIC and writes the best model along with a JSON training report. Runs headless,
+so it can be scheduled; --plots saves the ACF/PACF and forecast plots as PNG files.
+
+With --segments, one model per Region, Crash cause and top Operator is trained in parallel instead
+and written to the model registry in data/models.
+
+Every trained model is exported as a forecast table with confidence bands, which is all the web app
+reads. --export writes the tables of the existing models without retraining.
+
+Models are saved in a compact JSON format holding only the parameters and state-space matrices
+forecasting needs. --convert rewrites models pickled by older versions of this script.
+
+Usage:
+    python regression_model.py [--p 0-3] [--d 0-2] [--q 0-3] [--seasonal-period N] [--criterion aic|bic]
+                               [--workers N] [--plots FOLDER] [--segments] [--top-operators N] [--export]
+                               [--convert]
+"""
+import argparse
+import itertools
+import json
 import os
-import joblib
-from statsmodels.tsa.stattools import acf, pacf
+import re
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
 import pandas as pd
 from statsmodels.tsa.arima.model import ARIMA
-import matplotlib.pyplot as plt
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from pages.compact_model import CompactARIMA
+from pages.datastore import get_dataset
+from pages.forecast import (load_model, write_forecast_table, FORECAST_FILE, MODEL_FILE, REGISTRY_FOLDER,
+                            REGISTRY_INDEX, REGISTRY_FORMAT)
+from pages.helpers import load_data
+
+REPORT_FILE = 'crashes_predictor_report.json'
+PICKLED_MODEL_FILE = 'crashes_predictor_model.pkl'
+CRITERIA = ('aic', 'bic')
+FORECAST_STEPS = 10
+FORECAST_HORIZON = 30
+SEGMENT_DIMENSIONS = ['Region', 'Crash cause']
+TOP_OPERATORS = 10
+MODEL_ORDERS = {'p': '0-3', 'd': '0-2', 'q': '0-3'}
+SEGMENT_ORDERS = {'p': '0-2', 'd': '1', 'q': '0-2'}
+
+
+def yearly_crash_counts(data=None):
+    """
+    Counts crashes per year.
+
+    Args:
+        data (pd.DataFrame, optional): The processed incidents. Defaults to the shared dataset.
+
+    Returns:
+        pd.Series: The number of crashes per year, indexed by year end.
+    """
+    data = get_dataset() if data is None else data
+    return data.set_index('Date').resample('YE').size()
+
+
+def segment_crash_counts(data, top_operators=TOP_OPERATORS):
+    """
+    Counts crashes per year for every segment: each Region, each Crash cause and the top Operators.
+
+    Every series covers the years of the whole dataset, with zeros for years without crashes.
+
+    Args:
+        data (pd.DataFrame): The processed incidents.
+        top_operators (int): Number of operators with the most crashes to include.
+
+    Returns:
+        list: Tuples of dimension, value and yearly crash counts.
+    """
+    index = yearly_crash_counts(data).index
+    operators = data['Operator'].value_counts().head(top_operators).index
+    segments = [(dimension, data[dimension].dropna().unique()) for dimension in SEGMENT_DIMENSIONS]
+    segments.append(('Operator', operators))
+
+    series = []
+    for dimension, values in segments:
+        rows = data[data[dimension].isin(values)]
+        counts = rows.groupby([dimension, pd.Grouper(key='Date', freq='YE')], observed=True).size()
+        for value in sorted(values):
+            yearly = counts.xs(value, level=0) if value in counts.index.levels[0] else counts.iloc[:0]
+            series.append((dimension, value, yearly.reindex(index, fill_value=0).asfreq('YE-DEC')))
+    return series
+
+
+def segment_slug(dimension, value, taken):
+    """Builds a unique, file-system safe base name for the files of a segment."""
+    slug = re.sub(r'[^a-z0-9]+', '-', f'{dimension}-{value}'.lower()).strip('-')
+    name, suffix = slug, 1
+    while name in taken:
+        suffix += 1
+        name = f'{slug}-{suffix}'
+    taken.add(name)
+    return name
+
+
+def parse_range(text):
+    """Parses '0-3' or '1' into the list of integers it covers."""
+    start, _, stop = text.partition('-')
+    return list(range(int(start), int(stop or start) + 1))
+
+
+def candidate_orders(p_values, d_values, q_values, seasonal_period=0):
+    """
+    Lists the (order, seasonal order) pairs of the search grid.
+
+    Seasonal orders take P, D and Q from {0, 1} when a seasonal period is given.
+
+    Args:
+        p_values (list): Autoregressive orders.
+        d_values (list): Differencing orders.
+        q_values (list): Moving average orders.
+        seasonal_period (int): Length of the seasonal cycle in years, 0 for none.
+
+    Returns:
+        list: Pairs of (p, d, q) and (P, D, Q, s) tuples.
+    """
+    orders = list(itertools.product(p_values, d_values, q_values))
+    if seasonal_period > 1:
+        seasonal_orders = [(*order, seasonal_period) for order in itertools.product((0, 1), repeat=3)]
+    else:
+        seasonal_orders = [(0, 0, 0, 0)]
+    return [(order, seasonal_order) for order in orders for seasonal_order in seasonal_orders]
+
+
+def fit_candidate(series, order, seasonal_order=(0, 0, 0, 0)):
+    """
+    Fits one candidate model.
+
+    Args:
+        series (pd.Series): The yearly crash counts.
+        order (tuple): The (p, d, q) order.
+        seasonal_order (tuple): The (P, D, Q, s) seasonal order.
+
+    Returns:
+        statsmodels ARIMAResults: The fitted model.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(series, order=order, seasonal_order=seasonal_order).fit()
+
+
+def score_candidate(args):
+    """Fits a candidate in a worker process and returns its information criteria, or the error."""
+    series, order, seasonal_order = args
+    result = {'order': list(order), 'seasonal_order': list(seasonal_order)}
+    try:
+        model_fit = fit_candidate(series, order, seasonal_order)
+    except (ValueError, np.linalg.LinAlgError) as error:
+        result['error'] = str(error)
+        return result
+    result['aic'] = float(model_fit.aic)
+    result['bic'] = float(model_fit.bic)
+    result['converged'] = bool(model_fit.mle_retvals.get('converged', True))
+    return result
+
+
+def search_orders(series, candidates, criterion='aic', workers=None):
+    """
+    Scores every candidate order across a process pool and ranks them.
+
+    Args:
+        series (pd.Series): The yearly crash counts.
+        candidates (list): Pairs of (p, d, q) and (P, D, Q, s) tuples.
+        criterion (str): 'aic' or 'bic'.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        list: The candidate results, best first. Candidates that failed to fit come last.
+    """
+    jobs = [(series, order, seasonal_order) for order, seasonal_order in candidates]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        results = [score_candidate(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(score_candidate, jobs))
+    return sorted(results, key=lambda result: (
+        'error' in result,
+        not result.get('converged', False),
+        result.get(criterion, np.inf),
+    ))
+
+
+def save_model(model_fit, model_path):
+    """Writes the model in the compact JSON format through a temporary file."""
+    CompactARIMA.from_results(model_fit).save(model_path)
+
+
+def convert_models(pickle_path, model_path, registry_folder):
+    """
+    Rewrites models pickled by older versions of this script in the compact format.
+
+    Args:
+        pickle_path (str): Path of the pickled model of all crashes, skipped when missing.
+        model_path (str): Where to write its compact model.
+        registry_folder (str): The registry folder, skipped when it has no index.
+
+    Returns:
+        int: The number of models converted.
+    """
+    count = 0
+    if os.path.exists(pickle_path):
+        save_model(load_model(pickle_path), model_path)
+        os.remove(pickle_path)
+        count += 1
+    index_path = os.path.join(registry_folder, REGISTRY_INDEX)
+    if not os.path.exists(index_path):
+        return count
+    with open(index_path) as file:
+        index = json.load(file)
+    for entry in index['segments']:
+        if entry['file'].endswith('.pkl'):
+            pickle_file = os.path.join(registry_folder, entry['file'])
+            entry['file'] = model_file(entry['file'].split('.')[0])
+            save_model(load_model(pickle_file), os.path.join(registry_folder, entry['file']))
+            os.remove(pickle_file)
+            count += 1
+    write_json(index, index_path)
+    return count
+
+
+def write_json(data, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_plots(series, model_fit, folder):
+    """Saves the ACF/PACF and forecast plots as PNG files, without a display."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from statsmodels.tsa.stattools import acf, pacf
+
+    os.makedirs(folder, exist_ok=True)
+    differenced = series.diff().dropna()
+    for name, values in (('acf', acf(differenced, nlags=20)), ('pacf', pacf(differenced, nlags=20))):
+        plt.figure(figsize=(8, 4))
+        plt.plot(values)
+        plt.title(name.upper())
+        plt.savefig(os.path.join(folder, f'{name}.png'))
+        plt.close()
+
+    forecast = model_fit.forecast(steps=FORECAST_STEPS)
+    plt.figure(figsize=(12, 6))
+    plt.plot(series.index, series, label='Historical Crash Counts')
+    forecast_index = pd.date_range(start=series.index[-1], periods=FORECAST_STEPS + 1, freq='YE')[1:]
+    plt.plot(forecast_index, forecast, label='Forecasted Crash Counts', color='red')
+    plt.title(f'Forecast of Total Crashes Over the Next {FORECAST_STEPS} Years')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(os.path.join(folder, 'forecast.png'))
+    plt.close()
+
+
+def train(series, candidates, model_path, report_path, criterion='aic', workers=None, forecast_path=None):
+    """
+    Searches the candidate orders, then writes the best model, its forecast table and the training report.
+
+    Args:
+        series (pd.Series): The yearly crash counts.
+        candidates (list): Pairs of (p, d, q) and (P, D, Q, s) tuples.
+        model_path (str): Where to write the model.
+        report_path (str): Where to write the JSON report.
+        criterion (str): 'aic' or 'bic'.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        forecast_path (str, optional): Where to write the forecast table.
+
+    Returns:
+        tuple: The fitted best model and the report.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown criterion: {criterion}")
+    start = time.perf_counter()
+    ranking = search_orders(series, candidates, criterion, workers)
+    best = ranking[0]
+    if 'error' in best:
+        raise RuntimeError("No candidate order could be fitted")
+    model_fit = fit_candidate(series, tuple(best['order']), tuple(best['seasonal_order']))
+    save_model(model_fit, model_path)
+    if forecast_path:
+        write_forecast_table(model_fit, forecast_path, FORECAST_HORIZON)
+
+    report = {
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'observations': int(len(series)),
+        'first_year': int(series.index[0].year),
+        'last_year': int(series.index[-1].year),
+        'criterion': criterion,
+        'best': best,
+        'forecast_horizon': FORECAST_HORIZON,
+        'candidates': ranking,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    write_json(report, report_path)
+    return model_fit, report
+
+
+def model_file(slug):
+    """Returns the name of a segment's model file, kept apart from its forecast table."""
+    return f'{slug}.model.json'
+
+
+def train_segment(args):
+    """Searches the orders of one segment in a worker process and writes its model and forecast table."""
+    entry, series, candidates, criterion, folder = args
+    ranking = search_orders(series, candidates, criterion, workers=1)
+    best = ranking[0]
+    if 'error' in best:
+        return {**entry, 'error': best['error']}
+    model_fit = fit_candidate(series, tuple(best['order']), tuple(best['seasonal_order']))
+    save_model(model_fit, os.path.join(folder, entry['file']))
+    write_forecast_table(model_fit, os.path.join(folder, entry['forecast']), FORECAST_HORIZON)
+    return {**entry, **best, 'observations': int(len(series)), 'crashes': int(series.sum())}
+
+
+def train_segments(segments, candidates, folder, criterion='aic', workers=None):
+    """
+    Trains one model per segment across a process pool and writes the registry index.
+
+    Each segment's order is searched within its own worker. Segments whose candidates all failed
+    are left out of the index.
+
+    Args:
+        segments (list): Tuples of dimension, value and yearly crash counts.
+        candidates (list): Pairs of (p, d, q) and (P, D, Q, s) tuples.
+        folder (str): The registry folder.
+        criterion (str): 'aic' or 'bic'.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        dict: The registry index.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown criterion: {criterion}")
+    start = time.perf_counter()
+    os.makedirs(folder, exist_ok=True)
+    taken = set()
+    jobs = []
+    for dimension, value, series in segments:
+        slug = segment_slug(dimension, value, taken)
+        entry = {'key': f'{dimension}={value}', 'dimension': dimension, 'value': str(value),
+                 'file': model_file(slug), 'forecast': f'{slug}.json'}
+        jobs.append((entry, series, candidates, criterion, folder))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) if jobs else 1
+    if workers <= 1:
+        entries = [train_segment(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            entries = list(executor.map(train_segment, jobs))
+
+    index = {
+        'format': REGISTRY_FORMAT,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'criterion': criterion,
+        'segments': [entry for entry in entries if 'error' not in entry],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    write_json(index, os.path.join(folder, REGISTRY_INDEX))
+    for name in os.listdir(folder):
+        if name.endswith(('.pkl', '.json')) and name != REGISTRY_INDEX and name.split('.')[0] not in taken:
+            os.remove(os.path.join(folder, name))
+    return index
+
+
+def export_forecasts(model_path, forecast_path, registry_folder):
+    """
+    Writes the forecast tables of the existing model and registry models without retraining.
+
+    Args:
+        model_path (str): Path of the model of all crashes.
+        forecast_path (str): Where to write its forecast table.
+        registry_folder (str): The registry folder, skipped when it has no index.
+
+    Returns:
+        int: The number of tables written.
+    """
+    write_forecast_table(load_model(model_path), forecast_path, FORECAST_HORIZON)
+    index_path = os.path.join(registry_folder, REGISTRY_INDEX)
+    if not os.path.exists(index_path):
+        return 1
+    with open(index_path) as file:
+        index = json.load(file)
+    for entry in index['segments']:
+        entry.setdefault('forecast', entry['file'].split('.')[0] + '.json')
+        model_fit = load_model(os.path.join(registry_folder, entry['file']))
+        write_forecast_table(model_fit, os.path.join(registry_folder, entry['forecast']), FORECAST_HORIZON)
+    index['format'] = REGISTRY_FORMAT
+    write_json(index, index_path)
+    return len(index['segments']) + 1
 
-def load_data(filename):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    grandparent_dir = os.path.abspath(os.path.join(script_dir, os.pardir, os.pardir))
-    file_path = os.path.join(grandparent_dir + "/app/data/", filename)
-    return file_path
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--p', default=None, help='Autoregressive orders, e.g. 0-3.')
+    parser.add_argument('--d', default=None, help='Differencing orders, e.g. 0-2.')
+    parser.add_argument('--q', default=None, help='Moving average orders, e.g. 0-3.')
+    parser.add_argument('--seasonal-period', type=int, default=0, help='Seasonal cycle in years, 0 for none.')
+    parser.add_argument('--criterion', choices=CRITERIA, default='aic', help='Information criterion to rank by.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes.')
+    parser.add_argument('--plots', default=None, help='Folder to save the ACF/PACF and forecast plots to.')
+    parser.add_argument('--segments', action='store_true', help='Train the per-segment model registry instead.')
+    parser.add_argument('--top-operators', type=int, default=TOP_OPERATORS, help='Operators with a model.')
+    parser.add_argument('--export', action='store_true', help='Only export forecast tables of the existing models.')
+    parser.add_argument('--convert', action='store_true', help='Convert pickled models to the compact format.')
+    args = parser.parse_args()
 
-data = pd.read_csv(load_data('crashes-processed.csv'))
-data['Date'] = pd.to_datetime(data['Date'])
-data.set_index('Date', inplace=True)
+    if args.convert:
+        count = convert_models(load_data(PICKLED_MODEL_FILE), load_data(MODEL_FILE), load_data(REGISTRY_FOLDER))
+        print(f"Converted {count} pickled models to the compact format")
+        return
 
-yearly_crashes = data.resample('YE').size()
-differenced = yearly_crashes.diff().dropna()
+    if args.export:
+        count = export_forecasts(load_data(MODEL_FILE), load_data(FORECAST_FILE), load_data(REGISTRY_FOLDER))
+        print(f"Exported {count} forecast tables for the next {FORECAST_HORIZON} years")
+        return
 
-plt.figure(figsize=(8, 4))
-plt.plot(acf(differenced, nlags=20))
-plt.title('ACF')
-plt.show()
+    defaults = SEGMENT_ORDERS if args.segments else MODEL_ORDERS
+    orders = {name: parse_range(getattr(args, name) or default) for name, default in defaults.items()}
+    candidates = candidate_orders(orders['p'], orders['d'], orders['q'], args.seasonal_period)
 
-plt.figure(figsize=(8, 4))
-plt.plot(pacf(differenced, nlags=20))
-plt.title('PACF')
-plt.show()
+    if args.segments:
+        segments = segment_crash_counts(get_dataset(), args.top_operators)
+        index = train_segments(segments, candidates, load_data(REGISTRY_FOLDER), args.criterion, args.workers)
+        print(f"Trained {len(index['segments'])} of {len(segments)} segment models in {index['seconds']:.2f} s")
+        print(f"Registry saved to: {load_data(REGISTRY_FOLDER)}")
+        return
 
-model = ARIMA(yearly_crashes, order=(1, 1, 1))
-model_fit = model.fit()
+    series = yearly_crash_counts()
+    model_fit, report = train(series, candidates, load_data(MODEL_FILE), load_data(REPORT_FILE),
+                              args.criterion, args.workers, load_data(FORECAST_FILE))
+    if args.plots:
+        save_plots(series, model_fit, args.plots)
 
-joblib.dump(model_fit, '../data/crashes_predictor_model.pkl')
+    best = report['best']
+    print(f"Best of {len(candidates)} candidates by {args.criterion.upper()}: order {tuple(best['order'])}, "
+          f"seasonal order {tuple(best['seasonal_order'])}, {args.criterion.upper()} {best[args.criterion]:.2f}")
+    print(f"Model saved to: {load_data(MODEL_FILE)} in {report['seconds']:.2f} s")
 
-forecast = model_fit.forecast(steps=10)
 
-plt.figure(figsize=(12, 6))
-plt.plot(yearly_crashes.index, yearly_crashes, label='Historical Crash Counts')
-forecast_index = pd.date_range(start=yearly_crashes.index[-1], periods=11, freq='YE')[1:]
-plt.plot(forecast_index, forecast, label='Forecasted Crash Counts', color='red')
-plt.title('Forecast of Total Crashes Over the Next 10 Years')
-plt.legend()
-plt.grid(True)
-plt.show()
+if __name__ == '__main__':
+    main()
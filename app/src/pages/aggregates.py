@@ -0,0 +1,301 @@
+import numpy as np
+import pandas as pd
+
+CUBE_DATA = 'crashes-cube.csv'
+
+METRICS = ['Count', 'Total fatalities', 'Total on board']
+DIMENSIONS = ['Year', 'Season', 'Country', 'Region', 'Schedule', 'Crash cause', 'Operator', 'Aircraft']
+# Schedule, Operator and Aircraft have nearly as many values as there are incidents, so a block of
+# theirs would grow with the data like the rows do. Their totals are aggregated from the rows, and
+# the cube only holds the dimensions with a bounded number of values.
+CUBE_GROUPINGS = [
+    ('Year',),
+    ('Season',),
+    ('Country',),
+    ('Region',),
+    ('Crash cause',),
+    ('Crash cause', 'Season'),
+]
+CUBE_DIMENSIONS = [dimension for dimension in DIMENSIONS
+                   if any(dimension in dimensions for dimensions in CUBE_GROUPINGS)]
+
+CUBE_SCHEMA = {
+    'categories': ['Grouping'] + [dimension for dimension in CUBE_DIMENSIONS if dimension != 'Year'],
+    'integers': ['Year'] + METRICS,
+}
+
+
+def grouping_key(dimensions):
+    return '|'.join(dimensions)
+
+
+def in_cube(dimensions):
+    """Tells whether the aggregate cube holds the totals of a grouping."""
+    return tuple(dimensions) in CUBE_GROUPINGS
+
+
+def is_cube(data):
+    """Tells whether a data frame is the aggregate cube rather than row-level data."""
+    return 'Grouping' in data.columns
+
+
+def with_year(rows):
+    """Returns row-level data with a Year column derived from Date."""
+    if 'Year' in rows.columns:
+        return rows
+    rows = rows.copy(deep=False)
+    dates = rows['Date']
+    if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        dates = pd.to_datetime(dates, errors='coerce')
+    rows['Year'] = dates.dt.year
+    return rows
+
+
+def aggregate_rows(rows, dimensions):
+    """
+    Aggregates row-level data by the given dimensions.
+
+    Args:
+        rows (pd.DataFrame): The processed incidents.
+        dimensions (list): Columns to group by.
+
+    Returns:
+        pd.DataFrame: Count, Total fatalities and Total on board indexed by the dimensions.
+    """
+    if 'Year' in dimensions:
+        rows = with_year(rows)
+    grouped = rows.groupby(list(dimensions), observed=True, dropna=True)
+    return grouped.agg(**{
+        'Count': ('Total fatalities', 'size'),
+        'Total fatalities': ('Total fatalities', 'sum'),
+        'Total on board': ('Total on board', 'sum'),
+    })
+
+
+def build_cube(rows, groupings=CUBE_GROUPINGS):
+    """
+    Pre-aggregates row-level data over every grouping used by the analysis charts.
+
+    Each grouping contributes one block of rows, marked by the Grouping column, in which the
+    dimensions outside the grouping are empty.
+
+    Args:
+        rows (pd.DataFrame): The processed incidents.
+        groupings (list): Tuples of dimensions to aggregate by.
+
+    Returns:
+        pd.DataFrame: The cube with the Grouping, dimension and metric columns.
+    """
+    rows = with_year(rows)
+    blocks = []
+    for dimensions in groupings:
+        block = aggregate_rows(rows, dimensions).reset_index()
+        block.insert(0, 'Grouping', grouping_key(dimensions))
+        blocks.append(block)
+    cube = pd.concat(blocks, ignore_index=True)
+    for dimension in CUBE_DIMENSIONS:
+        if dimension not in cube.columns:
+            cube[dimension] = None
+    for column in ['Year'] + METRICS:
+        cube[column] = cube[column].astype('Int64')
+    return cube[['Grouping'] + CUBE_DIMENSIONS + METRICS]
+
+
+def merge_cubes(cube, delta, sign=1, sort=True):
+    """
+    Adds the metrics of a delta cube to a cube, or subtracts them with sign=-1.
+
+    Cells whose count drops to zero are removed. With sort, the blocks keep the order of build_cube.
+
+    Args:
+        cube (pd.DataFrame): The aggregate cube.
+        delta (pd.DataFrame): The cube of the rows added or removed.
+        sign (int): 1 to add the delta, -1 to subtract it.
+        sort (bool): Whether to sort the cells of every block by their dimensions.
+
+    Returns:
+        pd.DataFrame: The updated cube.
+    """
+    blocks = []
+    for dimensions in CUBE_GROUPINGS:
+        key = grouping_key(dimensions)
+        added = delta.loc[delta['Grouping'] == key, list(dimensions) + METRICS]
+        parts = [cube.loc[cube['Grouping'] == key, list(dimensions) + METRICS],
+                 added.assign(**{metric: added[metric] * sign for metric in METRICS})]
+        parts = [part.astype({dimension: object for dimension in dimensions if dimension != 'Year'})
+                 for part in parts if not part.empty] or parts[:1]
+        merged = pd.concat(parts, ignore_index=True)
+        block = merged.groupby(list(dimensions), sort=sort)[METRICS].sum().reset_index()
+        block = block[block['Count'] != 0]
+        block.insert(0, 'Grouping', key)
+        blocks.append(block)
+    merged = pd.concat(blocks, ignore_index=True)
+    for dimension in CUBE_DIMENSIONS:
+        if dimension not in merged.columns:
+            merged[dimension] = None
+    for column in ['Year'] + METRICS:
+        merged[column] = merged[column].astype('Int64')
+    return merged[['Grouping'] + CUBE_DIMENSIONS + METRICS]
+
+
+class CubeAccumulator:
+    """
+    Applies the cubes of many chunks of rows to a cube.
+
+    Chunk cubes are buffered and merged in batches once they outgrow the merged cube, so the
+    total merge work stays proportional to the cube size times the logarithm of the chunk count.
+    """
+
+    def __init__(self, cube):
+        self._cube = cube
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, rows, sign=1):
+        """Adds (or with sign=-1 removes) the cube of a chunk of processed rows."""
+        delta = build_cube(rows)
+        if sign != 1:
+            delta[METRICS] = delta[METRICS] * sign
+        self._pending.append(delta)
+        self._pending_rows += len(delta)
+        if self._pending_rows >= len(self._cube):
+            self._merge()
+
+    def _merge(self, sort=False):
+        if self._pending or sort:
+            delta = pd.concat(self._pending, ignore_index=True) if self._pending else self._cube.head(0)
+            self._cube = merge_cubes(self._cube, delta, sort=sort)
+            self._pending = []
+            self._pending_rows = 0
+
+    def result(self):
+        """Returns the cube with every chunk applied, in the order of build_cube."""
+        self._merge(sort=True)
+        return self._cube
+
+
+class RowColumns:
+    """
+    The columns of the processed incidents as numpy arrays, ready to be masked and aggregated.
+
+    Dimensions are kept as integer codes into their labels, with -1 for missing values, and metrics
+    as floats with missing values counted as zero. Each array is extracted on first use.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def codes(self, dimension):
+        """
+        Returns the codes of every row in a dimension.
+
+        Args:
+            dimension (str): A categorical column or Year.
+
+        Returns:
+            tuple: The codes as an array and the labels they index.
+        """
+        if dimension not in self._arrays:
+            if dimension == 'Year':
+                years = with_year(self.rows)['Year'].to_numpy(dtype=float, na_value=np.nan)
+                known = ~np.isnan(years)
+                first = int(years[known].min()) if known.any() else 0
+                codes = np.where(known, years - first, -1).astype(np.int16)
+                labels = pd.Index(np.arange(first, first + codes.max(initial=-1) + 1, dtype=np.int64))
+            else:
+                column = self.rows[dimension]
+                if not isinstance(column.dtype, pd.CategoricalDtype):
+                    column = column.astype('category')
+                codes, labels = column.cat.codes.to_numpy(), column.cat.categories
+            self._arrays[dimension] = codes, labels
+        return self._arrays[dimension]
+
+    def values(self, metric):
+        """Returns the values of every row in a metric column."""
+        if metric not in self._arrays:
+            self._arrays[metric] = self.rows[metric].to_numpy(dtype=float, na_value=0)
+        return self._arrays[metric]
+
+
+class RowSelection:
+    """
+    The processed incidents matching a filter, given as their columns and a boolean mask over them.
+
+    group_totals aggregates a selection through the integer codes of its dimensions, so the
+    matching rows are never copied into a frame of their own.
+    """
+
+    def __init__(self, columns, mask):
+        self.columns = columns
+        self.mask = mask
+        self._size = int(mask.sum())
+
+    def __len__(self):
+        return self._size
+
+    def totals(self, dimensions):
+        """
+        Aggregates the selected rows by the given dimensions, like aggregate_rows.
+
+        Args:
+            dimensions (list): Columns to group by.
+
+        Returns:
+            pd.DataFrame: Count, Total fatalities and Total on board of every non-empty group.
+        """
+        keys = np.zeros(len(self), dtype=np.int64)
+        known = np.ones(len(self), dtype=bool)
+        labels = []
+        for dimension in dimensions:
+            codes, dimension_labels = self.columns.codes(dimension)
+            codes = codes[self.mask].astype(np.int64)
+            keys = keys * len(dimension_labels) + codes
+            known &= codes >= 0
+            labels.append(dimension_labels)
+        keys = keys[known]
+        shape = [len(dimension_labels) for dimension_labels in labels]
+        size = int(np.prod(shape))
+        columns = {'Count': np.bincount(keys, minlength=size)}
+        for metric in METRICS[1:]:
+            columns[metric] = np.bincount(keys, weights=self.columns.values(metric)[self.mask][known], minlength=size)
+        groups = np.flatnonzero(columns['Count'])
+        positions = np.unravel_index(groups, shape)
+        index = pd.MultiIndex.from_arrays(
+            [dimension_labels[position] for dimension_labels, position in zip(labels, positions)],
+            names=list(dimensions))
+        if len(dimensions) == 1:
+            index = index.get_level_values(0)
+        return pd.DataFrame({metric: values[groups] for metric, values in columns.items()},
+                            index=index).astype('int64')
+
+
+def group_totals(data, dimensions):
+    """
+    Returns the metrics of the processed data grouped by the given dimensions.
+
+    Reads the matching block of the aggregate cube when one is given and falls back to aggregating
+    row-level data otherwise.
+
+    Args:
+        data (pd.DataFrame | RowSelection): The aggregate cube, the processed incidents or a selection of them.
+        dimensions (list): Columns to group by.
+
+    Returns:
+        pd.DataFrame: Count, Total fatalities and Total on board indexed by the dimensions.
+    """
+    if isinstance(data, RowSelection):
+        return data.totals(dimensions)
+    if is_cube(data):
+        block = data[data['Grouping'] == grouping_key(dimensions)]
+        if block.empty and not in_cube(dimensions):
+            raise KeyError(f"The aggregate cube has no grouping by {', '.join(dimensions)}")
+        totals = block[list(dimensions) + METRICS]
+    else:
+        totals = aggregate_rows(data, dimensions).reset_index()
+    if 'Year' in dimensions:
+        totals = totals.astype({'Year': 'int64'})
+    return totals.set_index(list(dimensions)).astype('int64')
@@ -1,102 +1,249 @@
-import dash
-import joblib
-from dash import html, dcc, register_page, callback, Output, Input
+import json
+import os
+from dash import html, dcc, register_page, callback, clientside_callback, ctx, no_update, Output, Input, State
+from dash.exceptions import PreventUpdate
 import plotly.graph_objs as go
 import pandas as pd
-from plotly.subplots import make_subplots
-from scipy.stats import linregress
 import numpy as np
-import plotly.express as px
 import plotly.colors
 from .helpers import load_data
+from .aggregates import group_totals, in_cube, CUBE_DATA
+from .bitmap_index import dataset_index
+from .crossfilter import YEAR_FILTER, filter_options, filters_key, normalize_filters, select_rows, year_bounds
+from .datastore import get_dataset, dataset_version, PROCESSED_DATA
+from .figure_cache import FIGURE_CACHE
+from .forecast import FORECAST_TABLE, SEGMENT_FORECASTS
 
 register_page(__name__, name='Analysis', top_nav=True, path='/analysis')
 
+ALL_SEGMENTS = 'all'
+ANALYSIS_TABS = {
+    'btn-time': "Time",
+    'btn-location': "Location",
+    'btn-causes': "Causes",
+    'btn-operator': "Operator",
+    'btn-survival': "Survival",
+    'btn-correlation-studies': "Forecast",
+}
+DEFAULT_TAB = 'btn-time'
+BUTTON_STYLE = {'font-size': '20px', 'border': 'none', 'padding': '10px 20px', 'color': 'white',
+                'background-color': 'darkgrey'}
+ACTIVE_BUTTON_STYLE = {**BUTTON_STYLE, 'background-color': 'lightblue'}
+PREFETCH_VARIABLE = 'AIR_CRASHES_PREFETCH_TABS'
+FILTER_CONTROLS = {
+    'Region': 'analysis-filter-region',
+    'Country': 'analysis-filter-country',
+    'Crash cause': 'analysis-filter-cause',
+    'Operator': 'analysis-filter-operator',
+}
+FILTER_OPTION_LIMIT = 50
+NO_INCIDENTS = 'No incidents match the filters'
+# The groupings each figure builder aggregates, to tell whether the aggregate cube can serve it.
+FIGURE_GROUPINGS = {
+    'create_yearly_incidents_figure': [('Year',)],
+    'create_seasonal_distribution_figure': [('Season',)],
+    'create_location_graph': [('Country',)],
+    'create_top_locations_figure': [('Country',)],
+    'create_most_crashes_by_destination_figure': [('Schedule',)],
+    'create_top_causes_figure': [('Crash cause',)],
+    'create_casualties_by_cause_figure': [('Crash cause',)],
+    'create_operator_figure': [('Operator',)],
+    'create_aircraft_figure': [('Aircraft',)],
+    'create_survival_figure': [('Year',)],
+    'create_casualty_season_plots': [('Crash cause',), ('Crash cause', 'Season')],
+}
+
 
 def layout():
     """Defines the layout of the Analysis page."""
     button_group = html.Div([
-        html.Button("Time", id='btn-time', n_clicks=0),
-        html.Button("Location", id='btn-location', n_clicks=0),
-        html.Button("Causes", id='btn-causes', n_clicks=0),
-        html.Button("Operator", id='btn-operator', n_clicks=0),
-        html.Button("Survival", id='btn-survival', n_clicks=0),
-        html.Button("Forecast", id='btn-correlation-studies', n_clicks=0)
+        html.Button(label, id=tab, n_clicks=0, style=style)
+        for (tab, label), style in zip(ANALYSIS_TABS.items(), button_styles(DEFAULT_TAB))
     ], style={'display': 'flex', 'justifyContent': 'space-around', 'margin': '20px'})
 
-    graph_container = html.Div(id='graph-container')
+    graph_container = dcc.Loading(html.Div(id='graph-container'), color='primary')
 
     return html.Div([
+        dcc.Store(id='analysis-tab', data=DEFAULT_TAB),
+        dcc.Store(id='analysis-request', data=DEFAULT_TAB),
+        dcc.Store(id='analysis-filters', data={}),
+        dcc.Store(id='analysis-rendered'),
+        dcc.Store(id='analysis-prefetch'),
+        filter_controls(),
         button_group,
         graph_container
     ])
 
 
+def filter_controls():
+    """Lays out the year range slider and the dropdowns filtering every figure of the page."""
+    index = dataset_index(PROCESSED_DATA)
+    first, last = year_bounds(index.columns)
+    dropdowns = [
+        dcc.Dropdown(id=control, multi=True, placeholder=column,
+                     options=filter_options(index, column, limit=FILTER_OPTION_LIMIT if column == 'Operator' else None),
+                     style={'flex': '1', 'margin': '0 5px'})
+        for column, control in FILTER_CONTROLS.items()
+    ]
+    return html.Div([
+        dcc.RangeSlider(id='analysis-years', min=first, max=last, step=1, value=[first, last],
+                        marks={year: str(year) for year in range(first - first % 10 + 10, last + 1, 10)},
+                        tooltip={'placement': 'bottom'}, allowCross=False),
+        html.Div(dropdowns, style={'display': 'flex', 'margin-top': '10px'})
+    ], style={'margin': '20px'})
+
+
+def button_styles(active_tab):
+    """Returns the style of every tab button, highlighting the active one."""
+    return [ACTIVE_BUTTON_STYLE if tab == active_tab else BUTTON_STYLE for tab in ANALYSIS_TABS]
+
+
+# Highlights the clicked button in the browser and records the tab, which only changes when another
+# tab is clicked, so the server renders the graphs once per tab switch.
+clientside_callback(
+    """
+    function() {
+        const tabs = TABS;
+        const triggered = dash_clientside.callback_context.triggered;
+        const current = arguments[tabs.length];
+        const tab = triggered.length ? triggered[0].prop_id.split('.')[0] : current;
+        if (!tabs.includes(tab) || tab === current) {
+            throw dash_clientside.PreventUpdate;
+        }
+        return [tab].concat(tabs.map(id => id === tab ? ACTIVE_STYLE : STYLE));
+    }
+    """.replace('ACTIVE_STYLE', json.dumps(ACTIVE_BUTTON_STYLE))
+       .replace('STYLE', json.dumps(BUTTON_STYLE))
+       .replace('TABS', json.dumps(list(ANALYSIS_TABS))),
+    [Output('analysis-tab', 'data')] + [Output(tab, 'style') for tab in ANALYSIS_TABS],
+    [Input(tab, 'n_clicks') for tab in ANALYSIS_TABS],
+    [State('analysis-tab', 'data')],
+    prevent_initial_call=True
+)
+
+
+# Records the filter controls in one store. The year range only counts once the slider is released.
+clientside_callback(
+    """
+    function(years) {
+        const columns = COLUMNS;
+        const filters = {YEAR: years};
+        columns.forEach((column, i) => { filters[column] = arguments[i + 1] || []; });
+        return filters;
+    }
+    """.replace('COLUMNS', json.dumps(list(FILTER_CONTROLS))).replace('YEAR', json.dumps(YEAR_FILTER)),
+    Output('analysis-filters', 'data'),
+    [Input('analysis-years', 'value')] + [Input(control, 'value') for control in FILTER_CONTROLS.values()],
+    prevent_initial_call=True
+)
+
+
+# Shows a tab from the prefetched layouts when they were rendered with the current filters, and asks
+# the server for it otherwise.
+clientside_callback(
+    """
+    function(tab, prefetched, filters) {
+        const key = f => JSON.stringify(Object.keys(f || {}).sort().map(column => [column, f[column]]));
+        if (prefetched && prefetched.tabs[tab] && key(prefetched.filters) === key(filters)) {
+            return [prefetched.tabs[tab], dash_clientside.no_update];
+        }
+        return [dash_clientside.no_update, tab];
+    }
+    """,
+    Output('graph-container', 'children', allow_duplicate=True),
+    Output('analysis-request', 'data'),
+    Input('analysis-tab', 'data'),
+    State('analysis-prefetch', 'data'),
+    State('analysis-filters', 'data'),
+    prevent_initial_call=True
+)
+
+
 @callback(
     Output('graph-container', 'children'),
-    Output('btn-time', 'style'),
-    Output('btn-location', 'style'),
-    Output('btn-causes', 'style'),
-    Output('btn-operator', 'style'),
-    Output('btn-survival', 'style'),
-    Output('btn-correlation-studies', 'style'),
-    [Input('btn-time', 'n_clicks'),
-     Input('btn-location', 'n_clicks'),
-     Input('btn-causes', 'n_clicks'),
-     Input('btn-operator', 'n_clicks'),
-     Input('btn-survival', 'n_clicks'),
-     Input('btn-correlation-studies', 'n_clicks')]
+    Output('analysis-rendered', 'data'),
+    Input('analysis-request', 'data'),
+    Input('analysis-filters', 'data'),
+    State('analysis-tab', 'data')
 )
-def display_graph(btn_time, btn_location, btn_causes, btn_operator, btn_survival, btn_correlation):
-    """
-    Displays the appropriate graph based on which button is clicked.
-    Also changes the style of the active button.
-    """
-    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
-    base_style = {'font-size': '20px', 'border': 'none', 'padding': '10px 20px', 'color': 'white'}
-    styles = {
-        'btn-time': {**base_style, 'background-color': 'darkgrey'},
-        'btn-location': {**base_style, 'background-color': 'darkgrey'},
-        'btn-causes': {**base_style, 'background-color': 'darkgrey'},
-        'btn-operator': {**base_style, 'background-color': 'darkgrey'},
-        'btn-survival': {**base_style, 'background-color': 'darkgrey'},
-        'btn-correlation-studies': {**base_style, 'background-color': 'darkgrey'}
-    }
+def display_graph(requested_tab, filters, active_tab):
+    """
+    Displays the graphs of the requested tab, or of the active tab when the filters changed.
 
-    active_style = {'font-size': '20px', 'border': 'none', 'padding': '10px 20px', 'color': 'white',
-                    'background-color': 'lightblue'}
-
-    if 'btn-time.n_clicks' in triggered:
-        styles['btn-time'] = active_style
-    elif 'btn-location.n_clicks' in triggered:
-        styles['btn-location'] = active_style
-    elif 'btn-causes.n_clicks' in triggered:
-        styles['btn-causes'] = active_style
-    elif 'btn-operator.n_clicks' in triggered:
-        styles['btn-operator'] = active_style
-    elif 'btn-survival.n_clicks' in triggered:
-        styles['btn-survival'] = active_style
-    elif 'btn-correlation-studies.n_clicks' in triggered:
-        styles['btn-correlation-studies'] = active_style
-    else:
-        styles['btn-time'] = active_style
+    The first render and every render for new filters are reported, so the other tabs get prefetched
+    with the same filters.
+    """
+    tab = active_tab if ctx.triggered_id == 'analysis-filters' else requested_tab
+    rendered = no_update if ctx.triggered_id == 'analysis-request' else {'tab': tab, 'filters': filters}
+    return tab_layout(tab, filters), rendered
 
-    ctx = dash.callback_context
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    processed_data = pd.read_csv(load_data('crashes-processed.csv'))
 
-    if button_id == 'btn-time':
-        fig1 = create_yearly_incidents_figure(processed_data)
-        fig2 = create_seasonal_distribution_figure(processed_data)
-        graph_layout = html.Div([
-            dcc.Graph(figure=fig1),
-            dcc.Graph(figure=fig2)
-        ])
-    elif button_id == 'btn-location':
-        fig1 = create_location_graph(processed_data)
-        fig2 = create_top_locations_figure(processed_data)
-        fig3 = create_most_crashes_by_destination_figure(processed_data)
-        graph_layout = html.Div([
+@callback(
+    Output('graph-container', 'children', allow_duplicate=True),
+    Input('analysis-years', 'drag_value'),
+    State('analysis-filters', 'data'),
+    State('analysis-tab', 'data'),
+    prevent_initial_call=True
+)
+def preview_years(years, filters, tab):
+    """Redraws the active tab while the year slider is dragged, without prefetching the other tabs."""
+    if not years:
+        raise PreventUpdate
+    return tab_layout(tab, {**(filters or {}), YEAR_FILTER: years})
+
+
+@callback(
+    Output(FILTER_CONTROLS['Operator'], 'options'),
+    Input(FILTER_CONTROLS['Operator'], 'search_value'),
+    State(FILTER_CONTROLS['Operator'], 'value'),
+    prevent_initial_call=True
+)
+def search_operator_options(search, selected):
+    """Lists the operators matching the typed text, as there are too many of them to list them all."""
+    return filter_options(dataset_index(PROCESSED_DATA), 'Operator', search, selected, FILTER_OPTION_LIMIT)
+
+
+@callback(
+    Output('analysis-prefetch', 'data'),
+    Input('analysis-rendered', 'data'),
+    prevent_initial_call=True
+)
+def prefetch_tabs(rendered):
+    """
+    Sends the layouts of the other tabs once a tab is shown for new filters, so the browser switches
+    tabs without asking the server again.
+
+    Set AIR_CRASHES_PREFETCH_TABS=0 to render every tab on the server when it is clicked instead.
+
+    Args:
+        rendered (dict): The id of the tab rendered and the filters it was rendered with.
+
+    Returns:
+        dict: The filters and the layout of every other tab, by tab id.
+    """
+    if os.environ.get(PREFETCH_VARIABLE, '1') == '0':
+        raise PreventUpdate
+    tabs = {tab: tab_layout(tab, rendered['filters']) for tab in ANALYSIS_TABS if tab != rendered['tab']}
+    return {'filters': rendered['filters'], 'tabs': tabs}
+
+
+def tab_layout(tab, filters=None):
+    """
+    Lays out the graphs of an Analysis tab.
+
+    Args:
+        tab (str): The id of the tab button.
+        filters (dict, optional): The year range and the values of the filter columns to keep. The
+            forecast is not filtered.
+
+    Returns:
+        html.Div: The graphs of the tab.
+    """
+    if tab == 'btn-location':
+        fig1 = cached_figure(create_location_graph, filters)
+        fig2 = cached_figure(create_top_locations_figure, filters)
+        fig3 = cached_figure(create_most_crashes_by_destination_figure, filters)
+        return html.Div([
             html.Div([
                 dcc.Graph(figure=fig1, style={'width': '70%'}),
                 dcc.Graph(figure=fig2, style={'width': '30%'})
@@ -105,42 +252,124 @@ def display_graph(btn_time, btn_location, btn_causes, btn_operator, btn_survival
                 dcc.Graph(figure=fig3)
             ])
         ])
-    elif button_id == 'btn-causes':
-        fig1 = create_top_causes_figure(processed_data)
-        fig2 = create_casualties_by_cause_figure(processed_data)
-        graph_layout = html.Div([
+    if tab == 'btn-causes':
+        fig1 = cached_figure(create_top_causes_figure, filters)
+        fig2 = cached_figure(create_casualties_by_cause_figure, filters)
+        return html.Div([
             dcc.Graph(figure=fig1, style={'width': '50%'}),
             dcc.Graph(figure=fig2, style={'width': '50%'})
         ], style={'display': 'flex', 'flex-direction': 'row'})
-    elif button_id == 'btn-operator':
-        fig1 = create_operator_figure(processed_data)
-        fig2 = create_aircraft_figure(processed_data)
-        graph_layout = html.Div([
+    if tab == 'btn-operator':
+        fig1 = cached_figure(create_operator_figure, filters)
+        fig2 = cached_figure(create_aircraft_figure, filters)
+        return html.Div([
             dcc.Graph(figure=fig1, style={'width': '50%'}),
             dcc.Graph(figure=fig2, style={'width': '50%'})
         ], style={'display': 'flex', 'flex-direction': 'row'})
-    elif button_id == 'btn-survival':
-        fig1 = create_survival_figure(processed_data)
-        fig2 = create_casualty_season_plots(processed_data)
-        graph_layout = html.Div([
+    if tab == 'btn-survival':
+        fig1 = cached_figure(create_survival_figure, filters)
+        fig2 = cached_figure(create_casualty_season_plots, filters)
+        return html.Div([
             dcc.Graph(figure=fig1),
             dcc.Graph(figure=fig2)
         ])
-    elif button_id == 'btn-correlation-studies':
-        fig1 = create_forecast_chart()
-        graph_layout = html.Div([
-            dcc.Graph(figure=fig1)
-        ])
-    else:
-        fig1 = create_yearly_incidents_figure(processed_data)
-        fig2 = create_seasonal_distribution_figure(processed_data)
-        graph_layout = html.Div([
-            dcc.Graph(figure=fig1),
-            dcc.Graph(figure=fig2)
+    if tab == 'btn-correlation-studies':
+        fig1 = cached_forecast_chart()
+        return html.Div([
+            dcc.Dropdown(id='forecast-segment', options=forecast_segment_options(), value=ALL_SEGMENTS,
+                         clearable=False, style={'width': '50%', 'margin': '0 auto'}),
+            dcc.Graph(id='forecast-graph', figure=fig1)
         ])
+    fig1 = cached_figure(create_yearly_incidents_figure, filters)
+    fig2 = cached_figure(create_seasonal_distribution_figure, filters)
+    return html.Div([
+        dcc.Graph(figure=fig1),
+        dcc.Graph(figure=fig2)
+    ])
+
+
+@callback(
+    Output('forecast-graph', 'figure'),
+    Input('forecast-segment', 'value'),
+    prevent_initial_call=True
+)
+def display_forecast(segment):
+    """Shows the forecast of the selected segment, loading only that segment's forecast table."""
+    return cached_forecast_chart(None if segment == ALL_SEGMENTS else segment)
+
 
-    return graph_layout, styles['btn-time'], styles['btn-location'], styles['btn-causes'], styles['btn-operator'], \
-           styles['btn-survival'], styles['btn-correlation-studies']
+def forecast_segment_options():
+    """Lists the total and every segment of the model registry as dropdown options."""
+    options = [{'label': 'All crashes', 'value': ALL_SEGMENTS}]
+    for entry in SEGMENT_FORECASTS.segments():
+        options.append({'label': f"{entry['dimension']}: {entry['value']}", 'value': entry['key']})
+    return options
+
+
+def analysis_dataset(builder):
+    """
+    Returns the dataset a figure is built from, preferring the aggregate cube written by the ETL.
+
+    Args:
+        builder (callable): One of the create_*_figure functions.
+
+    Returns:
+        str: The cube when it holds every grouping of the figure, else the processed incidents.
+    """
+    groupings = FIGURE_GROUPINGS.get(builder.__name__)
+    if groupings and all(in_cube(dimensions) for dimensions in groupings) and os.path.exists(load_data(CUBE_DATA)):
+        return CUBE_DATA
+    return PROCESSED_DATA
+
+
+def cached_figure(builder, filters=None, **params):
+    """
+    Returns the figure of a builder from the figure cache, building it from the shared dataset on a miss.
+
+    Unfiltered figures are built from analysis_dataset. Filtered figures are built from the rows of
+    the processed incidents selected by the filters, and the filters are part of their cache key.
+
+    Args:
+        builder (callable): One of the create_*_figure functions taking the processed data.
+        filters (dict, optional): The year range and the values of the filter columns to keep.
+        **params: Additional keyword arguments of the builder.
+
+    Returns:
+        dict: The figure as a JSON-compatible dict.
+    """
+    if filters:
+        index = dataset_index(PROCESSED_DATA)
+        filters = normalize_filters(filters, year_bounds(index.columns))
+    if not filters:
+        source = analysis_dataset(builder)
+        return FIGURE_CACHE.get_or_build(builder.__name__, dataset_version(source),
+                                         lambda: builder(get_dataset(source), **params), params)
+    return FIGURE_CACHE.get_or_build(builder.__name__, index.version,
+                                     lambda: builder(select_rows(index, filters), **params),
+                                     {**params, 'filters': filters_key(filters)})
+
+
+def cached_forecast_chart(segment=None):
+    """Returns the forecast chart of a segment from the figure cache, rebuilt whenever its forecast table changes."""
+    service = FORECAST_TABLE if segment is None else SEGMENT_FORECASTS.service(segment)
+    return FIGURE_CACHE.get_or_build(create_forecast_chart.__name__, service.version(),
+                                     lambda: create_forecast_chart(segment), {'segment': segment})
+
+
+def bar_colors(values, max_value, palette=plotly.colors.sequential.Sunsetdark):
+    """
+    Colors bars by their share of the largest value.
+
+    Args:
+        values (np.ndarray): The bar values.
+        max_value (float): The value that gets the last palette color.
+        palette (list): The colors, from the smallest value to the largest.
+
+    Returns:
+        list: The palette color of every bar.
+    """
+    indices = (np.asarray(values, dtype=float) / (max_value or 1) * (len(palette) - 1)).astype(int)
+    return [palette[index] for index in indices]
 
 
 def standardized_plot_layout(fig, min_val=None, max_val=None):
@@ -150,9 +379,10 @@ def standardized_plot_layout(fig, min_val=None, max_val=None):
     Args:
         fig (go.Figure): The plotly figure to update.
         min_val (int/float, optional): Minimum value for the color scale. Defaults to None.
-        max_val (int/float, optional): Maximum value for the color scale. Defaults to None.
+        max_val (int/float, optional): Maximum value for the color scale. Defaults to None. The scale
+            goes from 0 to 1 when either is missing, as for a figure of no incidents.
     """
-    if min_val is None or max_val is None:
+    if min_val is None or max_val is None or pd.isna(min_val) or pd.isna(max_val):
         min_val, max_val = 0, 1
 
     tickvals = np.linspace(min_val, max_val, num=5)
@@ -193,6 +423,27 @@ def standardized_plot_layout(fig, min_val=None, max_val=None):
     return fig
 
 
+def no_incidents_figure(title, height=None):
+    """
+    Creates the figure shown in place of a chart when the filters select no incidents.
+
+    Args:
+        title (str): The title of the chart it replaces.
+        height (int, optional): The height of the chart it replaces.
+
+    Returns:
+        go.Figure: The plotly figure object.
+    """
+    fig = go.Figure()
+    fig.add_annotation(text=NO_INCIDENTS, xref='paper', yref='paper', x=0.5, y=0.5, showarrow=False,
+                       font=dict(size=16))
+    fig.update_layout(title=title, xaxis=dict(visible=False), yaxis=dict(visible=False))
+    if height is not None:
+        fig.update_layout(height=height)
+    standardized_plot_layout(fig)
+    return fig
+
+
 def create_yearly_incidents_figure(processed_data):
     """
     Creates a bar chart of incidents per year with a trend line.
@@ -203,10 +454,9 @@ def create_yearly_incidents_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    processed_data['Date'] = pd.to_datetime(processed_data['Date'])
-    data_by_year = processed_data['Date'].dt.year.value_counts().sort_index()
-    slope, intercept, r_value, p_value, std_err = linregress(data_by_year.index, data_by_year.values)
-    line = slope * np.array(data_by_year.index) + intercept
+    if len(processed_data) == 0:
+        return no_incidents_figure('Incidents Per Year')
+    data_by_year = group_totals(processed_data, ['Year'])['Count'].sort_index()
 
     min_val = data_by_year.values.min()
     max_val = data_by_year.values.max()
@@ -223,14 +473,17 @@ def create_yearly_incidents_figure(processed_data):
         textposition='auto',
         showlegend=False
     ))
-    fig.add_trace(go.Scatter(
-        x=data_by_year.index,
-        y=line,
-        mode='lines',
-        name='Trend Line',
-        line=dict(color='red', width=3),
-        showlegend=False
-    ))
+    # A trend needs at least two years, which filters can take away.
+    if len(data_by_year) >= 2:
+        slope, intercept = np.polyfit(data_by_year.index.astype(float), data_by_year.values.astype(float), 1)
+        fig.add_trace(go.Scatter(
+            x=data_by_year.index,
+            y=slope * np.array(data_by_year.index) + intercept,
+            mode='lines',
+            name='Trend Line',
+            line=dict(color='red', width=3),
+            showlegend=False
+        ))
 
     fig.update_layout(
         title='Incidents Per Year',
@@ -252,7 +505,9 @@ def create_seasonal_distribution_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    data_by_season = processed_data['Season'].value_counts()
+    if len(processed_data) == 0:
+        return no_incidents_figure('Seasonal Distribution of Crashes')
+    data_by_season = group_totals(processed_data, ['Season'])['Count'].sort_values(ascending=False)
 
     fig = go.Figure(data=[
         go.Pie(
@@ -283,25 +538,32 @@ def create_location_graph(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    country_counts = processed_data['Country'].value_counts().reset_index()
+    if len(processed_data) == 0:
+        return no_incidents_figure('Global Distribution of Crashes', height=700)
+    country_counts = group_totals(processed_data, ['Country'])['Count'].sort_values(ascending=False).reset_index()
     country_counts.columns = ['Country', 'Count']
 
     min_val = country_counts['Count'].min()
     max_val = country_counts['Count'].max()
 
-    fig = px.choropleth(country_counts,
-                        locations="Country",
-                        locationmode='country names',
-                        color="Count",
-                        range_color=(min_val, max_val),
-                        labels={'Count': 'Number of Crashes'},
-                        title='Global Distribution of Crashes')
+    # Built from the trace directly rather than with px.choropleth, which takes longer than the
+    # aggregation when the figure is redrawn for every filter.
+    fig = go.Figure(go.Choropleth(
+        locations=country_counts['Country'],
+        z=country_counts['Count'],
+        locationmode='country names',
+        coloraxis='coloraxis',
+        name='',
+        hovertemplate='Country=%{location}<br>Number of Crashes=%{z}<extra></extra>'
+    ))
     fig.update_layout(
+        title='Global Distribution of Crashes',
         geo=dict(
             showframe=False,
             showcoastlines=False,
             projection_type='equirectangular'
         ),
+        legend=dict(tracegroupgap=0),
         height=700
     )
     standardized_plot_layout(fig, min_val, max_val)
@@ -318,25 +580,17 @@ def create_top_locations_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    location_counts = processed_data['Country'].value_counts().sort_values(ascending=True).tail(10)
+    if len(processed_data) == 0:
+        return no_incidents_figure("Top 10 Crash Locations")
+    location_counts = group_totals(processed_data, ['Country'])['Count'].sort_values(ascending=True).tail(10)
     total_counts = location_counts.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    max_count = location_counts.max()
-    colors = [get_color(val, max_count) for val in location_counts.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=location_counts.values,
         y=location_counts.index,
         orientation='h',
-        marker=dict(color=colors),
+        marker=dict(color=bar_colors(location_counts.values, location_counts.max())),
         text=[f'{v} ({v / total_counts:.2%})' for v in location_counts.values],
         textposition='auto'
     ))
@@ -361,24 +615,17 @@ def create_most_crashes_by_destination_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    destination_counts = processed_data['Schedule'].value_counts().sort_values(ascending=True).tail(10)
+    if len(processed_data) == 0:
+        return no_incidents_figure("Top 10 Destinations with Most Crashes", height=700)
+    destination_counts = group_totals(processed_data, ['Schedule'])['Count'].sort_values(ascending=True).tail(10)
     total_counts = destination_counts.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    colors = [get_color(val, destination_counts.max()) for val in destination_counts.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=destination_counts.values,
         y=destination_counts.index,
         orientation='h',
-        marker=dict(color=colors),
+        marker=dict(color=bar_colors(destination_counts.values, destination_counts.max())),
         text=[f'{v} ({v / total_counts:.2%})' for v in destination_counts.values],
         textposition='auto'
     ))
@@ -403,25 +650,17 @@ def create_top_causes_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    cause_counts = processed_data['Crash cause'].value_counts().sort_values(ascending=True).tail(5)
+    if len(processed_data) == 0:
+        return no_incidents_figure("Top 5 Crash Causes")
+    cause_counts = group_totals(processed_data, ['Crash cause'])['Count'].sort_values(ascending=True).tail(5)
     total_causes = cause_counts.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    max_count = cause_counts.max()
-    colors = [get_color(val, max_count) for val in cause_counts.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=cause_counts.values,
         y=cause_counts.index,
         orientation='h',
-        marker=dict(color=colors),
+        marker=dict(color=bar_colors(cause_counts.values, cause_counts.max())),
         text=[f'{v} ({v / total_causes:.2%})' for v in cause_counts.values],
         textposition='auto'
     ))
@@ -445,25 +684,18 @@ def create_casualties_by_cause_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    casualty_data = processed_data.groupby('Crash cause')['Total fatalities'].sum().sort_values(ascending=True).tail(5)
+    if len(processed_data) == 0:
+        return no_incidents_figure("Total Casualties by Crash Cause")
+    casualty_data = group_totals(processed_data, ['Crash cause'])['Total fatalities'] \
+        .sort_values(ascending=True).tail(5)
     total_fatalities = casualty_data.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    max_count = casualty_data.max()
-    colors = [get_color(val, max_count) for val in casualty_data.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=casualty_data.values,
         y=casualty_data.index,
         orientation='h',
-        marker=dict(color=colors),
+        marker=dict(color=bar_colors(casualty_data.values, casualty_data.max())),
         text=[f'{v} ({v / total_fatalities:.2%})' for v in casualty_data.values],
         textposition='auto'
     ))
@@ -487,19 +719,11 @@ def create_operator_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    data_by_operator = processed_data['Operator'].value_counts().sort_values(ascending=True).tail(10)
+    if len(processed_data) == 0:
+        return no_incidents_figure('Top 10 Incidents by Operator', height=700)
+    data_by_operator = group_totals(processed_data, ['Operator'])['Count'].sort_values(ascending=True).tail(10)
     total_operator = data_by_operator.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    max_count = data_by_operator.max()
-    colors = [get_color(val, max_count) for val in data_by_operator.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=data_by_operator.values,
@@ -507,7 +731,7 @@ def create_operator_figure(processed_data):
         orientation='h',
         text=[f'{v} ({v / total_operator:.2%})' for v in data_by_operator.values],
         textposition='auto',
-        marker=dict(color=colors)
+        marker=dict(color=bar_colors(data_by_operator.values, data_by_operator.max()))
     ))
 
     fig.update_layout(
@@ -530,19 +754,11 @@ def create_aircraft_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    data_by_aircraft = processed_data['Aircraft'].value_counts().sort_values(ascending=True).tail(10)
+    if len(processed_data) == 0:
+        return no_incidents_figure('Top 10 Incidents by Aircraft', height=700)
+    data_by_aircraft = group_totals(processed_data, ['Aircraft'])['Count'].sort_values(ascending=True).tail(10)
     total_aircraft = data_by_aircraft.sum()
 
-    sunsetdark = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(sunsetdark) - 1))
-        return sunsetdark[color_index]
-
-    max_count = data_by_aircraft.max()
-    colors = [get_color(val, max_count) for val in data_by_aircraft.values]
-
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=data_by_aircraft.values,
@@ -550,7 +766,7 @@ def create_aircraft_figure(processed_data):
         orientation='h',
         text=[f'{v} ({v / total_aircraft:.2%})' for v in data_by_aircraft.values],
         textposition='auto',
-        marker=dict(color=colors)
+        marker=dict(color=bar_colors(data_by_aircraft.values, data_by_aircraft.max()))
     ))
 
     fig.update_layout(
@@ -573,12 +789,9 @@ def create_survival_figure(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    processed_data['Date'] = pd.to_datetime(processed_data['Date'], errors='coerce')
-    processed_data['Year'] = processed_data['Date'].dt.year
-    yearly_data = processed_data.groupby('Year').agg({
-        'Total fatalities': 'sum',
-        'Total on board': 'sum'
-    }).reset_index()
+    if len(processed_data) == 0:
+        return no_incidents_figure('Annual Fatalities', height=700)
+    yearly_data = group_totals(processed_data, ['Year'])[['Total fatalities', 'Total on board']].reset_index()
 
     sunsetdark = plotly.colors.sequential.Sunsetdark
     color1 = sunsetdark[2]
@@ -610,25 +823,20 @@ def create_casualty_season_plots(processed_data):
     Returns:
         go.Figure: The plotly figure object.
     """
-    top_causes = processed_data['Crash cause'].value_counts().head(5).index.tolist()
-    data_filtered = processed_data[processed_data['Crash cause'].isin(top_causes)]
-    casualties_by_cause_season = data_filtered.groupby(['Crash cause', 'Season'])['Total fatalities'].sum().unstack(
-        fill_value=0)
-    data = casualties_by_cause_season
+    if len(processed_data) == 0:
+        return no_incidents_figure("Casualties by Top Causes Across Seasons", height=400)
+    from plotly.subplots import make_subplots
+
+    top_causes = group_totals(processed_data, ['Crash cause'])['Count'].sort_values(ascending=False).head(5)
+    casualties = group_totals(processed_data, ['Crash cause', 'Season'])['Total fatalities'].unstack(fill_value=0)
+    data = casualties[casualties.index.isin(top_causes.index)]
     max_casualties = data.max().max()
 
     fig = make_subplots(rows=1, cols=5, subplot_titles=data.index.tolist(), shared_yaxes=True)
-    viridis = plotly.colors.sequential.Sunsetdark
-
-    def get_color(value, max_value):
-        norm_value = value / max_value
-        color_index = int(norm_value * (len(viridis) - 1))
-        return viridis[color_index]
-
     for i, cause in enumerate(data.index, 1):
-        colors = [get_color(val, max_casualties) for val in data.loc[cause]]
         fig.add_trace(
-            go.Bar(x=data.columns, y=data.loc[cause], name=cause, marker=dict(color=colors)),
+            go.Bar(x=data.columns, y=data.loc[cause], name=cause,
+                   marker=dict(color=bar_colors(data.loc[cause].values, max_casualties))),
             row=1, col=i
         )
 
@@ -642,32 +850,47 @@ def create_casualty_season_plots(processed_data):
     return fig
 
 
-def load_and_forecast():
+def load_forecast_table(segment=None):
     """
-    Loads the ARIMA model and generates a forecast for the next 10 years.
+    Reads the forecast for the next 10 years, with its confidence bands, exported by the training script.
+
+    Args:
+        segment (str, optional): Key of a segment in the model registry. Defaults to all crashes.
 
     Returns:
-        pd.Series: The forecasted values.
+        pd.DataFrame: The mean, lower and upper forecast, indexed by year end.
+    """
+    if segment is None:
+        return FORECAST_TABLE.forecast(steps=10)
+    return SEGMENT_FORECASTS.forecast(segment, steps=10)
+
+
+def load_and_forecast(segment=None):
     """
-    model_fit = joblib.load(load_data('crashes_predictor_model.pkl'))
-    if not hasattr(model_fit, 'get_forecast'):
-        raise AttributeError("Loaded model is not a valid ARIMA model instance.")
+    Returns the forecast for the next 10 years.
 
-    forecast_result = model_fit.get_forecast(steps=10)
-    forecast = forecast_result.predicted_mean
-    return forecast
+    Args:
+        segment (str, optional): Key of a segment in the model registry. Defaults to all crashes.
+
+    Returns:
+        pd.Series: The forecasted values.
+    """
+    return load_forecast_table(segment)['mean']
 
 
-def create_forecast_chart():
+def create_forecast_chart(segment=None):
     """
     Creates a line chart showing the forecast of total crashes over the next 10 years.
 
+    Args:
+        segment (str, optional): Key of a segment in the model registry. Defaults to all crashes.
+
     Returns:
         go.Figure: The plotly figure object.
     """
-    forecast = load_and_forecast()
-    forecast_index = pd.date_range(start=forecast.index[0], periods=len(forecast), freq='YE-DEC')
-    error = forecast * 0.10
+    table = load_forecast_table(segment)
+    forecast = table['mean']
+    forecast_index = table.index
     sunsetdark = plotly.colors.sequential.Sunsetdark
     color = sunsetdark[4]
 
@@ -676,8 +899,9 @@ def create_forecast_chart():
         y=forecast.values,
         error_y=dict(
             type='data',
-            symmetric=True,
-            array=error.values,
+            symmetric=False,
+            array=(table['upper'] - forecast).values,
+            arrayminus=(forecast - table['lower']).values,
             visible=True
         ),
         mode='lines+markers+text',
@@ -687,10 +911,16 @@ def create_forecast_chart():
         textposition='top right'
     )
 
+    if segment is None:
+        title = 'Forecast of Total Crashes Over the Next 10 Years'
+    else:
+        dimension, _, value = segment.partition('=')
+        title = f'Forecast of Crashes for {value} ({dimension}) Over the Next 10 Years'
+
     layout = go.Layout(
-        title='Forecast of Total Crashes Over the Next 10 Years',
+        title=title,
         xaxis=dict(title='Year'),
-        yaxis=dict(title='Number of Crashes', range=[20, max(forecast.values) * 1.5]),
+        yaxis=dict(title='Number of Crashes', range=[0, max(max(forecast.values) * 1.5, table['upper'].max())]),
         hovermode='closest'
     )
 
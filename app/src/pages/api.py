@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+from flask import Response, request
+
+from .aggregates import CUBE_DATA, DIMENSIONS, group_totals, in_cube
+from .bitmap_index import dataset_index
+from .crossfilter import select_values
+from .datastore import get_dataset, dataset_version, PROCESSED_DATA
+from .helpers import load_data
+
+API_METRICS = {
+    'count': 'Count',
+    'fatalities': 'Total fatalities',
+    'on_board': 'Total on board',
+}
+API_MAX_AGE = 60
+
+
+class QueryError(ValueError):
+    """Raised for an aggregate query the API cannot answer."""
+
+
+def parse_list(value):
+    """Splits a comma separated query parameter, dropping empty items."""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def parse_aggregate_query(args):
+    """
+    Reads and checks the parameters of an aggregate query.
+
+    Args:
+        args (MultiDict): The query string: group_by and metric as comma separated lists, and any
+            number of filter parameters of the form Column:value. Filters on the same column match
+            any of their values.
+
+    Returns:
+        tuple: The dimensions to group by, the metric names and the filters as {column: [values]}.
+
+    Raises:
+        QueryError: When a dimension, metric or filter is unknown or malformed.
+    """
+    group_by = parse_list(args.get('group_by'))
+    if not group_by:
+        raise QueryError("group_by is required")
+    unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if unknown or len(set(group_by)) != len(group_by):
+        raise QueryError(f"group_by must list distinct columns among {', '.join(DIMENSIONS)}")
+
+    metrics = parse_list(args.get('metric')) or list(API_METRICS)
+    unknown = [metric for metric in metrics if metric not in API_METRICS]
+    if unknown:
+        raise QueryError(f"metric must be among {', '.join(API_METRICS)}")
+
+    filters = {}
+    for item in args.getlist('filter'):
+        column, separator, value = item.partition(':')
+        if not separator or column not in DIMENSIONS:
+            raise QueryError(f"filter must be Column:value with a column among {', '.join(DIMENSIONS)}")
+        if column == 'Year':
+            try:
+                value = int(value)
+            except ValueError:
+                raise QueryError("Year filters must be integers")
+        filters.setdefault(column, []).append(value)
+    return group_by, metrics, filters
+
+
+def aggregate_source(group_by, filters):
+    """Returns the dataset answering a query: the aggregate cube when it holds the grouping and nothing is filtered."""
+    if not filters and in_cube(group_by) and os.path.exists(load_data(CUBE_DATA)):
+        return CUBE_DATA
+    return PROCESSED_DATA
+
+
+def aggregate(group_by, metrics, filters, source):
+    """
+    Computes the metrics of a query with the aggregation of the Analysis figures.
+
+    Args:
+        group_by (list): Dimensions to group by.
+        metrics (list): Names of the metrics, keys of API_METRICS.
+        filters (dict): Values to keep by column.
+        source (str): The dataset to aggregate, from aggregate_source. Always the processed incidents
+            when there are filters.
+
+    Returns:
+        list: One dict per group with its dimensions and metrics.
+    """
+    # Filtered queries select the rows through the bitmap index, like the cross-filters of the Analysis page.
+    data = select_values(dataset_index(source), filters) if filters else get_dataset(source)
+    totals = group_totals(data, group_by)[[API_METRICS[metric] for metric in metrics]]
+    totals.columns = metrics
+    return totals.reset_index().to_dict(orient='records')
+
+
+def query_etag(source, group_by, metrics, filters):
+    """Builds the ETag of a query, which changes with the version of the dataset answering it."""
+    query = json.dumps([group_by, metrics, sorted((column, sorted(map(str, values)))
+                                                  for column, values in filters.items())])
+    digest = hashlib.sha1(f'{source}|{dataset_version(source)}|{query}'.encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def aggregate_response():
+    """
+    Answers GET /api/v1/aggregate with the metrics of the processed incidents grouped by dimensions.
+
+    For example /api/v1/aggregate?group_by=Year,Region&metric=fatalities&filter=Region:Europe.
+    Responses carry an ETag keyed on the dataset version, so a conditional request with
+    If-None-Match gets a 304 without the aggregation being run again.
+
+    Returns:
+        flask.Response: The JSON rows, a 304, or a JSON error with status 400.
+    """
+    try:
+        group_by, metrics, filters = parse_aggregate_query(request.args)
+    except QueryError as error:
+        return Response(json.dumps({'error': str(error)}), status=400, mimetype='application/json')
+
+    source = aggregate_source(group_by, filters)
+    etag = query_etag(source, group_by, metrics, filters)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        rows = aggregate(group_by, metrics, filters, source)
+        response = Response(json.dumps({'group_by': group_by, 'metrics': metrics, 'rows': rows}),
+                            mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={API_MAX_AGE}'
+    return response
+
+
+def register_api_routes(server):
+    """Adds the read-only JSON API to the Flask server of the app."""
+    server.add_url_rule('/api/v1/aggregate', 'api_aggregate', aggregate_response, methods=['GET'])
@@ -0,0 +1,192 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import RowColumns
+from .datastore import get_dataset, dataset_version
+
+BITMAP_MAX_VALUES = 128
+INDEX_MAX_SHARE = 0.5
+POSTING_MAX_VALUES = 32
+
+# Number of set bits of every byte value.
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+class Bitmap:
+    """A set of row positions packed one bit per row, combined with & (AND), | (OR) and ~ (NOT)."""
+
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def filled(cls, size, value=True):
+        """Returns the bitmap of all rows, or of none with value=False."""
+        bits = np.full((size + 7) // 8, 0xFF if value else 0, dtype=np.uint8)
+        if value and size % 8:
+            bits[-1] = (0xFF << (8 - size % 8)) & 0xFF
+        return cls(bits, size)
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        return Bitmap(~self.bits, self.size) & Bitmap.filled(self.size)
+
+    def count(self):
+        """Returns the number of rows in the bitmap, without unpacking it."""
+        return int(POPCOUNT[self.bits].sum())
+
+    def mask(self):
+        """Unpacks the bitmap into a boolean mask over the rows."""
+        return np.unpackbits(self.bits, count=self.size).view(bool)
+
+    def positions(self):
+        """Returns the positions of the rows in the bitmap, in row order."""
+        return np.flatnonzero(self.mask())
+
+
+class BitmapIndex:
+    """
+    An index over the categorical columns of a dataset, built once per dataset version.
+
+    Columns with at most BITMAP_MAX_VALUES values keep one packed bitmap per value, so an IN
+    predicate is an OR of bitmaps. Columns with more values keep the row positions sorted by code,
+    and an IN predicate sets the bits of the positions of its values. Predicates matching many
+    values of such a column are evaluated through the codes instead. Either way, predicates are
+    answered as Bitmaps, combined with bitwise operations and counted without building the rows.
+    """
+
+    def __init__(self, columns, dimensions, version=None):
+        self.columns = columns
+        self.version = version
+        self.size = len(columns)
+        self._bitmaps = {}
+        self._postings = {}
+        for dimension in dimensions:
+            codes, labels = columns.codes(dimension)
+            if len(labels) <= BITMAP_MAX_VALUES:
+                # One value at a time, so building needs one boolean row mask rather than one per value.
+                bitmaps = np.empty((len(labels), (self.size + 7) // 8), dtype=np.uint8)
+                for code in range(len(labels)):
+                    bitmaps[code] = np.packbits(codes == code)
+                self._bitmaps[dimension] = bitmaps
+            else:
+                order = np.argsort(codes, kind='stable').astype(np.int32)
+                offsets = np.concatenate([[0], np.cumsum(np.bincount(codes.astype(np.int64) + 1,
+                                                                     minlength=len(labels) + 1))])
+                self._postings[dimension] = order, offsets
+
+    @property
+    def rows(self):
+        """The data frame the index was built on."""
+        return self.columns.rows
+
+    def __contains__(self, dimension):
+        return dimension in self._bitmaps or dimension in self._postings
+
+    def all(self):
+        return Bitmap.filled(self.size)
+
+    def matching(self, dimension, value_mask):
+        """
+        Returns the rows whose value in a dimension is one of the values selected by a mask.
+
+        Args:
+            dimension (str): An indexed column.
+            value_mask (np.ndarray): A boolean per label of the column. Missing values never match.
+
+        Returns:
+            Bitmap: The matching rows.
+        """
+        selected = np.flatnonzero(value_mask)
+        if len(selected) == 0:
+            return Bitmap.filled(self.size, False)
+        if dimension in self._bitmaps:
+            return Bitmap(np.bitwise_or.reduce(self._bitmaps[dimension][selected], axis=0), self.size)
+        if len(selected) > POSTING_MAX_VALUES:
+            codes = self.columns.codes(dimension)[0]
+            return Bitmap.from_mask(np.append(value_mask, False)[codes])
+        order, offsets = self._postings[dimension]
+        # Offsets start with the rows whose value is missing, which have the code -1.
+        mask = np.zeros(self.size, dtype=bool)
+        mask[np.concatenate([order[offsets[code + 1]:offsets[code + 2]] for code in selected])] = True
+        return Bitmap.from_mask(mask)
+
+    def isin(self, dimension, values):
+        """Returns the rows whose value in a dimension is one of the given values (IN predicate)."""
+        return self.matching(dimension, np.asarray(self.columns.codes(dimension)[1].isin(values)))
+
+    def equals(self, dimension, value):
+        """Returns the rows whose value in a dimension is the given value (equality predicate)."""
+        return self.isin(dimension, [value])
+
+    def value_counts(self, dimension, bitmap=None):
+        """
+        Counts the rows of a bitmap per value of a dimension, without building the rows.
+
+        Args:
+            dimension (str): An indexed column.
+            bitmap (Bitmap, optional): The rows to count. Defaults to all rows.
+
+        Returns:
+            pd.Series: The number of rows per label.
+        """
+        codes, labels = self.columns.codes(dimension)
+        if dimension in self._bitmaps:
+            bits = self._bitmaps[dimension] if bitmap is None else self._bitmaps[dimension] & bitmap.bits
+            counts = POPCOUNT[bits].sum(axis=1)
+        else:
+            codes = codes if bitmap is None else codes[bitmap.mask()]
+            counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        return pd.Series(counts, index=labels)
+
+
+def indexed_dimensions(data):
+    """Lists the categorical columns whose number of values is at most INDEX_MAX_SHARE of the rows."""
+    return [column for column in data.columns
+            if isinstance(data[column].dtype, pd.CategoricalDtype)
+            and len(data[column].cat.categories) <= INDEX_MAX_SHARE * max(len(data), 1)]
+
+
+def build_index(data, version=None):
+    """Builds the index of a data frame over its indexed dimensions, and over Year when it has dates."""
+    dimensions = indexed_dimensions(data)
+    if 'Date' in data.columns and 'Year' not in dimensions:
+        dimensions.append('Year')
+    return BitmapIndex(RowColumns(data), dimensions, version)
+
+
+def dataset_index(filename):
+    """
+    Returns the index of a dataset, built when the dataset is loaded or replaced by a new version.
+
+    Args:
+        filename (str): Name of the dataset file.
+
+    Returns:
+        BitmapIndex: The index, whose rows and version are those of the dataset it was built on.
+    """
+    version = dataset_version(filename)
+    with _lock:
+        entry = _indexes.get(filename)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    index = build_index(get_dataset(filename), version)
+    with _lock:
+        _indexes[filename] = (version, index)
+    return index
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT = 2
+META_KEY = '__meta__'
+
+
+def cache_path(csv_path):
+    """Returns the path of the binary cache kept next to a CSV file."""
+    return os.path.splitext(csv_path)[0] + '.npz'
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """Returns the SHA-1 digest of a file's content."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_stamp(file_path, with_digest=True):
+    """
+    Describes the state of a source file so a cache built from it can be validated later.
+
+    Args:
+        file_path (str): Path of the source file.
+        with_digest (bool): Whether to hash the content as well.
+
+    Returns:
+        dict: The modification time, size and optionally the content digest.
+    """
+    stat = os.stat(file_path)
+    stamp = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_digest:
+        stamp['sha1'] = file_digest(file_path)
+    return stamp
+
+
+def _is_masked_dtype(dtype):
+    return pd.api.types.is_extension_array_dtype(dtype) and hasattr(dtype, 'numpy_dtype')
+
+
+def pack_strings(values):
+    """Packs strings into one UTF-8 byte array, separated by NUL characters."""
+    return np.frombuffer('\x00'.join(values).encode('utf-8'), dtype=np.uint8)
+
+
+def unpack_strings(packed, count):
+    """Unpacks the strings packed by pack_strings into an object array."""
+    values = np.empty(count, dtype=object)
+    if count:
+        values[:] = packed.tobytes().decode('utf-8').split('\x00')
+    return values
+
+
+def _packable(values):
+    return all(isinstance(value, str) and '\x00' not in value for value in values)
+
+
+def encode_columns(data):
+    """
+    Splits a data frame into plain numpy arrays that can be stored without pickling.
+
+    Categoricals and object columns are stored as codes plus categories, nullable integers as
+    values plus mask, datetimes and plain numeric columns as they are.
+
+    Args:
+        data (pd.DataFrame): The data to encode.
+
+    Returns:
+        tuple: A dict of named arrays and a list describing each column, or None when a column
+        holds values that cannot be encoded.
+    """
+    arrays = {}
+    columns = []
+    for i, name in enumerate(data.columns):
+        series = data[name]
+        dtype = series.dtype
+        key = f'c{i}'
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            arrays[f'{key}.codes'] = series.cat.codes.to_numpy()
+            column = {'name': name, 'kind': 'category', 'ordered': bool(dtype.ordered)}
+            if categories.dtype == object:
+                if not _packable(categories):
+                    return None
+                arrays[f'{key}.categories'] = pack_strings(categories)
+                column['strings'] = len(categories)
+            else:
+                arrays[f'{key}.categories'] = categories.to_numpy()
+            columns.append(column)
+        elif _is_masked_dtype(dtype):
+            arrays[f'{key}.values'] = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            arrays[f'{key}.mask'] = series.isna().to_numpy()
+            columns.append({'name': name, 'kind': 'masked', 'dtype': dtype.name})
+        elif dtype == object:
+            codes, uniques = pd.factorize(series)
+            if not _packable(uniques):
+                return None
+            arrays[f'{key}.codes'] = codes
+            arrays[f'{key}.categories'] = pack_strings(uniques)
+            columns.append({'name': name, 'kind': 'object', 'strings': len(uniques)})
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+            arrays[f'{key}.values'] = series.to_numpy()
+            columns.append({'name': name, 'kind': 'numpy'})
+        else:
+            return None
+    return arrays, columns
+
+
+def decode_columns(arrays, columns):
+    """
+    Rebuilds a data frame from the arrays produced by encode_columns.
+
+    Args:
+        arrays (Mapping): The named arrays.
+        columns (list): The column descriptions.
+
+    Returns:
+        pd.DataFrame: The decoded data.
+    """
+    decoded = {}
+    for i, column in enumerate(columns):
+        key = f'c{i}'
+        kind = column['kind']
+        if kind == 'category':
+            categories = arrays[f'{key}.categories']
+            if 'strings' in column:
+                categories = unpack_strings(categories, column['strings'])
+            dtype = pd.CategoricalDtype(categories, ordered=column['ordered'])
+            decoded[column['name']] = pd.Categorical.from_codes(arrays[f'{key}.codes'], dtype=dtype)
+        elif kind == 'masked':
+            array_type = pd.api.types.pandas_dtype(column['dtype']).construct_array_type()
+            decoded[column['name']] = array_type(arrays[f'{key}.values'], arrays[f'{key}.mask'])
+        elif kind == 'object':
+            codes = arrays[f'{key}.codes']
+            values = unpack_strings(arrays[f'{key}.categories'], column['strings'])[codes]
+            values[codes < 0] = np.nan
+            decoded[column['name']] = values
+        else:
+            decoded[column['name']] = arrays[f'{key}.values']
+    return pd.DataFrame(decoded, copy=False)
+
+
+def write_cache(path, data, stamp):
+    """
+    Writes a data frame to a binary cache, replacing any previous cache atomically.
+
+    Args:
+        path (str): Path of the cache file.
+        data (pd.DataFrame): The data to store.
+        stamp (dict): State of the source file the data was built from.
+
+    Returns:
+        bool: Whether the cache was written.
+    """
+    encoded = encode_columns(data)
+    if encoded is None:
+        return False
+    arrays, columns = encoded
+    meta = {'format': CACHE_FORMAT, 'source': stamp, 'columns': columns}
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, **arrays, **{META_KEY: np.array(json.dumps(meta))})
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def read_cache(path, source_path):
+    """
+    Reads a binary cache if it was built from the current state of its source file.
+
+    The cache is accepted when the source's modification time and size still match, or when only
+    the modification time changed and the content digest still matches.
+
+    Args:
+        path (str): Path of the cache file.
+        source_path (str): Path of the source file.
+
+    Returns:
+        pd.DataFrame: The cached data, or None when the cache is missing or stale.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            meta = json.loads(str(arrays[META_KEY]))
+            if meta.get('format') != CACHE_FORMAT:
+                return None
+            cached = meta['source']
+            current = source_stamp(source_path, with_digest=False)
+            if current['size'] != cached['size']:
+                return None
+            if current['mtime_ns'] != cached['mtime_ns'] and file_digest(source_path) != cached['sha1']:
+                return None
+            return decode_columns(arrays, meta['columns'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def read_cached_csv(csv_path, prepare=None):
+    """
+    Loads a CSV file through its binary cache, rebuilding the cache when the CSV has changed.
+
+    Args:
+        csv_path (str): Path of the CSV file.
+        prepare (callable, optional): Casts the freshly parsed data before it is cached.
+
+    Returns:
+        pd.DataFrame: The data.
+    """
+    path = cache_path(csv_path)
+    data = read_cache(path, csv_path)
+    if data is not None:
+        return data
+
+    stamp = source_stamp(csv_path)
+    data = pd.read_csv(csv_path)
+    if prepare is not None:
+        data = prepare(data)
+    write_cache(path, data, stamp)
+    return data
+
+
+def concat_rows(data, rows):
+    """
+    Appends rows to a data frame, merging the categories of categorical columns.
+
+    Args:
+        data (pd.DataFrame): The data.
+        rows (pd.DataFrame): Rows with the same columns and dtypes.
+
+    Returns:
+        pd.DataFrame: The combined data, with sorted categories like a fresh parse.
+    """
+    columns = {}
+    for name in data.columns:
+        head, tail = data[name], rows[name]
+        if isinstance(head.dtype, pd.CategoricalDtype):
+            categorical = pd.api.types.union_categoricals([head, tail.astype('category')], sort_categories=True)
+            columns[name] = pd.Series(categorical, name=name)
+        else:
+            columns[name] = pd.concat([head, tail], ignore_index=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+def extend_cache(csv_path, data, rows):
+    """
+    Updates the binary cache of a CSV file to which rows were just appended, without parsing it again.
+
+    Args:
+        csv_path (str): Path of the CSV file.
+        data (pd.DataFrame): The data cached before the rows were appended.
+        rows (pd.DataFrame): The appended rows, cast like the cached data.
+
+    Returns:
+        bool: Whether the cache was written.
+    """
+    try:
+        combined = concat_rows(data, rows)
+    except TypeError:
+        return False
+    return write_cache(cache_path(csv_path), combined, source_stamp(csv_path))
@@ -0,0 +1,153 @@
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+COMPACT_MODEL_FORMAT = 1
+STATE_SPACE_MATRICES = ['design', 'obs_intercept', 'obs_cov', 'transition', 'state_intercept', 'selection',
+                        'state_cov']
+
+
+def _constant_matrix(ssm, name):
+    """Returns a system matrix, collapsing a time-varying one that holds the same value at every time."""
+    matrix = np.asarray(ssm[name])
+    dimensions = 1 if name in ('obs_intercept', 'state_intercept') else 2
+    if matrix.ndim > dimensions:
+        if not np.allclose(matrix, matrix[..., -1:]):
+            raise ValueError(f"The {name} matrix varies over time, which the compact format cannot store")
+        matrix = matrix[..., -1]
+    return matrix
+
+
+class CompactPrediction:
+    """The forecast of a CompactARIMA, mirroring the parts of statsmodels' PredictionResults the app uses."""
+
+    def __init__(self, predicted_mean, variance):
+        self.predicted_mean = predicted_mean
+        self.var_pred_mean = variance
+
+    def conf_int(self, alpha=0.05):
+        """Returns the lower and upper bounds of the forecast's confidence interval."""
+        spread = NormalDist().inv_cdf(1 - alpha / 2) * np.sqrt(self.var_pred_mean.to_numpy())
+        mean = self.predicted_mean.to_numpy()
+        return pd.DataFrame({'lower': mean - spread, 'upper': mean + spread}, index=self.predicted_mean.index)
+
+
+class CompactARIMA:
+    """
+    A fitted ARIMA model reduced to what forecasting needs: its orders, parameters, the state-space
+    system matrices and the predicted state after the last observation.
+
+    Forecasts run the Kalman prediction recursions with numpy, so they equal the forecasts of the
+    statsmodels results the model was built from without importing statsmodels or unpickling its
+    classes. The file format is plain JSON and does not depend on the installed library versions.
+    """
+
+    def __init__(self, order, seasonal_order, param_names, params, matrices, state, state_cov, last_index, freq,
+                 nobs, metadata=None):
+        self.order = list(order)
+        self.seasonal_order = list(seasonal_order)
+        self.param_names = list(param_names)
+        self.params = np.asarray(params, dtype=float)
+        self.matrices = {name: np.asarray(matrices[name], dtype=float) for name in STATE_SPACE_MATRICES}
+        self.state = np.asarray(state, dtype=float)
+        self.state_cov = np.asarray(state_cov, dtype=float)
+        self.last_index = pd.Timestamp(last_index)
+        self.freq = freq
+        self.nobs = int(nobs)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_results(cls, model_fit, metadata=None):
+        """
+        Extracts the compact model from fitted statsmodels ARIMA results.
+
+        Args:
+            model_fit: The fitted ARIMA results object.
+            metadata (dict, optional): Additional JSON-compatible information to store.
+
+        Returns:
+            CompactARIMA: The compact model.
+        """
+        model = model_fit.model
+        index = model._index
+        return cls(
+            order=model.order,
+            seasonal_order=model.seasonal_order,
+            param_names=model_fit.param_names,
+            params=model_fit.params,
+            matrices={name: _constant_matrix(model.ssm, name) for name in STATE_SPACE_MATRICES},
+            state=model_fit.predicted_state[:, -1],
+            state_cov=model_fit.predicted_state_cov[:, :, -1],
+            last_index=index[-1],
+            freq=index.freqstr,
+            nobs=model_fit.nobs,
+            metadata={'aic': float(model_fit.aic), 'bic': float(model_fit.bic), **(metadata or {})},
+        )
+
+    def to_dict(self):
+        return {
+            'format': COMPACT_MODEL_FORMAT,
+            'kind': 'arima',
+            'order': self.order,
+            'seasonal_order': self.seasonal_order,
+            'param_names': self.param_names,
+            'params': self.params.tolist(),
+            'matrices': {name: matrix.tolist() for name, matrix in self.matrices.items()},
+            'state': self.state.tolist(),
+            'state_cov': self.state_cov.tolist(),
+            'last_index': self.last_index.strftime('%Y-%m-%d'),
+            'freq': self.freq,
+            'nobs': self.nobs,
+            'metadata': self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('format') != COMPACT_MODEL_FORMAT or data.get('kind') != 'arima':
+            raise ValueError(f"Unsupported compact model format: {data.get('format')}")
+        return cls(data['order'], data['seasonal_order'], data['param_names'], data['params'], data['matrices'],
+                   data['state'], data['state_cov'], data['last_index'], data['freq'], data['nobs'],
+                   data.get('metadata'))
+
+    def save(self, path):
+        """Writes the model as JSON through a temporary file."""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.to_dict(), file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def get_forecast(self, steps=1):
+        """
+        Forecasts the next steps periods with the variance of each forecast.
+
+        Args:
+            steps (int): Number of periods to forecast.
+
+        Returns:
+            CompactPrediction: The forecast, with predicted_mean and conf_int like statsmodels.
+        """
+        m = self.matrices
+        design, transition, selection = m['design'], m['transition'], m['selection']
+        state_noise = selection @ m['state_cov'] @ selection.T
+        state, state_cov = self.state, self.state_cov
+        means, variances = np.empty(steps), np.empty(steps)
+        for step in range(steps):
+            means[step] = (design @ state + m['obs_intercept'])[0]
+            variances[step] = (design @ state_cov @ design.T + m['obs_cov'])[0, 0]
+            state = transition @ state + m['state_intercept']
+            state_cov = transition @ state_cov @ transition.T + state_noise
+        index = pd.date_range(self.last_index, periods=steps + 1, freq=self.freq)[1:]
+        return CompactPrediction(pd.Series(means, index=index, name='predicted_mean'),
+                                 pd.Series(variances, index=index, name='var_pred_mean'))
+
+    def forecast(self, steps=1):
+        """Returns the point forecast of the next steps periods."""
+        return self.get_forecast(steps).predicted_mean
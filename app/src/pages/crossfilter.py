@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from .aggregates import RowSelection
+from .bitmap_index import Bitmap
+
+YEAR_FILTER = 'Year'
+FILTER_COLUMNS = ['Region', 'Country', 'Crash cause', 'Operator']
+
+
+def year_bounds(columns):
+    """Returns the first and last year of the processed incidents, given as their RowColumns."""
+    years = columns.codes(YEAR_FILTER)[1]
+    return int(years[0]), int(years[-1])
+
+
+def normalize_filters(filters, bounds=None):
+    """
+    Drops the parts of a filter that select everything.
+
+    Args:
+        filters (dict): The year range under YEAR_FILTER and the values to keep under any of FILTER_COLUMNS.
+        bounds (tuple, optional): The first and last year of the data. A year range covering them is dropped.
+
+    Returns:
+        dict: The filter with sorted values and without empty parts, empty when nothing is filtered.
+    """
+    normalized = {}
+    years = (filters or {}).get(YEAR_FILTER)
+    if years:
+        first, last = int(min(years)), int(max(years))
+        if bounds is None or first > bounds[0] or last < bounds[1]:
+            normalized[YEAR_FILTER] = [first, last]
+    for column in FILTER_COLUMNS:
+        values = (filters or {}).get(column)
+        if values:
+            normalized[column] = sorted(set(values))
+    return normalized
+
+
+def filters_key(filters):
+    """Turns a normalized filter into a hashable key for the figure cache."""
+    return tuple((column, tuple(values)) for column, values in sorted(filters.items()))
+
+
+def selection_bitmap(index, filters):
+    """
+    Evaluates the combined predicates of a filter as one Bitmap of the matching rows.
+
+    The year range is an OR of the bitmaps of its years and every filter column an OR of the bitmaps
+    of its values, all combined with AND, so no column is copied or compared as text.
+
+    Args:
+        index (BitmapIndex): The index of the processed incidents.
+        filters (dict): A normalized filter.
+
+    Returns:
+        Bitmap: The matching rows.
+    """
+    bitmap = index.all()
+    if YEAR_FILTER in filters:
+        first, last = filters[YEAR_FILTER]
+        years = index.columns.codes(YEAR_FILTER)[1]
+        bitmap &= index.matching(YEAR_FILTER, (years >= first) & (years <= last))
+    for column in FILTER_COLUMNS:
+        if column in filters:
+            bitmap &= values_bitmap(index, column, filters[column])
+    return bitmap
+
+
+def values_bitmap(index, column, values):
+    """Returns the rows whose value in a column, or their year, is one of the given values (IN predicate)."""
+    if column in index:
+        return index.isin(column, values)
+    codes, labels = index.columns.codes(column)
+    return Bitmap.from_mask(np.append(labels.isin(values), False)[codes])
+
+
+def selection_mask(index, filters):
+    """Evaluates the combined predicates of a filter as one boolean mask over the rows."""
+    return selection_bitmap(index, filters).mask()
+
+
+def select_rows(index, filters):
+    """Returns the rows matching a normalized filter as a RowSelection for group_totals."""
+    return RowSelection(index.columns, selection_mask(index, filters))
+
+
+def select_values(index, values):
+    """
+    Returns the rows whose values are among the given ones in every listed column, as a RowSelection.
+
+    Unlike a filter of the Analysis page, years are listed one by one rather than as a range.
+
+    Args:
+        index (BitmapIndex): The index of the processed incidents.
+        values (dict): The values to keep by column, Year included.
+
+    Returns:
+        RowSelection: The matching rows, for group_totals.
+    """
+    bitmap = index.all()
+    for column, column_values in values.items():
+        bitmap &= values_bitmap(index, column, column_values)
+    return RowSelection(index.columns, bitmap.mask())
+
+
+def filter_options(index, column, search=None, selected=None, limit=None):
+    """
+    Lists the values of a filter column as dropdown options, most frequent first.
+
+    Args:
+        index (BitmapIndex): The index of the processed incidents, counting the rows per value.
+        column (str): One of FILTER_COLUMNS.
+        search (str, optional): Text the values must contain, ignoring case.
+        selected (list, optional): Values to list whatever the search and limit.
+        limit (int, optional): Number of values to list besides the selected ones.
+
+    Returns:
+        list: The options as label and value dicts.
+    """
+    if column in index:
+        counts = index.value_counts(column).sort_values(ascending=False, kind='stable')
+    else:
+        counts = index.rows[column].value_counts()
+    values = counts.index[counts > 0]
+    if search:
+        values = values[pd.Series(values).str.contains(search, case=False, regex=False).to_numpy()]
+    values = list(values[:limit] if limit else values)
+    values += [value for value in selected or [] if value not in values]
+    return [{'label': value, 'value': value} for value in values]
@@ -1,14 +1,11 @@
-import os
-import pandas as pd
-from reportlab.pdfgen import canvas
 from dash import html, dcc, register_page, callback, Output, Input, State, dash_table
 import dash_bootstrap_components as dbc
 import dash
-from flask import send_file, Flask
-from .helpers import load_data
-
-app = Flask(__name__)
-app = dash.Dash(__name__, server=app, external_stylesheets=[dbc.themes.BOOTSTRAP])
+from .datastore import get_dataset, RAW_DATA, PROCESSED_DATA
+from .export import export_csv_url
+from .jobs import JOBS, DONE, FINISHED
+from .table_query import query_page, page_count
+from .text_search import search_rows
 
 register_page(
     __name__,
@@ -17,8 +14,31 @@ register_page(
     path='/data'
 )
 
-raw_data = pd.read_csv(load_data('crashes-raw.csv'))
-processed_data = pd.read_csv(load_data('crashes-processed.csv'))
+PAGE_SIZE = 20
+JOB_POLL_INTERVAL = 1000
+HIDDEN = {'display': 'none'}
+
+
+def is_raw_selected(raw_timestamp, processed_timestamp):
+    return processed_timestamp is None or (raw_timestamp is not None and raw_timestamp > processed_timestamp)
+
+
+def selected_dataset(raw_timestamp, processed_timestamp):
+    """Returns the name of the dataset file picked by the Raw/Processed buttons."""
+    return RAW_DATA if is_raw_selected(raw_timestamp, processed_timestamp) else PROCESSED_DATA
+
+
+def select_data(raw_timestamp, processed_timestamp):
+    """Returns the shared dataset picked by the Raw/Processed buttons."""
+    return get_dataset(selected_dataset(raw_timestamp, processed_timestamp))
+
+
+def display_frame(data):
+    """Formats the date columns of a data frame the way they appear in the CSV files."""
+    data = data.copy(deep=False)
+    for column in data.select_dtypes(include='datetime').columns:
+        data[column] = data[column].dt.strftime('%Y-%m-%d')
+    return data
 
 
 def layout():
@@ -30,120 +50,171 @@ def layout():
             ],
             style={'margin': '20px'}
         ),
-        html.Div(id='data-table-container'),
+        dbc.Input(id='data-search', type='search', debounce=True,
+                  placeholder="Search operators, aircraft, routes and countries",
+                  style={'margin': '0 20px 20px', 'width': '500px'}),
+        dcc.Loading(
+            html.Div([
+                dash_table.DataTable(
+                    id='data-table',
+                    page_current=0,
+                    page_size=PAGE_SIZE,
+                    style_table={'height': '700px', 'overflowY': 'auto'},
+                    filter_action='custom',
+                    filter_query='',
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    page_action='custom',
+                    style_cell={'textAlign': 'left', 'minWidth': '100px', 'width': '150px', 'maxWidth': '200px'},
+                    style_header={'backgroundColor': 'white', 'fontWeight': 'bold'}
+                ),
+                html.Div(id='data-table-count', style={'margin-top': '10px'})
+            ], id='data-table-container'),
+            color='primary'
+        ),
         html.Div([
-            dbc.Button("Export to CSV", id="export-csv-button", className="mr-2"),
-            dcc.Download(id="download-csv"),
+            dbc.Button("Export to CSV", id="export-csv-button", className="mr-2", external_link=True,
+                       href=export_csv_url('raw')),
+            dbc.Checkbox(id="export-csv-gzip", label="gzip", value=False,
+                         style={'display': 'inline-block', 'margin': '0 20px'}),
             dbc.Button("Export to PDF", id="export-pdf-button"),
-            dcc.Download(id="download-pdf")
+            dbc.Button("Cancel", id="cancel-pdf-button", color="secondary", style=HIDDEN),
+            dcc.Download(id="download-pdf"),
+            dcc.Store(id="pdf-job"),
+            dcc.Interval(id="pdf-job-poll", interval=JOB_POLL_INTERVAL, disabled=True),
+            dbc.Progress(id="pdf-job-progress", value=0, style=HIDDEN),
+            html.Div(id="pdf-job-status")
         ], style={'margin': '20px'})
     ])
 
 
 @callback(
-    Output('data-table-container', 'children'),
+    Output('data-table', 'columns'),
+    Output('data-table', 'page_current'),
     Output('raw-button', 'style'),
     Output('processed-button', 'style'),
     Input('raw-button', 'n_clicks'),
     Input('processed-button', 'n_clicks'),
+    Input('data-search', 'value'),
     State('raw-button', 'n_clicks_timestamp'),
     State('processed-button', 'n_clicks_timestamp')
 )
-def update_table_and_buttons(raw_clicks, processed_clicks, raw_timestamp, processed_timestamp):
-    if processed_timestamp is None or (raw_timestamp is not None and raw_timestamp > processed_timestamp):
-        data = raw_data
+def update_table_and_buttons(raw_clicks, processed_clicks, search, raw_timestamp, processed_timestamp):
+    data = select_data(raw_timestamp, processed_timestamp)
+    if is_raw_selected(raw_timestamp, processed_timestamp):
         raw_style = {'background-color': 'lightblue'}
         processed_style = {'background-color': 'darkgrey'}
     else:
-        data = processed_data
         raw_style = {'background-color': 'darkgrey'}
         processed_style = {'background-color': 'lightblue'}
 
-    return dash_table.DataTable(
-        columns=[{"name": i, "id": i} for i in data.columns],
-        data=data.to_dict('records'),
-        page_size=20,
-        style_table={'height': '700px', 'overflowY': 'auto'},
-        filter_action='native',
-        sort_action='native',
-        sort_mode='multi',
-        page_action='native',
-        style_cell={'textAlign': 'left', 'minWidth': '100px', 'width': '150px', 'maxWidth': '200px'},
-        style_header={'backgroundColor': 'white', 'fontWeight': 'bold'}
-    ), raw_style, processed_style
+    return [{"name": i, "id": i} for i in data.columns], 0, raw_style, processed_style
 
 
 @callback(
-    Output('download-csv', 'data'),
-    Input('export-csv-button', 'n_clicks'),
+    Output('data-table', 'data'),
+    Output('data-table', 'page_count'),
+    Output('data-table-count', 'children'),
+    Input('data-table', 'page_current'),
+    Input('data-table', 'page_size'),
+    Input('data-table', 'sort_by'),
+    Input('data-table', 'filter_query'),
+    Input('data-search', 'value'),
+    Input('raw-button', 'n_clicks'),
+    Input('processed-button', 'n_clicks'),
     State('raw-button', 'n_clicks_timestamp'),
-    State('processed-button', 'n_clicks_timestamp'),
-    prevent_initial_call=True
+    State('processed-button', 'n_clicks_timestamp')
 )
-def export_csv(n_clicks, raw_timestamp, processed_timestamp):
-    if processed_timestamp is None or (raw_timestamp is not None and raw_timestamp > processed_timestamp):
-        data = raw_data
-    else:
-        data = processed_data
-    csv_path = os.path.join(os.path.expanduser('~'), 'Downloads', 'exported_data.csv')
-    data.to_csv(csv_path, index=False)
-    return dcc.send_file(csv_path)
+def update_table_page(page_current, page_size, sort_by, filter_query, search, raw_clicks, processed_clicks,
+                      raw_timestamp, processed_timestamp):
+    """
+    Filters and sorts the selected dataset on the server and sends only the rows of the current page.
+
+    With a search, the rows are those found by the search index, best matches first unless the
+    table is sorted.
+    """
+    index, positions = search_rows(selected_dataset(raw_timestamp, processed_timestamp), search)
+    page, total_rows = query_page(index.rows, page_current, page_size or PAGE_SIZE, filter_query, sort_by, index,
+                                  positions)
+    return display_frame(page).to_dict('records'), page_count(total_rows, page_size or PAGE_SIZE), \
+        f'{total_rows} rows'
 
 
 @callback(
-    Output('download-pdf', 'data'),
+    Output('export-csv-button', 'href'),
+    Input('data-table', 'filter_query'),
+    Input('data-table', 'sort_by'),
+    Input('export-csv-gzip', 'value'),
+    Input('data-search', 'value'),
+    Input('raw-button', 'n_clicks'),
+    Input('processed-button', 'n_clicks'),
+    State('raw-button', 'n_clicks_timestamp'),
+    State('processed-button', 'n_clicks_timestamp')
+)
+def update_export_link(filter_query, sort_by, compress, search, raw_clicks, processed_clicks, raw_timestamp,
+                       processed_timestamp):
+    """Points the CSV export at the streaming endpoint with the table's current search, filter and sort."""
+    source = 'raw' if is_raw_selected(raw_timestamp, processed_timestamp) else 'processed'
+    return export_csv_url(source, filter_query, sort_by, compress, search)
+
+
+def export_pdf_job(job, filename):
+    """Prints a dataset into a PDF file of the job, reporting progress after every rendered part."""
+    from .pdf_export import generate_pdf
+
+    data = display_frame(get_dataset(filename))
+    pdf_path = job.result_path('.pdf')
+    generate_pdf(data, pdf_path, progress=lambda done, total: job.progress(
+        done, total, f'Rendered {done} of {total} parts'))
+    return pdf_path
+
+
+@callback(
+    Output('pdf-job', 'data'),
+    Output('pdf-job-poll', 'disabled'),
+    Output('cancel-pdf-button', 'disabled', allow_duplicate=True),
     Input('export-pdf-button', 'n_clicks'),
     State('raw-button', 'n_clicks_timestamp'),
     State('processed-button', 'n_clicks_timestamp'),
     prevent_initial_call=True
 )
 def export_pdf(n_clicks, raw_timestamp, processed_timestamp):
-    if processed_timestamp is None or (raw_timestamp is not None and raw_timestamp > processed_timestamp):
-        data = raw_data
-    else:
-        data = processed_data
-    pdf_path = os.path.join(os.path.expanduser('~'), 'Downloads', 'exported_data.pdf')
-    generate_pdf(data, pdf_path)
-    return dcc.send_file(pdf_path)
-
-
-def truncate_string(s, max_length):
-    if len(s) > max_length:
-        return s[:max_length] + '...'
-    return s
-
-
-def generate_pdf(data, pdf_path):
-    custom_page_width = 1800
-    custom_page_height = 600
-    c = canvas.Canvas(pdf_path, pagesize=(custom_page_width, custom_page_height))
-    width, height = custom_page_width, custom_page_height
-    font_size = 8
-    c.setFont("Helvetica", font_size)
-
-    x_offset = 40
-    y_offset = height - 40
-    row_height = 12
-
-    columns = data.columns.tolist()
-    col_widths = {col: (width - 2 * x_offset) / len(columns) for col in columns}
-    x_positions = [x_offset + sum(col_widths[columns[i]] for i in range(j)) for j in range(len(columns))]
-
-    for i, column in enumerate(columns):
-        c.drawString(x_positions[i], y_offset, truncate_string(column, 14))
-    y_offset -= row_height
-
-    for i, row in enumerate(data.itertuples(index=False, name=None)):
-        if y_offset < row_height:
-            c.showPage()
-            c.setFont("Helvetica", font_size)
-            y_offset = height - 40
-            for i, column in enumerate(columns):
-                c.drawString(x_positions[i], y_offset, truncate_string(column, 14))
-            y_offset -= row_height
-
-        for j, cell in enumerate(row):
-            c.drawString(x_positions[j], y_offset, truncate_string(str(cell), 14))
-        y_offset -= row_height
-
-    c.save()
+    """Starts the PDF export as a background job, so the request returns right away."""
+    filename = selected_dataset(raw_timestamp, processed_timestamp)
+    return {'id': JOBS.submit('pdf', export_pdf_job, filename)}, False, False
+
+
+@callback(
+    Output('download-pdf', 'data'),
+    Output('pdf-job-poll', 'disabled', allow_duplicate=True),
+    Output('pdf-job-progress', 'value'),
+    Output('pdf-job-progress', 'style'),
+    Output('pdf-job-status', 'children'),
+    Output('cancel-pdf-button', 'style'),
+    Input('pdf-job-poll', 'n_intervals'),
+    State('pdf-job', 'data'),
+    prevent_initial_call=True
+)
+def poll_pdf_job(n_intervals, job):
+    """Shows the progress of the PDF export job and downloads the file once it is done."""
+    state = JOBS.status(job['id']) if job else None
+    if state is None:
+        return dash.no_update, True, 0, HIDDEN, "The export has expired.", HIDDEN
+    progress = round(state['progress'] * 100)
+    if state['status'] not in FINISHED:
+        return dash.no_update, False, progress, {}, state['message'] or "Waiting to start...", {}
+    if state['status'] == DONE:
+        return dcc.send_file(state['result'], filename='exported_data.pdf'), True, 100, HIDDEN, "", HIDDEN
+    message = state['error'] or "The export was cancelled."
+    return dash.no_update, True, progress, HIDDEN, message, HIDDEN
+
+
+@callback(
+    Output('cancel-pdf-button', 'disabled'),
+    Input('cancel-pdf-button', 'n_clicks'),
+    State('pdf-job', 'data'),
+    prevent_initial_call=True
+)
+def cancel_pdf_job(n_clicks, job):
+    return bool(job) and JOBS.cancel(job['id'])
@@ -0,0 +1,157 @@
+import os
+import threading
+
+import pandas as pd
+
+from .aggregates import CUBE_DATA, CUBE_SCHEMA
+from .columnar_cache import read_cached_csv
+from .helpers import load_data
+from .shared_columns import shared_dataset
+
+RAW_DATA = 'crashes-raw.csv'
+PROCESSED_DATA = 'crashes-processed.csv'
+SHARED_FOLDER_VARIABLE = 'AIR_CRASHES_SHARED_FOLDER'
+
+DATASET_SCHEMAS = {
+    PROCESSED_DATA: {
+        'dates': ['Date'],
+        'categories': ['Season', 'Country', 'Region', 'Aircraft', 'Operator', 'Schedule', 'Survivors',
+                       'Crash cause'],
+        'integers': ['Total on board', 'Total fatalities'],
+    },
+    CUBE_DATA: CUBE_SCHEMA,
+}
+
+_lock = threading.Lock()
+_datasets = {}
+
+
+def file_version(file_path):
+    """
+    Builds a cheap version tag of a file from its modification time and size.
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        str: The version tag.
+    """
+    stat = os.stat(file_path)
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def cast_columns(data, schema):
+    """
+    Casts the columns of a freshly parsed dataset to the dtypes of its schema.
+
+    Args:
+        data (pd.DataFrame): The parsed dataset.
+        schema (dict): Column names grouped by 'dates', 'categories' and 'integers'.
+
+    Returns:
+        pd.DataFrame: The same data frame with cast columns.
+    """
+    for column in schema.get('dates', []):
+        data[column] = pd.to_datetime(data[column], errors='coerce')
+    for column in schema.get('categories', []):
+        data[column] = data[column].astype('category')
+    for column in schema.get('integers', []):
+        data[column] = pd.to_numeric(data[column], errors='coerce').astype('Int64')
+    return data
+
+
+def categorize_strings(data):
+    """
+    Casts the remaining text columns to categoricals.
+
+    A text column holds one Python object per row, whose reference counts are written whenever it is
+    read, so processes forked after loading it end up copying it. The codes of a categorical live in
+    a numpy buffer that they keep sharing.
+
+    Args:
+        data (pd.DataFrame): The cast dataset.
+
+    Returns:
+        pd.DataFrame: The same data frame without object columns.
+    """
+    for column in data.select_dtypes(include='object').columns:
+        data[column] = data[column].astype('category')
+    return data
+
+
+def read_dataset(filename):
+    """
+    Loads a dataset file from the data folder, cast to its schema, through its binary cache.
+
+    Args:
+        filename (str): Name of the file in the data folder.
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    schema = DATASET_SCHEMAS.get(filename, {})
+    return read_cached_csv(load_data(filename), lambda data: categorize_strings(cast_columns(data, schema)))
+
+
+def load_dataset(filename, version):
+    """
+    Loads a dataset into this process, or attaches it to the shared snapshot of its version.
+
+    When AIR_CRASHES_SHARED_FOLDER names a folder, the columns are published there once per version
+    as memory-mapped files, and every worker process on the host attaches read-only views of them,
+    so memory stays constant as workers are added.
+
+    Args:
+        filename (str): Name of the file in the data folder.
+        version (str): The version of the file.
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    folder = os.environ.get(SHARED_FOLDER_VARIABLE)
+    if folder:
+        return shared_dataset(folder, filename, version, lambda: read_dataset(filename))
+    return read_dataset(filename)
+
+
+def dataset_version(filename=PROCESSED_DATA):
+    """
+    Returns the version of a dataset file, which changes whenever the ETL rewrites it.
+
+    Args:
+        filename (str): Name of the file in the data folder.
+
+    Returns:
+        str: The version tag.
+    """
+    return file_version(load_data(filename))
+
+
+def get_dataset(filename=PROCESSED_DATA):
+    """
+    Returns a read-only handle of a dataset shared by the whole process.
+
+    The file is parsed once and parsed again only when its version changes. The handle is a shallow
+    copy, so callers may add or replace columns but must not modify values in place.
+
+    Args:
+        filename (str): Name of the file in the data folder.
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    version = dataset_version(filename)
+    entry = _datasets.get(filename)
+    if entry is None or entry[0] != version:
+        with _lock:
+            entry = _datasets.get(filename)
+            if entry is None or entry[0] != version:
+                entry = (version, load_dataset(filename, version))
+                _datasets[filename] = entry
+    return entry[1].copy(deep=False)
+
+
+def clear_datasets():
+    """Drops all loaded datasets, so the next access parses the files again."""
+    with _lock:
+        _datasets.clear()
@@ -0,0 +1,105 @@
+import json
+import zlib
+from urllib.parse import urlencode
+
+from flask import Response, abort, request, stream_with_context
+
+from .datastore import RAW_DATA, PROCESSED_DATA
+from .table_query import query_positions
+from .text_search import search_rows, search_terms
+
+EXPORT_SOURCES = {
+    'raw': RAW_DATA,
+    'processed': PROCESSED_DATA,
+}
+EXPORT_CHUNK_ROWS = 5000
+
+
+def iter_csv_chunks(data, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, compress=False):
+    """
+    Encodes rows of a data frame as CSV, one bounded chunk at a time.
+
+    Args:
+        data (pd.DataFrame): The data.
+        positions (np.ndarray, optional): Positions of the rows to export, in export order. Defaults to all rows.
+        chunk_rows (int): Number of rows encoded per chunk.
+        compress (bool): Whether to gzip the stream.
+
+    Yields:
+        bytes: The next part of the CSV file.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    total_rows = len(data) if positions is None else len(positions)
+
+    def encode(text):
+        chunk = text.encode('utf-8')
+        return compressor.compress(chunk) if compressor else chunk
+
+    yield encode(data.head(0).to_csv(index=False))
+    for start in range(0, total_rows, chunk_rows):
+        if positions is None:
+            rows = data.iloc[start:start + chunk_rows]
+        else:
+            rows = data.take(positions[start:start + chunk_rows])
+        yield encode(rows.to_csv(index=False, header=False, date_format='%Y-%m-%d'))
+    if compressor:
+        yield compressor.flush()
+
+
+def export_csv_url(source, filter_query=None, sort_by=None, compress=False, search=None):
+    """Builds the URL of the streaming CSV export for the given table state."""
+    params = {}
+    if search_terms(search):
+        params['search'] = search
+    if filter_query:
+        params['filter_query'] = filter_query
+    if sort_by:
+        params['sort_by'] = json.dumps(sort_by)
+    if compress:
+        params['gzip'] = '1'
+    url = f'/export/{source}.csv'
+    return f'{url}?{urlencode(params)}' if params else url
+
+
+def is_valid_sort_by(sort_by):
+    """Checks that a decoded sort_by parameter is a list of DataTable sort entries."""
+    return isinstance(sort_by, list) and all(
+        isinstance(entry, dict) and isinstance(entry.get('column_id'), str)
+        and entry.get('direction') in ('asc', 'desc')
+        for entry in sort_by)
+
+
+def export_csv_response(source):
+    """
+    Streams the selected dataset as CSV, searched, filtered and sorted like the DataTable.
+
+    Args:
+        source (str): 'raw' or 'processed'.
+
+    Returns:
+        flask.Response: The streamed CSV file.
+    """
+    if source not in EXPORT_SOURCES:
+        abort(404)
+    try:
+        sort_by = json.loads(request.args.get('sort_by', '[]'))
+    except ValueError:
+        abort(400)
+    if not is_valid_sort_by(sort_by):
+        abort(400)
+    compress = request.args.get('gzip') == '1'
+
+    index, positions = search_rows(EXPORT_SOURCES[source], request.args.get('search'))
+    data = index.rows
+    positions = query_positions(data, request.args.get('filter_query'), sort_by, index, positions)
+    filename = f'{source}_data.csv.gz' if compress else f'{source}_data.csv'
+    return Response(
+        stream_with_context(iter_csv_chunks(data, positions, compress=compress)),
+        mimetype='application/gzip' if compress else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+def register_export_routes(server):
+    """Adds the export endpoints to the Flask server of the app."""
+    server.add_url_rule('/export/<source>.csv', 'export_csv', export_csv_response)
@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+
+from .figure_json import compact_figure, dumps
+
+
+class FigureCache:
+    """
+    Memoizes serialized Plotly figures keyed by figure name, parameters and dataset version.
+
+    Figures are stored in the compact form of compact_figure, and their size is the length of that
+    form as JSON, which is what a callback sends for them.
+
+    Entries are evicted in least recently used order once either the entry count or the total size
+    of the serialized figures exceeds its bound. Returned figures are shared between callers and
+    must not be modified.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name, version, params):
+        return name, version, tuple(sorted((params or {}).items()))
+
+    def get_or_build(self, name, version, build, params=None):
+        """
+        Returns a cached figure or builds, serializes and stores it.
+
+        Args:
+            name (str): Name of the figure.
+            version (str): Version of the data the figure is built from.
+            build (callable): Builds the go.Figure when it is not cached.
+            params (dict, optional): Parameters the figure depends on. Values must be hashable.
+
+        Returns:
+            dict: The figure as a JSON-compatible dict.
+        """
+        key = self.make_key(name, version, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        figure = compact_figure(build())
+        self.put(key, figure, len(dumps(figure)))
+        return figure
+
+    def put(self, key, figure, size):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._entries[key] = (figure, size)
+            self.size_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+
+    def stats(self):
+        """Returns the hit and miss counters together with the current size of the cache."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self.size_bytes,
+            }
+
+    def figure_sizes(self):
+        """Returns the bytes of the cached figures by figure name, summed over their versions and parameters."""
+        sizes = {}
+        with self._lock:
+            for (name, _, _), (_, size) in self._entries.items():
+                sizes[name] = sizes.get(name, 0) + size
+        return sizes
+
+    def clear(self):
+        """Drops all cached figures and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+FIGURE_CACHE = FigureCache()
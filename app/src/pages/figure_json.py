@@ -0,0 +1,147 @@
+import base64
+import json
+import os
+import re
+
+import numpy as np
+from dash import dcc
+from plotly.io.json import to_json_plotly
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FLOAT_DIGITS = 6
+TYPED_ARRAY_MIN_LENGTH = 8
+TYPED_ARRAYS_SINCE = (2, 28)
+INTEGER_DTYPES = ['u1', 'i1', 'u2', 'i2', 'u4', 'i4']
+
+
+def bundled_plotly_js_version():
+    """Returns the version of the plotly.js bundled with dcc.Graph as a tuple, or None when it cannot be read."""
+    try:
+        with open(os.path.join(os.path.dirname(dcc.__file__), 'plotly.min.js')) as file:
+            header = file.read(200)
+    except OSError:
+        return None
+    match = re.search(r'plotly\.js v(\d+)\.(\d+)', header)
+    return tuple(int(part) for part in match.groups()) if match else None
+
+
+# plotly.js decodes base64 typed arrays from version 2.28 on. Older bundles get plain JSON lists.
+TYPED_ARRAYS = (bundled_plotly_js_version() or (0, 0)) >= TYPED_ARRAYS_SINCE
+
+
+def dumps(value):
+    """Serializes a JSON-compatible value to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """Parses JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def round_floats(values, digits=FLOAT_DIGITS):
+    """Rounds floats to a number of significant digits, which is more than plotly displays."""
+    return np.array([float(f'{value:.{digits}g}') for value in values.tolist()], dtype=float)
+
+
+def _numeric_array(value):
+    if isinstance(value, np.ndarray):
+        return value if value.ndim == 1 and value.dtype.kind in 'iuf' else None
+    if isinstance(value, (list, tuple)) and value and all(
+            isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+        return np.array(value)
+    return None
+
+
+def _integer_dtype(array):
+    if array.size == 0:
+        return INTEGER_DTYPES[0]
+    low, high = array.min(), array.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def encode_array(array, typed_arrays=TYPED_ARRAYS):
+    """
+    Encodes a numeric array of a trace in as few bytes as plotly reads back the same.
+
+    Floats holding whole numbers are sent as integers and other floats are rounded to FLOAT_DIGITS
+    significant digits. With typed_arrays, the array becomes a {'dtype', 'bdata'} object holding the
+    base64 of the smallest dtype that fits, unless the list is shorter, as for short arrays of small
+    numbers.
+
+    Args:
+        array (np.ndarray): A one-dimensional integer or float array.
+        typed_arrays (bool): Whether the browser's plotly.js reads base64 typed arrays.
+
+    Returns:
+        list | dict: The encoded array.
+    """
+    dtype = None
+    if array.dtype.kind == 'f' and np.isfinite(array).all() and (array == np.round(array)).all():
+        dtype = _integer_dtype(array)
+        if dtype is not None:
+            array = array.astype(np.int64)
+    elif array.dtype.kind in 'iu':
+        dtype = _integer_dtype(array)
+    if dtype is None:
+        if array.dtype.kind in 'iu':
+            array = array.astype(float)
+        array = round_floats(array)
+        dtype = 'f8'
+    values = array.tolist()
+    if typed_arrays and len(array) >= TYPED_ARRAY_MIN_LENGTH:
+        data = array.astype(np.dtype(dtype).newbyteorder('<')).tobytes()
+        typed = {'dtype': dtype, 'bdata': base64.b64encode(data).decode('ascii')}
+        if len(dumps(typed)) < len(dumps(values)):
+            return typed
+    return values
+
+
+def compact_value(value, typed_arrays=TYPED_ARRAYS):
+    """Encodes the numeric arrays nested in a trace with encode_array."""
+    if isinstance(value, dict):
+        return {key: compact_value(item, typed_arrays) for key, item in value.items()}
+    array = _numeric_array(value)
+    if array is not None:
+        return encode_array(array, typed_arrays)
+    if isinstance(value, (list, tuple)):
+        return [compact_value(item, typed_arrays) for item in value]
+    return value
+
+
+def prune_template(figure):
+    """Drops the trace defaults of the figure's template for trace types the figure does not have."""
+    template = figure.get('layout', {}).get('template')
+    if isinstance(template, dict) and isinstance(template.get('data'), dict):
+        types = {trace.get('type', 'scatter') for trace in figure['data']}
+        template['data'] = {name: traces for name, traces in template['data'].items() if name in types}
+    return figure
+
+
+def compact_figure(fig, typed_arrays=TYPED_ARRAYS):
+    """
+    Serializes a figure for callback responses with its numeric trace arrays compacted and its
+    template pruned.
+
+    Args:
+        fig (go.Figure): The figure.
+        typed_arrays (bool): Whether to send numeric arrays as base64 typed arrays.
+
+    Returns:
+        dict: The figure as a JSON-compatible dict.
+    """
+    figure = fig.to_plotly_json()
+    figure['data'] = [compact_value(trace, typed_arrays) for trace in figure['data']]
+    return prune_template(loads(to_json_plotly(figure)))
@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .compact_model import CompactARIMA
+from .datastore import file_version
+from .helpers import load_data
+
+MODEL_FILE = 'crashes_predictor_model.json'
+FORECAST_FILE = 'crashes_forecast.json'
+REGISTRY_FOLDER = 'models'
+REGISTRY_INDEX = 'index.json'
+REGISTRY_FORMAT = 2
+FORECAST_FORMAT = 1
+FORECAST_COLUMNS = ['mean', 'lower', 'upper']
+
+
+def load_model(model_path):
+    """
+    Loads a fitted model written by the training script.
+
+    Models are stored in the compact JSON format, which loads without statsmodels. Models pickled by
+    older versions of the training script are still unpickled, importing joblib and statsmodels.
+
+    Args:
+        model_path (str): Path of the .json or .pkl model file.
+
+    Returns:
+        CompactARIMA or the unpickled ARIMA results object.
+    """
+    if model_path.endswith('.pkl'):
+        import joblib
+        return joblib.load(model_path)
+    return CompactARIMA.load(model_path)
+
+
+def forecast_frame(model_fit, steps, alpha=0.05):
+    """
+    Forecasts a fitted model with its confidence bands.
+
+    Args:
+        model_fit: The fitted ARIMA results object.
+        steps (int): Number of years to forecast.
+        alpha (float): Significance level of the confidence bands.
+
+    Returns:
+        pd.DataFrame: The mean, lower and upper forecast, indexed by year end.
+    """
+    prediction = model_fit.get_forecast(steps=steps)
+    bands = prediction.conf_int(alpha=alpha)
+    return pd.DataFrame({
+        'mean': prediction.predicted_mean,
+        'lower': bands.iloc[:, 0],
+        'upper': bands.iloc[:, 1],
+    })
+
+
+class ForecastService:
+    """
+    Serves forecasts of a fitted ARIMA model kept in memory for the whole process.
+
+    The model is deserialized on first use and again only when the model file changes on disk.
+    Forecasts are memoized per horizon for the loaded model. Returned series are copies.
+    """
+
+    def __init__(self, model_path, loader=load_model):
+        self.model_path = model_path
+        self.loader = loader
+        self.loads = 0
+        self._version = None
+        self._model = None
+        self._forecasts = {}
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Returns the version of the model file, which changes whenever the model is retrained."""
+        return file_version(self.model_path)
+
+    def model(self):
+        """
+        Returns the fitted model, loading it when the model file changed since the last load.
+
+        Returns:
+            The fitted ARIMA results object.
+        """
+        version = self.version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    model = self.loader(self.model_path)
+                    if not hasattr(model, 'get_forecast'):
+                        raise AttributeError("Loaded model is not a valid ARIMA model instance.")
+                    self._model = model
+                    self._forecasts = {}
+                    self._version = version
+                    self.loads += 1
+        return self._model
+
+    def forecast(self, steps=10):
+        """
+        Forecasts the yearly number of crashes.
+
+        Args:
+            steps (int): Number of years to forecast.
+
+        Returns:
+            pd.Series: The forecasted values.
+        """
+        model = self.model()
+        forecasts = self._forecasts
+        forecast = forecasts.get(steps)
+        if forecast is None:
+            forecast = model.get_forecast(steps=steps).predicted_mean
+            with self._lock:
+                if self._model is model:
+                    forecasts[steps] = forecast
+        return forecast.copy()
+
+    def clear(self):
+        """Forgets the loaded model and its forecasts."""
+        with self._lock:
+            self._version = None
+            self._model = None
+            self._forecasts = {}
+
+
+class ForecastTable:
+    """
+    Serves forecasts precomputed by the training script, without loading the model.
+
+    A table holds the forecast and its confidence bands for every horizon up to the one it was
+    exported for. The file is read on first use and again only when it changes on disk.
+    """
+
+    def __init__(self, table_path):
+        self.table_path = table_path
+        self._version = None
+        self._table = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Returns the version of the table file, which changes whenever the model is retrained."""
+        return file_version(self.table_path)
+
+    def table(self):
+        """
+        Returns the whole forecast table, reading it when the file changed since the last read.
+
+        Returns:
+            pd.DataFrame: The mean, lower and upper forecast, indexed by year end.
+        """
+        version = self.version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    with open(self.table_path) as file:
+                        data = json.load(file)
+                    if data.get('format') != FORECAST_FORMAT:
+                        raise ValueError(f"Unsupported forecast table format: {data.get('format')}")
+                    index = pd.DatetimeIndex(data['index'], freq='YE-DEC')
+                    self._table = pd.DataFrame({column: data[column] for column in FORECAST_COLUMNS}, index=index)
+                    self._version = version
+        return self._table
+
+    def forecast(self, steps=10):
+        """
+        Returns the forecast of the yearly number of crashes with its confidence bands.
+
+        Args:
+            steps (int): Number of years to forecast.
+
+        Returns:
+            pd.DataFrame: The mean, lower and upper forecast of the first steps years.
+        """
+        table = self.table()
+        if steps > len(table):
+            raise ValueError(f"The forecast table only covers {len(table)} years")
+        return table.iloc[:steps].copy()
+
+
+def write_forecast_table(model_fit, table_path, steps, alpha=0.05):
+    """Exports the forecast of a fitted model for every horizon up to steps, atomically."""
+    frame = forecast_frame(model_fit, steps, alpha)
+    data = {
+        'format': FORECAST_FORMAT,
+        'alpha': alpha,
+        'index': frame.index.strftime('%Y-%m-%d').tolist(),
+        **{column: frame[column].round(6).tolist() for column in FORECAST_COLUMNS},
+    }
+    tmp_path = f'{table_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, table_path)
+
+
+class ModelRegistry:
+    """
+    Serves forecasts of the per-segment models listed in the registry index.
+
+    Only the index is read up front. A segment's model, or its forecast table with tables=True, is
+    loaded when it is first forecast, and at most max_models are kept in memory, evicted in least
+    recently used order, so memory does not grow with the number of segments.
+    """
+
+    def __init__(self, folder, max_models=8, tables=False):
+        self.folder = folder
+        self.max_models = max_models
+        self.tables = tables
+        self._index_version = None
+        self._segments = {}
+        self._services = OrderedDict()
+        self._lock = threading.Lock()
+
+    def segments(self):
+        """
+        Returns the registry entries, reloading the index when it changed on disk.
+
+        Returns:
+            list: One dict per segment with its key, dimension, value and model file.
+        """
+        index_path = os.path.join(self.folder, REGISTRY_INDEX)
+        try:
+            version = file_version(index_path)
+        except OSError:
+            return []
+        if self._index_version != version:
+            with self._lock:
+                if self._index_version != version:
+                    with open(index_path) as file:
+                        index = json.load(file)
+                    if index.get('format') != REGISTRY_FORMAT:
+                        raise ValueError(f"Unsupported model registry format: {index.get('format')}")
+                    self._segments = {entry['key']: entry for entry in index['segments']}
+                    self._services.clear()
+                    self._index_version = version
+        return list(self._segments.values())
+
+    def service(self, key):
+        """
+        Returns the forecast service of a segment, creating it on first use.
+
+        Args:
+            key (str): The segment key, such as 'Region=Europe'.
+
+        Returns:
+            ForecastService or ForecastTable: The service of the segment's model or forecast table.
+        """
+        self.segments()
+        with self._lock:
+            service = self._services.get(key)
+            if service is not None:
+                self._services.move_to_end(key)
+                return service
+            entry = self._segments.get(key)
+            if entry is None:
+                raise KeyError(f"No model for segment {key}")
+            if self.tables:
+                service = ForecastTable(os.path.join(self.folder, entry['forecast']))
+            else:
+                service = ForecastService(os.path.join(self.folder, entry['file']))
+            self._services[key] = service
+            while len(self._services) > self.max_models:
+                self._services.popitem(last=False)
+            return service
+
+    def forecast(self, key, steps=10):
+        """Forecasts the yearly number of crashes of a segment."""
+        return self.service(key).forecast(steps)
+
+
+FORECAST_TABLE = ForecastTable(load_data(FORECAST_FILE))
+SEGMENT_FORECASTS = ModelRegistry(load_data(REGISTRY_FOLDER), tables=True)
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_FOLDER_VARIABLE = 'AIR_CRASHES_JOB_FOLDER'
+JOB_TTL = 15 * 60
+JOB_EXPIRE_INTERVAL = 60
+JOB_WORKERS = 2
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it was cancelled, to stop it at its next progress report."""
+
+
+class Job:
+    """The handle a running job uses to report its progress and to name its result files."""
+
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.id = job_id
+
+    def progress(self, done, total, message=None):
+        """
+        Records how far the job got and stops it when it was cancelled.
+
+        Args:
+            done (int): Units of work done.
+            total (int): Units of work in all.
+            message (str, optional): What the job is doing.
+
+        Raises:
+            JobCancelled: When the job was cancelled.
+        """
+        if self.runner.is_cancelled(self.id):
+            raise JobCancelled(self.id)
+        self.runner.update(self.id, progress=done / total if total else 1.0, message=message)
+
+    def result_path(self, suffix):
+        """Returns the path of a result file of the job, removed with the job when it expires."""
+        return os.path.join(self.runner.folder, f'{self.id}{suffix}')
+
+
+class JobRunner:
+    """
+    Runs long tasks, such as exports, in a thread pool outside the request threads.
+
+    The state of every job is kept as a JSON file in the job folder, so any worker process on the
+    host can report the progress of a job or cancel it, whichever process runs it. Cancellation is
+    cooperative: the job stops at its next progress report. Finished jobs and their result files are
+    removed once they are older than ttl seconds, by the next submit or by a status request at most
+    expire_interval seconds after the last removal, as pages poll the status of their jobs.
+    """
+
+    def __init__(self, folder, workers=JOB_WORKERS, ttl=JOB_TTL, expire_interval=JOB_EXPIRE_INTERVAL):
+        self.folder = folder
+        self.workers = workers
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self._executor = None
+        self._lock = threading.Lock()
+        self._expired = 0.0
+
+    def _path(self, job_id, suffix='.json'):
+        if not JOB_ID_PATTERN.fullmatch(job_id or ''):
+            raise KeyError(f"Invalid job id: {job_id}")
+        return os.path.join(self.folder, f'{job_id}{suffix}')
+
+    def _write(self, state):
+        path = self._path(state['id'])
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, path)
+
+    def _pool(self):
+        # Created on first use, so a server that forks its workers after importing the app does not
+        # inherit the threads of the parent.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            return self._executor
+
+    def submit(self, kind, function, *args):
+        """
+        Queues a job.
+
+        Args:
+            kind (str): What the job does, such as 'pdf'.
+            function (callable): Called with the Job handle and args. Returns the JSON-compatible result.
+            *args: Arguments of the function.
+
+        Returns:
+            str: The job id.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        self.expire()
+        job_id = uuid.uuid4().hex
+        self._write({'id': job_id, 'kind': kind, 'status': QUEUED, 'progress': 0.0, 'message': None,
+                     'created': time.time(), 'finished': None, 'result': None, 'error': None})
+        self._pool().submit(self._run, job_id, function, args)
+        return job_id
+
+    def _run(self, job_id, function, args):
+        if self.is_cancelled(job_id):
+            self.update(job_id, status=CANCELLED, finished=time.time())
+            return
+        self.update(job_id, status=RUNNING)
+        try:
+            result = function(Job(self, job_id), *args)
+        except JobCancelled:
+            self.update(job_id, status=CANCELLED, finished=time.time())
+        except Exception as error:
+            self.update(job_id, status=FAILED, error=f'{type(error).__name__}: {error}', finished=time.time())
+        else:
+            self.update(job_id, status=DONE, progress=1.0, result=result, finished=time.time())
+
+    def status(self, job_id):
+        """
+        Returns the state of a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            dict: The job's kind, status, progress, message, result and error, or None when the job
+            is unknown or expired.
+        """
+        if time.time() - self._expired >= self.expire_interval:
+            self.expire()
+        return self._read(job_id)
+
+    def _read(self, job_id):
+        try:
+            with open(self._path(job_id)) as file:
+                return json.load(file)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def update(self, job_id, **changes):
+        """Changes fields of a job's state."""
+        with self._lock:
+            state = self._read(job_id)
+            if state is not None:
+                state.update(changes)
+                self._write(state)
+
+    def cancel(self, job_id):
+        """
+        Asks a queued or running job to stop.
+
+        Returns:
+            bool: Whether the job exists and had not finished yet.
+        """
+        state = self._read(job_id)
+        if state is None or state['status'] in FINISHED:
+            return False
+        with open(self._path(job_id, '.cancel'), 'w'):
+            pass
+        return True
+
+    def is_cancelled(self, job_id):
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+    def expire(self, now=None):
+        """Removes the jobs that finished more than ttl seconds ago, with their result files."""
+        now = time.time() if now is None else now
+        self._expired = time.time()
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in names:
+            job_id, extension = os.path.splitext(name)
+            if extension != '.json' or not JOB_ID_PATTERN.fullmatch(job_id):
+                continue
+            state = self._read(job_id)
+            if state is None or state['finished'] is None or now - state['finished'] < self.ttl:
+                continue
+            for other in sorted(names, key=lambda other: other == name):
+                if other.startswith(job_id):
+                    try:
+                        os.remove(os.path.join(self.folder, other))
+                    except FileNotFoundError:
+                        pass
+
+
+JOBS = JobRunner(os.environ.get(JOB_FOLDER_VARIABLE) or os.path.join(tempfile.gettempdir(), 'air-crashes-jobs'))
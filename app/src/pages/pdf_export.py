@@ -0,0 +1,205 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pypdf import PdfWriter, PdfReader
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH = 1800
+PAGE_HEIGHT = 600
+FONT_NAME = "Helvetica"
+FONT_SIZE = 8
+MARGIN = 40
+ROW_HEIGHT = 12
+CELL_CHARS = 14
+PAGES_PER_PART = 100
+# Exports run in job threads of the server, and forking a threaded process can copy locks held by
+# other threads into the workers, so they are started from a clean server process instead.
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+PDF_STRING_ESCAPES = {
+    code: '\\%03o' % code if code < 32 or code >= 127 else '\\' + chr(code) if chr(code) in '\\()' else chr(code)
+    for code in range(1, 256)
+}
+
+
+def rows_per_page():
+    """Number of data rows that fit below the header row of one page."""
+    first_row_y = PAGE_HEIGHT - MARGIN - ROW_HEIGHT
+    return (first_row_y - ROW_HEIGHT) // ROW_HEIGHT + 1
+
+
+def column_positions(column_count):
+    """Returns the x position of every column, spreading the columns evenly across the page."""
+    column_width = (PAGE_WIDTH - 2 * MARGIN) / column_count
+    return MARGIN + column_width * np.arange(column_count)
+
+
+def truncate_strings(values, max_length=CELL_CHARS):
+    """
+    Converts values to strings and shortens the ones longer than max_length, column-wise.
+
+    Categorical columns are converted once per category.
+
+    Args:
+        values (pd.Series or pd.Index): The values.
+        max_length (int): Maximum number of characters kept.
+
+    Returns:
+        list: The truncated strings.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = np.array(truncate_strings(values.cat.categories) + [str(np.nan)], dtype=object)
+        return labels[values.cat.codes.to_numpy()].tolist()
+    strings = pd.Series(values, copy=False).astype(str)
+    too_long = strings.str.len() > max_length
+    strings = strings.where(~too_long, strings.str.slice(0, max_length) + '...')
+    return strings.tolist()
+
+
+def prepare_cells(data):
+    """
+    Precomputes the text of the header and of every cell.
+
+    Args:
+        data (pd.DataFrame): The data to print.
+
+    Returns:
+        tuple: The header strings and one list of cell strings per column.
+    """
+    header = truncate_strings(data.columns)
+    cells = [truncate_strings(data[column]) for column in data.columns]
+    return header, cells
+
+
+def show_text_operators(strings):
+    """
+    Encodes strings into PDF operators that show each string and move to the next line.
+
+    The strings are encoded for the standard font and escaped in one pass over the text joined by
+    NUL characters, which the encoding never produces and the escape table leaves untouched.
+
+    Args:
+        strings (list): The strings.
+
+    Returns:
+        list: One '(...) Tj T*' operator sequence per string.
+    """
+    encoding = pdfmetrics.getFont(FONT_NAME).encName
+    joined = b'\x00'.join(string.encode(encoding, 'replace') for string in strings)
+    escaped = joined.decode('latin-1').translate(PDF_STRING_ESCAPES)
+    return [f'({text}) Tj T*' for text in escaped.split('\x00')] if strings else []
+
+
+def render_part(header, cells, x_positions):
+    """
+    Renders consecutive pages into a standalone PDF document.
+
+    Every column of a page is written as one text block of precomputed operators, so the work
+    per cell is a list slice instead of a drawing call.
+
+    Args:
+        header (list): The header strings.
+        cells (list): One list of cell strings per column, holding the rows of these pages.
+        x_positions (list): The x position of every column.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+    page_rows = rows_per_page()
+    row_count = len(cells[0]) if cells else 0
+    header_y = fp_str(PAGE_HEIGHT - MARGIN)
+    header_operators = show_text_operators(header)
+    cell_operators = [show_text_operators(column) for column in cells]
+    text_origins = [f'BT 1 0 0 1 {fp_str(x)} {header_y} Tm' for x in x_positions]
+
+    for start in range(0, max(row_count, 1), page_rows):
+        c.setFont(FONT_NAME, FONT_SIZE, leading=ROW_HEIGHT)
+        blocks = [
+            ' '.join([origin, title, *column[start:start + page_rows], 'ET'])
+            for origin, title, column in zip(text_origins, header_operators, cell_operators)
+        ]
+        c.addLiteral('\n'.join(blocks))
+        c.showPage()
+
+    c.save()
+    return buffer.getvalue()
+
+
+def _render_part_job(args):
+    return render_part(*args)
+
+
+def pool_context():
+    """
+    Returns the multiprocessing context the export workers are started with.
+
+    The fork server preloads this module rather than the main module, which is app.py under
+    `python app.py` and would build the app again.
+    """
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    if POOL_START_METHOD == 'forkserver':
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+def generate_pdf(data, pdf_path, workers=None, pages_per_part=PAGES_PER_PART, progress=None):
+    """
+    Prints a data frame as a table into a PDF file.
+
+    Rows are split into ranges of pages_per_part pages, the ranges are rendered concurrently in a
+    process pool and the parts are merged in order. Small tables are rendered in the calling process.
+
+    Args:
+        data (pd.DataFrame): The data to print.
+        pdf_path (str or file-like): Where to write the PDF.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        pages_per_part (int): Number of pages rendered by one task.
+        progress (callable, optional): Called with the number of rendered parts and the number of parts
+            after each part. Whatever it raises stops the export and cancels the remaining parts.
+    """
+    header, cells = prepare_cells(data)
+    x_positions = column_positions(len(header)).tolist()
+    rows_per_part = rows_per_page() * pages_per_part
+    ranges = [(start, start + rows_per_part) for start in range(0, len(data), rows_per_part)] or [(0, 0)]
+    jobs = [(header, [column[start:stop] for column in cells], x_positions) for start, stop in ranges]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    parts = []
+    if workers <= 1:
+        for job in jobs:
+            parts.append(_render_part_job(job))
+            if progress:
+                progress(len(parts), len(jobs))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+        try:
+            for part in executor.map(_render_part_job, jobs):
+                parts.append(part)
+                if progress:
+                    progress(len(parts), len(jobs))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    if len(parts) == 1:
+        document = parts[0]
+    else:
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(PdfReader(io.BytesIO(part)))
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        document = buffer.getvalue()
+
+    if hasattr(pdf_path, 'write'):
+        pdf_path.write(document)
+    else:
+        with open(pdf_path, 'wb') as file:
+            file.write(document)
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .columnar_cache import decode_columns, encode_columns
+
+SHARED_FORMAT = 1
+META_FILE = 'meta.json'
+
+
+def snapshot_path(folder, filename, version):
+    """Returns the folder that holds the columns of one version of a dataset."""
+    return os.path.join(folder, f'{os.path.splitext(filename)[0]}-{version}')
+
+
+def publish_columns(path, data):
+    """
+    Writes the columns of a data frame as one .npy file per array, so they can be memory-mapped.
+
+    The snapshot is written to a temporary folder and renamed into place. When another process
+    published the same snapshot first, its copy is kept.
+
+    Args:
+        path (str): The snapshot folder.
+        data (pd.DataFrame): The data to publish.
+
+    Returns:
+        bool: Whether the snapshot exists afterwards.
+    """
+    encoded = encode_columns(data)
+    if encoded is None:
+        return False
+    arrays, columns = encoded
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        with open(os.path.join(tmp_path, META_FILE), 'w') as file:
+            json.dump({'format': SHARED_FORMAT, 'arrays': list(arrays), 'columns': columns}, file)
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return os.path.exists(os.path.join(path, META_FILE))
+    return True
+
+
+def _map_array(path):
+    try:
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+    except ValueError:
+        # Empty arrays cannot be memory-mapped.
+        return np.load(path, allow_pickle=False)
+
+
+def attach_columns(path):
+    """
+    Rebuilds a data frame whose columns are read-only views of the memory-mapped snapshot files.
+
+    Every process attaching the same snapshot shares the pages of the files through the OS page
+    cache instead of holding its own copy. Object columns are the exception and are decoded into
+    process memory.
+
+    Args:
+        path (str): The snapshot folder.
+
+    Returns:
+        pd.DataFrame: The data, or None when the snapshot is missing or unreadable.
+    """
+    try:
+        with open(os.path.join(path, META_FILE)) as file:
+            meta = json.load(file)
+        if meta.get('format') != SHARED_FORMAT:
+            return None
+        arrays = {name: _map_array(os.path.join(path, f'{name}.npy')) for name in meta['arrays']}
+        return decode_columns(arrays, meta['columns'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def remove_stale_snapshots(folder, filename, current_path):
+    """Removes the snapshots of older versions of a dataset. Processes still mapping them keep their views."""
+    prefix = f'{os.path.splitext(filename)[0]}-'
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.startswith(prefix) and not name.endswith('.tmp') and path != current_path:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def shared_dataset(folder, filename, version, read):
+    """
+    Returns a dataset attached to its shared snapshot, publishing the snapshot when it is missing.
+
+    Publishing holds a lock on the folder, so when workers start together only one of them loads the
+    dataset, and the others wait for its snapshot instead of each loading a copy of their own.
+
+    Args:
+        folder (str): The folder of the snapshots, one per host.
+        filename (str): Name of the dataset file.
+        version (str): The version of the dataset file.
+        read (callable): Loads the dataset when no snapshot of this version exists yet.
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    import fcntl
+
+    path = snapshot_path(folder, filename, version)
+    data = attach_columns(path)
+    if data is not None:
+        return data
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f'{os.path.splitext(filename)[0]}.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = attach_columns(path)
+        if data is not None:
+            return data
+        data = read()
+        if publish_columns(path, data):
+            remove_stale_snapshots(folder, filename, path)
+            attached = attach_columns(path)
+            if attached is not None:
+                return attached
+    return data
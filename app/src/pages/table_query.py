@@ -0,0 +1,249 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .bitmap_index import Bitmap
+
+FILTER_OPERATORS = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+COMPARISONS = {
+    'ge': lambda series, value: series >= value,
+    'le': lambda series, value: series <= value,
+    'lt': lambda series, value: series < value,
+    'gt': lambda series, value: series > value,
+    'ne': lambda series, value: series != value,
+    'eq': lambda series, value: series == value,
+}
+
+DATE_PREFIX_FREQUENCIES = {4: 'Y', 7: 'M', 10: 'D'}
+
+
+def split_filter_part(filter_part):
+    """
+    Splits one expression of a DataTable filter query into column, operator and value.
+
+    Args:
+        filter_part (str): An expression such as '{Country} contains "Peru"' or '{Total fatalities} > 10'.
+
+    Returns:
+        tuple: The column name, the operator name and the value, or three Nones when nothing matched.
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+                value_part = value_part.strip()
+                if not value_part:
+                    return None, None, None
+                quote = value_part[0]
+                if quote == value_part[-1] and quote in ("'", '"', '`') and len(value_part) > 1:
+                    value = value_part[1:-1].replace('\\' + quote, quote)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                return name, operator_type[0].strip(), value
+    return None, None, None
+
+
+def _category_mask(series, predicate):
+    """Evaluates a predicate once per category of a categorical column."""
+    return predicate(pd.Series(series.cat.categories)).to_numpy(dtype=bool, na_value=False)
+
+
+def _categorical_mask(series, predicate):
+    """Evaluates a predicate once per category and spreads the result over the rows through the codes."""
+    return np.append(_category_mask(series, predicate), False)[series.cat.codes.to_numpy()]
+
+
+def _date_prefix_range(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    prefix = str(value).strip()
+    frequency = DATE_PREFIX_FREQUENCIES.get(len(prefix))
+    if frequency is None:
+        return None
+    try:
+        period = pd.Period(prefix, freq=frequency)
+    except ValueError:
+        return None
+    return period.start_time, period.end_time
+
+
+def _text_predicate(operator, value):
+    # Unquoted numbers arrive as floats, and 747 has to be looked for as '747' rather than '747.0'.
+    text = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    if operator == 'contains':
+        return lambda strings: strings.str.contains(text, regex=False)
+    if operator == 'datestartswith':
+        return lambda strings: strings.str.startswith(text)
+    compare = COMPARISONS[operator]
+    return lambda strings: compare(strings, text)
+
+
+def expression_mask(series, operator, value):
+    """
+    Evaluates one filter expression over a column as a vectorized boolean mask.
+
+    Args:
+        series (pd.Series): The column.
+        operator (str): One of the operator names of FILTER_OPERATORS.
+        value (str or float): The value from the filter query.
+
+    Returns:
+        np.ndarray: The boolean mask of the matching rows.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _categorical_mask(series, _text_predicate(operator, value))
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        bounds = _date_prefix_range(value) if operator in ('datestartswith', 'eq') else None
+        if bounds is not None:
+            return ((series >= bounds[0]) & (series <= bounds[1])).to_numpy()
+        if operator in ('datestartswith', 'contains'):
+            strings = series.dt.strftime('%Y-%m-%d')
+            return _text_predicate(operator, value)(strings).to_numpy(dtype=bool, na_value=False)
+        if operator in COMPARISONS:
+            try:
+                timestamp = pd.Timestamp(str(value))
+            except ValueError:
+                return np.zeros(len(series), dtype=bool)
+            return COMPARISONS[operator](series, timestamp).to_numpy()
+
+    if pd.api.types.is_numeric_dtype(series.dtype) and operator in COMPARISONS:
+        if not isinstance(value, float):
+            return np.zeros(len(series), dtype=bool) if operator != 'ne' else np.ones(len(series), dtype=bool)
+        return COMPARISONS[operator](series, value).to_numpy(dtype=bool, na_value=False)
+
+    strings = series if series.dtype == object else series.astype(str)
+    return _text_predicate(operator, value)(strings).to_numpy(dtype=bool, na_value=False)
+
+
+def expression_bitmap(data, index, name, operator, value):
+    """
+    Evaluates one filter expression as a Bitmap, through the index when the column is indexed.
+
+    Args:
+        data (pd.DataFrame): The data the index was built on.
+        index (BitmapIndex): The index of the data.
+        name (str): The column.
+        operator (str): One of the operator names of FILTER_OPERATORS.
+        value (str or float): The value from the filter query.
+
+    Returns:
+        Bitmap: The matching rows.
+    """
+    if name in index:
+        return index.matching(name, _category_mask(data[name], _text_predicate(operator, value)))
+    return Bitmap.from_mask(expression_mask(data[name], operator, value))
+
+
+def filter_mask(data, filter_query, index=None):
+    """
+    Translates a DataTable filter query into a boolean mask over the data.
+
+    Expressions are joined with '&&'. Expressions on unknown columns or with unknown operators are
+    ignored, the same way the native DataTable filter ignores them. With an index, expressions on
+    indexed columns are answered from its bitmaps and all expressions are combined bitwise.
+
+    Args:
+        data (pd.DataFrame): The data.
+        filter_query (str): The filter query of the DataTable.
+        index (BitmapIndex, optional): The index of the data.
+
+    Returns:
+        np.ndarray: The boolean mask of the matching rows, or None when nothing is filtered.
+    """
+    mask = None
+    for filter_part in (filter_query or '').split(' && '):
+        name, operator, value = split_filter_part(filter_part)
+        if name not in data.columns:
+            continue
+        if index is not None:
+            part_mask = expression_bitmap(data, index, name, operator, value)
+        else:
+            part_mask = expression_mask(data[name], operator, value)
+        mask = part_mask if mask is None else mask & part_mask
+    return mask.mask() if isinstance(mask, Bitmap) else mask
+
+
+def sort_positions(data, positions, sort_by):
+    """
+    Orders row positions by the sort columns of the DataTable.
+
+    Args:
+        data (pd.DataFrame): The data.
+        positions (np.ndarray): Positions of the rows to order.
+        sort_by (list): The DataTable sort_by entries with 'column_id' and 'direction'.
+
+    Returns:
+        np.ndarray: The ordered positions.
+    """
+    sort_by = [entry for entry in sort_by or [] if entry['column_id'] in data.columns]
+    if not sort_by:
+        return positions
+    columns = [entry['column_id'] for entry in sort_by]
+    keys = data[columns].take(positions).reset_index(drop=True)
+    order = keys.sort_values(columns, ascending=[entry['direction'] == 'asc' for entry in sort_by],
+                             kind='stable', na_position='last').index.to_numpy()
+    return positions[order]
+
+
+def query_positions(data, filter_query=None, sort_by=None, index=None, positions=None):
+    """
+    Returns the positions of the rows matching a filter query, in the requested sort order.
+
+    Args:
+        data (pd.DataFrame): The data.
+        filter_query (str, optional): The filter query of the DataTable.
+        sort_by (list, optional): The DataTable sort_by entries.
+        index (BitmapIndex, optional): The index of the data.
+        positions (np.ndarray, optional): The rows to pick from, such as ranked search results, in the
+            order kept when there is no sort. Defaults to all rows in order.
+
+    Returns:
+        np.ndarray: The positions of the matching rows.
+    """
+    mask = filter_mask(data, filter_query, index)
+    if positions is None:
+        positions = np.arange(len(data)) if mask is None else np.flatnonzero(mask)
+    elif mask is not None:
+        positions = positions[mask[positions]]
+    return sort_positions(data, positions, sort_by)
+
+
+def query_page(data, page_current, page_size, filter_query=None, sort_by=None, index=None, positions=None):
+    """
+    Filters and sorts the data and cuts out one page of rows.
+
+    Args:
+        data (pd.DataFrame): The data.
+        page_current (int): Index of the page, starting at 0.
+        page_size (int): Number of rows per page.
+        filter_query (str, optional): The filter query of the DataTable.
+        sort_by (list, optional): The DataTable sort_by entries.
+        index (BitmapIndex, optional): The index of the data, from dataset_index.
+        positions (np.ndarray, optional): The rows to pick from, as for query_positions.
+
+    Returns:
+        tuple: The rows of the page and the total number of matching rows.
+    """
+    positions = query_positions(data, filter_query, sort_by, index, positions)
+    start = (page_current or 0) * page_size
+    return data.take(positions[start:start + page_size]), len(positions)
+
+
+def page_count(total_rows, page_size):
+    return max(1, math.ceil(total_rows / page_size))
@@ -0,0 +1,166 @@
+import re
+import threading
+
+import numpy as np
+
+from .bitmap_index import Bitmap, dataset_index
+
+SEARCH_COLUMNS = ['Operator', 'Aircraft', 'Schedule', 'Country']
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def normalize_text(text):
+    """Lowercases a text and turns every run of characters other than letters and digits into one space."""
+    return re.sub(r'[\W_]+', ' ', str(text).lower()).strip()
+
+
+def trigrams(text):
+    return {text[start:start + 3] for start in range(len(text) - 2)}
+
+
+def search_terms(query):
+    """Splits a search query on whitespace into normalized terms, so 'Douglas DC-3' gives 'douglas' and 'dc 3'."""
+    return [term for term in (normalize_text(word) for word in str(query or '').split()) if term]
+
+
+def term_probe(term):
+    """
+    Returns the text a term has to contain, as found in the padded text of a value.
+
+    Terms of three characters or more match anywhere. Shorter terms have no trigram of their own, so
+    two characters match at the start of a word and a single character only as a whole word.
+    """
+    if len(term) >= 3:
+        return term
+    return f' {term}' if len(term) == 2 else f' {term} '
+
+
+class TextIndex:
+    """
+    A trigram inverted index over the distinct values of the text columns of a dataset.
+
+    The text columns are categoricals, so their values are indexed once each rather than once per
+    row: every trigram of a padded, normalized value maps to the values containing it. A query term
+    is looked up by intersecting the values of its trigrams, and the matching values are turned into
+    rows through the bitmap index of the dataset. The work per query depends on the number of
+    distinct values and of matching rows, not on the size of the dataset.
+    """
+
+    def __init__(self, index, columns=SEARCH_COLUMNS):
+        self.index = index
+        self.columns = [column for column in columns if column in index.rows.columns]
+        self._texts = []
+        self._documents = []
+        postings = {}
+        for column in self.columns:
+            for code, label in enumerate(index.columns.codes(column)[1]):
+                text = f' {normalize_text(label)} '
+                for trigram in trigrams(text):
+                    postings.setdefault(trigram, []).append(len(self._texts))
+                self._texts.append(text)
+                self._documents.append((column, code))
+        self._postings = {trigram: np.array(documents, dtype=np.int32) for trigram, documents in postings.items()}
+
+    def term_weights(self, term):
+        """
+        Scores the values of every column for one query term.
+
+        A value containing the term scores 1, one more when the term starts a word of the value and
+        one more when it is a whole word of it.
+
+        Args:
+            term (str): A normalized query term.
+
+        Returns:
+            dict: An array of scores per label of each column, zero for the values without the term.
+        """
+        probe = term_probe(term)
+        candidates = None
+        for trigram in trigrams(probe):
+            documents = self._postings.get(trigram, np.empty(0, dtype=np.int32))
+            candidates = documents if candidates is None else np.intersect1d(candidates, documents, assume_unique=True)
+        weights = {column: np.zeros(len(self.index.columns.codes(column)[1]), dtype=np.int8) for column in self.columns}
+        for document in candidates if candidates is not None else []:
+            text = self._texts[document]
+            if probe in text:
+                column, code = self._documents[document]
+                weights[column][code] = 1 + (f' {term}' in text) + (f' {term} ' in text)
+        return weights
+
+    def rows(self, column, value_mask):
+        """Returns the rows whose value in a column is selected by a mask over its labels."""
+        if column in self.index:
+            return self.index.matching(column, value_mask)
+        return Bitmap.from_mask(np.append(value_mask, False)[self.index.columns.codes(column)[0]])
+
+    def search(self, query):
+        """
+        Finds the rows whose text columns contain every term of a query, best matches first.
+
+        Every term has to be found in at least one of the columns. The score of a row adds up the best
+        score of each term over the columns, and rows with the same score keep the order of the data.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            np.ndarray: The positions of the matching rows, ranked.
+        """
+        terms = search_terms(query)
+        if not terms or not self.columns:
+            return np.empty(0, dtype=np.int64)
+        term_weights = [self.term_weights(term) for term in terms]
+        selection = self.index.all()
+        for weights in term_weights:
+            matches = Bitmap.filled(self.index.size, False)
+            for column, column_weights in weights.items():
+                if column_weights.any():
+                    matches |= self.rows(column, column_weights > 0)
+            selection &= matches
+        positions = selection.positions()
+        scores = np.zeros(len(positions), dtype=np.int64)
+        for weights in term_weights:
+            scores += np.max([np.append(column_weights, 0)[self.index.columns.codes(column)[0][positions]]
+                              for column, column_weights in weights.items()], axis=0)
+        return positions[np.argsort(-scores, kind='stable')]
+
+
+def text_index(filename):
+    """
+    Returns the search index of a dataset, built with its bitmap index and rebuilt with every new version.
+
+    Args:
+        filename (str): Name of the dataset file.
+
+    Returns:
+        TextIndex: The index, searching the rows of its bitmap index.
+    """
+    index = dataset_index(filename)
+    with _lock:
+        entry = _indexes.get(filename)
+        if entry is not None and entry.index is index:
+            return entry
+    entry = TextIndex(index)
+    with _lock:
+        _indexes[filename] = entry
+    return entry
+
+
+def search_rows(filename, query):
+    """
+    Searches a dataset, building its search index only once a query has terms.
+
+    Args:
+        filename (str): Name of the dataset file.
+        query (str): The search query. Blank or punctuation-only queries search nothing.
+
+    Returns:
+        tuple: The bitmap index of the dataset, and the ranked positions of the matching rows or
+            None when there is nothing to search.
+    """
+    if not search_terms(query):
+        return dataset_index(filename), None
+    search_index = text_index(filename)
+    return search_index.index, search_index.search(query)
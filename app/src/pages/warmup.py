@@ -0,0 +1,49 @@
+import importlib
+import threading
+import time
+
+from .aggregates import CUBE_DATA
+from .datastore import get_dataset, PROCESSED_DATA, RAW_DATA
+from .text_search import text_index
+
+WARMUP_MODULES = ['plotly.subplots', 'pages.pdf_export']
+WARMUP_DATASETS = [PROCESSED_DATA, CUBE_DATA, RAW_DATA]
+INDEXED_DATASETS = [PROCESSED_DATA, RAW_DATA]
+
+
+def warm_up(modules=WARMUP_MODULES, datasets=WARMUP_DATASETS):
+    """
+    Imports the libraries and loads the datasets that pages otherwise load on first use.
+
+    The bitmap and search indexes of the datasets filtered by the pages are built along with them.
+    Datasets whose file is missing are skipped.
+
+    Args:
+        modules (list): Names of the modules to import.
+        datasets (list): Names of the dataset files to load.
+
+    Returns:
+        dict: The seconds spent on each module and dataset.
+    """
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - start
+    for filename in datasets:
+        start = time.perf_counter()
+        try:
+            get_dataset(filename)
+            if filename in INDEXED_DATASETS:
+                text_index(filename)
+        except OSError:
+            continue
+        timings[filename] = time.perf_counter() - start
+    return timings
+
+
+def start_warm_up(modules=WARMUP_MODULES, datasets=WARMUP_DATASETS):
+    """Runs warm_up in a daemon thread, so the server starts answering requests right away."""
+    thread = threading.Thread(target=warm_up, args=(modules, datasets), name='warm-up', daemon=True)
+    thread.start()
+    return thread
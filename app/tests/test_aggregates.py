@@ -0,0 +1,48 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.aggregates import build_cube, group_totals, CUBE_GROUPINGS
+from pages.datastore import get_dataset, PROCESSED_DATA
+
+
+def test_cube_totals_match_row_totals():
+    """Test that every grouping of the cube matches aggregating the rows directly."""
+    rows = get_dataset(PROCESSED_DATA)
+    cube = build_cube(rows)
+    for dimensions in CUBE_GROUPINGS:
+        expected = group_totals(rows, list(dimensions)).sort_index()
+        actual = group_totals(cube, list(dimensions)).sort_index()
+        assert expected.values.tolist() == actual.values.tolist(), f"Mismatch for {dimensions}"
+
+
+def test_cube_counts_every_incident():
+    """Test that the yearly block of the cube accounts for every incident."""
+    rows = get_dataset(PROCESSED_DATA)
+    cube = build_cube(rows)
+    yearly = group_totals(cube, ['Year'])
+    assert yearly['Count'].sum() == len(rows)
+    assert yearly['Total fatalities'].sum() == rows['Total fatalities'].sum()
+
+
+def test_cube_does_not_grow_with_the_rows():
+    """Test that the cube only holds dimensions with a bounded number of values, whatever the number of rows."""
+    rows = get_dataset(PROCESSED_DATA)
+    cube = build_cube(rows)
+    assert len(build_cube(pd.concat([rows, rows], ignore_index=True))) == len(cube)
+    assert len(cube) < len(rows) / 20
+    assert not {'Schedule', 'Operator', 'Aircraft'} & set(cube.columns)
+
+
+def test_group_totals_accepts_plain_csv_frame():
+    """Test that the aggregation also works on data read without the dataset store."""
+    rows = pd.DataFrame({
+        'Date': ['2001-01-01', '2001-06-01', '2002-01-01'],
+        'Total fatalities': [1, 2, 3],
+        'Total on board': [4.0, None, 6.0],
+    })
+    yearly = group_totals(rows, ['Year'])
+    assert yearly['Count'].tolist() == [2, 1]
+    assert yearly['Total on board'].tolist() == [4, 6]
@@ -0,0 +1,70 @@
+import os
+import sys
+from flask import Flask
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.aggregates import group_totals
+from pages.api import register_api_routes
+from pages.bitmap_index import dataset_index
+from pages.crossfilter import select_rows
+from pages.datastore import get_dataset, PROCESSED_DATA
+
+
+def api_client():
+    server = Flask(__name__)
+    register_api_routes(server)
+    return server.test_client()
+
+
+def test_aggregate_matches_group_totals():
+    """Test that the API returns the totals the Analysis figures are built from."""
+    response = api_client().get('/api/v1/aggregate?group_by=Year&metric=fatalities,count')
+    assert response.status_code == 200
+    rows = response.get_json()['rows']
+    expected = group_totals(get_dataset(PROCESSED_DATA), ['Year'])
+    assert [row['Year'] for row in rows] == expected.index.tolist()
+    assert [row['fatalities'] for row in rows] == expected['Total fatalities'].tolist()
+    assert [row['count'] for row in rows] == expected['Count'].tolist()
+
+
+def test_aggregate_filters_rows():
+    """Test that filters keep the rows matching any of the values of their column."""
+    response = api_client().get('/api/v1/aggregate?group_by=Region&filter=Region:Europe&filter=Region:Asia')
+    rows = response.get_json()['rows']
+    data = get_dataset(PROCESSED_DATA)
+    assert sorted(row['Region'] for row in rows) == ['Asia', 'Europe']
+    assert sum(row['count'] for row in rows) == data['Region'].isin(['Europe', 'Asia']).sum()
+
+
+def test_aggregate_filters_like_the_analysis_selection():
+    """Test that filtered API totals are those of the rows the cross-filters select."""
+    response = api_client().get('/api/v1/aggregate?group_by=Crash cause,Season&filter=Year:1972&filter=Year:1973'
+                                '&filter=Region:Europe')
+    rows = response.get_json()['rows']
+    expected = group_totals(select_rows(dataset_index(PROCESSED_DATA), {'Year': [1972, 1973], 'Region': ['Europe']}),
+                            ['Crash cause', 'Season'])
+    assert [(row['Crash cause'], row['Season'], row['count']) for row in rows] == \
+        [(*key, count) for key, count in expected['Count'].items()]
+
+
+def test_aggregate_answers_conditional_requests_with_304():
+    """Test that a request with the ETag of the current dataset version gets a 304."""
+    client = api_client()
+    response = client.get('/api/v1/aggregate?group_by=Crash cause')
+    etag = response.headers['ETag']
+    assert 'max-age' in response.headers['Cache-Control']
+    cached = client.get('/api/v1/aggregate?group_by=Crash cause', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    other = client.get('/api/v1/aggregate?group_by=Season', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+
+def test_aggregate_rejects_unknown_columns():
+    """Test that unknown dimensions, metrics and filters are answered with 400."""
+    client = api_client()
+    assert client.get('/api/v1/aggregate').status_code == 400
+    assert client.get('/api/v1/aggregate?group_by=Date').status_code == 400
+    assert client.get('/api/v1/aggregate?group_by=Year&metric=speed').status_code == 400
+    assert client.get('/api/v1/aggregate?group_by=Year&filter=Year:recent').status_code == 400
@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.bitmap_index import Bitmap, dataset_index
+from pages.datastore import get_dataset, PROCESSED_DATA
+from pages.table_query import query_page
+
+
+def test_bitmap_operations_match_boolean_masks():
+    """Test that AND, OR, NOT and counts of bitmaps agree with the boolean masks they pack."""
+    rng = np.random.default_rng(0)
+    left, right = rng.random(101) < 0.5, rng.random(101) < 0.3
+    assert np.array_equal((Bitmap.from_mask(left) & Bitmap.from_mask(right)).mask(), left & right)
+    assert np.array_equal((Bitmap.from_mask(left) | Bitmap.from_mask(right)).mask(), left | right)
+    assert np.array_equal((~Bitmap.from_mask(left)).mask(), ~left)
+    assert (~Bitmap.from_mask(left)).count() == int((~left).sum())
+    assert Bitmap.filled(101).count() == 101
+
+
+def test_index_predicates_match_pandas():
+    """Test that equality and IN predicates, on bitmap and posting list columns, select the rows pandas selects."""
+    index = dataset_index(PROCESSED_DATA)
+    rows = get_dataset(PROCESSED_DATA)
+    europe = index.equals('Region', 'Europe')
+    countries = index.isin('Country', ['Peru', 'Chile', 'Atlantis'])
+    weather = index.equals('Crash cause', 'Weather')
+    selection = (europe | countries) & ~weather
+    expected = (((rows['Region'] == 'Europe') | rows['Country'].isin(['Peru', 'Chile']))
+                & (rows['Crash cause'] != 'Weather'))
+    assert np.array_equal(selection.mask(), expected.to_numpy())
+    assert selection.count() == int(expected.sum())
+    counts = index.value_counts('Season', selection)
+    assert counts.to_dict() == rows[expected]['Season'].value_counts().reindex(counts.index).to_dict()
+
+
+def test_table_query_with_index_matches_without():
+    """Test that the DataTable query answers the same page and total through the index."""
+    index = dataset_index(PROCESSED_DATA)
+    filter_query = '{Region} contains "Eu" && {Operator} contains "Air" && {Total fatalities} > 10'
+    sort_by = [{'column_id': 'Date', 'direction': 'desc'}]
+    page, total = query_page(index.rows, 1, 20, filter_query, sort_by, index)
+    expected_page, expected_total = query_page(index.rows, 1, 20, filter_query, sort_by)
+    assert total == expected_total > 0
+    assert page.index.tolist() == expected_page.index.tolist()
+
+
+def test_indexed_contains_unquoted_number_matches_unindexed():
+    """Test that indexed columns look for an unquoted number in a contains filter as its integer text."""
+    index = dataset_index(PROCESSED_DATA)
+    for query in ('{Aircraft} contains 747', '{Aircraft} contains 3 && {Region} contains "Eu"'):
+        total = query_page(index.rows, 0, 20, query, None, index)[1]
+        assert total == query_page(index.rows, 0, 20, query)[1] > 0, query
@@ -0,0 +1,50 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.columnar_cache import read_cached_csv, cache_path
+from pages.datastore import cast_columns
+
+SCHEMA = {
+    'dates': ['Date'],
+    'categories': ['Season', 'Survivors'],
+    'integers': ['Total on board', 'Total fatalities'],
+}
+
+
+def prepare(data):
+    return cast_columns(data, SCHEMA)
+
+
+def write_csv(path, fatalities):
+    pd.DataFrame({
+        'Date': ['1918-05-02', '1918-06-08', '1919-01-01'],
+        'Season': ['Spring', 'Summer', 'Winter'],
+        'Survivors': ['No', None, 'Yes'],
+        'Total on board': [2, None, 6],
+        'Total fatalities': fatalities,
+        'Schedule': ['Dayton - Dayton', None, 'Cricklewood - Cricklewood'],
+    }).to_csv(path, index=False)
+
+
+def test_cache_round_trip_keeps_dtypes(tmp_path):
+    """Test that data loaded from the binary cache equals the freshly parsed data."""
+    csv_path = str(tmp_path / 'crashes.csv')
+    write_csv(csv_path, [2, 5, 0])
+    parsed = read_cached_csv(csv_path, prepare)
+    assert os.path.exists(cache_path(csv_path))
+    cached = read_cached_csv(csv_path, prepare)
+    pd.testing.assert_frame_equal(parsed, cached)
+    assert str(cached['Total on board'].dtype) == 'Int64'
+    assert isinstance(cached['Season'].dtype, pd.CategoricalDtype)
+
+
+def test_cache_is_rebuilt_when_source_changes(tmp_path):
+    """Test that a changed CSV file is parsed again instead of served from a stale cache."""
+    csv_path = str(tmp_path / 'crashes.csv')
+    write_csv(csv_path, [2, 5, 0])
+    read_cached_csv(csv_path, prepare)
+    write_csv(csv_path, [2, 5, 10])
+    assert read_cached_csv(csv_path, prepare)['Total fatalities'].tolist() == [2, 5, 10]
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from helpers.regression_model import fit_candidate, yearly_crash_counts
+from pages.compact_model import CompactARIMA
+
+
+def test_compact_model_forecasts_like_statsmodels(tmp_path):
+    """Test that a saved and reloaded compact model reproduces the statsmodels forecast and confidence bands."""
+    series = yearly_crash_counts()
+    for order, seasonal_order in (((1, 1, 1), (0, 0, 0, 0)), ((2, 0, 1), (0, 0, 0, 0)), ((1, 1, 1), (1, 0, 0, 4))):
+        model_fit = fit_candidate(series, order, seasonal_order)
+        path = str(tmp_path / 'model.json')
+        CompactARIMA.from_results(model_fit).save(path)
+        compact = CompactARIMA.load(path)
+
+        expected = model_fit.get_forecast(steps=15)
+        actual = compact.get_forecast(steps=15)
+        assert actual.predicted_mean.index.equals(expected.predicted_mean.index)
+        assert np.allclose(actual.predicted_mean, expected.predicted_mean)
+        assert np.allclose(actual.conf_int(alpha=0.1), expected.conf_int(alpha=0.1))
+        assert os.path.getsize(path) < 4096
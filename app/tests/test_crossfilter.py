@@ -0,0 +1,41 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.aggregates import group_totals
+from pages.bitmap_index import dataset_index
+from pages.crossfilter import normalize_filters, select_rows, year_bounds
+from pages.datastore import get_dataset, PROCESSED_DATA
+
+
+def test_selection_totals_match_filtered_rows():
+    """Test that a selection aggregates like grouping a copy of the matching rows."""
+    rows = get_dataset(PROCESSED_DATA)
+    filters = normalize_filters({'Year': [1990, 1950], 'Region': ['Europe', 'Asia'], 'Crash cause': ['Weather']})
+    selection = select_rows(dataset_index(PROCESSED_DATA), filters)
+    years = rows['Date'].dt.year
+    mask = ((years >= 1950) & (years <= 1990) & rows['Region'].isin(['Europe', 'Asia'])
+            & (rows['Crash cause'] == 'Weather')).to_numpy()
+    assert np.array_equal(selection.mask, mask)
+    for dimensions in (['Year'], ['Country'], ['Operator'], ['Crash cause', 'Season']):
+        expected = group_totals(rows[mask], dimensions)
+        actual = group_totals(selection, dimensions)
+        assert actual.index.tolist() == expected.index.tolist(), f"Mismatch for {dimensions}"
+        assert actual.values.tolist() == expected.values.tolist(), f"Mismatch for {dimensions}"
+
+
+def test_empty_selection_has_no_groups():
+    """Test that a filter matching nothing aggregates to empty totals."""
+    selection = select_rows(dataset_index(PROCESSED_DATA), {'Country': ['Atlantis']})
+    assert len(selection) == 0
+    assert group_totals(selection, ['Year']).empty
+
+
+def test_normalize_filters_drops_parts_selecting_everything():
+    """Test that empty values and a year range covering the data do not count as filters."""
+    bounds = year_bounds(dataset_index(PROCESSED_DATA).columns)
+    assert normalize_filters({'Year': list(bounds), 'Region': [], 'Operator': None}, bounds) == {}
+    assert normalize_filters({'Year': [bounds[0], 2000], 'Country': ['Peru', 'Chile', 'Peru']}, bounds) == {
+        'Year': [bounds[0], 2000], 'Country': ['Chile', 'Peru']}
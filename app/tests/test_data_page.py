@@ -1,3 +1,6 @@
+import gzip
+import io
+import json
 import os
 import sys
 import pandas as pd
@@ -7,10 +10,12 @@ import time
 import requests
 from flask import Flask
 from plotly.graph_objs import Figure
+from plotly.utils import PlotlyJSONEncoder
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
 from app import dash_app
+from pages.jobs import JOBS, DONE, FINISHED
 
 from pages.analysis import (
     create_yearly_incidents_figure,
@@ -25,7 +30,11 @@ from pages.analysis import (
     create_survival_figure,
     create_casualty_season_plots,
     create_forecast_chart,
-    load_data
+    load_data,
+    tab_layout,
+    ANALYSIS_TABS,
+    DEFAULT_TAB,
+    NO_INCIDENTS
 )
 
 flask_app = Flask(__name__)
@@ -77,6 +86,69 @@ def test_analysis_page(start_dash_app):
     assert response.status_code == 200
 
 
+def test_analysis_tabs_render_only_graphs(start_dash_app):
+    """Test that a tab asked from the server sends its graphs without restyling the buttons on the server."""
+    for tab in ANALYSIS_TABS:
+        response = requests.post('http://127.0.0.1:8050/_dash-update-component', json={
+            'output': '..graph-container.children...analysis-rendered.data..',
+            'outputs': [{'id': 'graph-container', 'property': 'children'},
+                        {'id': 'analysis-rendered', 'property': 'data'}],
+            'inputs': [{'id': 'analysis-request', 'property': 'data', 'value': tab},
+                       {'id': 'analysis-filters', 'property': 'data', 'value': {}}],
+            'state': [{'id': 'analysis-tab', 'property': 'data', 'value': tab}],
+            'changedPropIds': ['analysis-request.data']
+        })
+        assert response.status_code == 200
+        assert list(response.json()['response']) == ['graph-container']
+        expected = json.loads(json.dumps(tab_layout(tab), cls=PlotlyJSONEncoder))
+        assert response.json()['response']['graph-container']['children'] == expected
+
+
+def test_analysis_tabs_prefetch(start_dash_app):
+    """Test that the first render of the Analysis page prefetches the layouts of the other tabs."""
+    response = requests.post('http://127.0.0.1:8050/_dash-update-component', json={
+        'output': 'analysis-prefetch.data',
+        'outputs': {'id': 'analysis-prefetch', 'property': 'data'},
+        'inputs': [{'id': 'analysis-rendered', 'property': 'data', 'value': {'tab': DEFAULT_TAB, 'filters': {}}}],
+        'changedPropIds': ['analysis-rendered.data']
+    })
+    assert response.status_code == 200
+    prefetched = response.json()['response']['analysis-prefetch']['data']
+    assert prefetched['filters'] == {}
+    assert list(prefetched['tabs']) == [tab for tab in ANALYSIS_TABS if tab != DEFAULT_TAB]
+    for tab, children in prefetched['tabs'].items():
+        assert children == json.loads(json.dumps(tab_layout(tab), cls=PlotlyJSONEncoder))
+
+
+def test_analysis_filters_render_the_active_tab(start_dash_app):
+    """Test that changed filters render the active tab with them and report it for prefetching."""
+    filters = {'Year': [1950, 1990], 'Region': ['Europe']}
+    response = requests.post('http://127.0.0.1:8050/_dash-update-component', json={
+        'output': '..graph-container.children...analysis-rendered.data..',
+        'outputs': [{'id': 'graph-container', 'property': 'children'},
+                    {'id': 'analysis-rendered', 'property': 'data'}],
+        'inputs': [{'id': 'analysis-request', 'property': 'data', 'value': DEFAULT_TAB},
+                   {'id': 'analysis-filters', 'property': 'data', 'value': filters}],
+        'state': [{'id': 'analysis-tab', 'property': 'data', 'value': 'btn-causes'}],
+        'changedPropIds': ['analysis-filters.data']
+    })
+    assert response.status_code == 200
+    result = response.json()['response']
+    assert result['analysis-rendered']['data'] == {'tab': 'btn-causes', 'filters': filters}
+    expected = json.loads(json.dumps(tab_layout('btn-causes', filters), cls=PlotlyJSONEncoder))
+    assert result['graph-container']['children'] == expected
+    assert expected != json.loads(json.dumps(tab_layout('btn-causes'), cls=PlotlyJSONEncoder))
+
+
+def test_analysis_tabs_render_filters_selecting_nothing():
+    """Test that every tab renders a note instead of failing when the filters select no incidents."""
+    filters = {'Country': ['France'], 'Region': ['Asia']}
+    for tab in ANALYSIS_TABS:
+        layout = json.dumps(tab_layout(tab, filters), cls=PlotlyJSONEncoder)
+        if tab != 'btn-correlation-studies':
+            assert NO_INCIDENTS in layout, f"No note for {tab}"
+
+
 def test_conclusion_page(start_dash_app):
     """Test if the Conclusion page is running."""
     response = requests.get('http://127.0.0.1:8050/conclusion')
@@ -112,36 +184,58 @@ def test_load_data_processed():
 
 
 def test_export_csv(start_dash_app):
-    """Test clicking the export CSV button."""
-    response = requests.post('http://127.0.0.1:8050/_dash-update-component', json={
-        'output': 'download-csv.data',
-        'inputs': [
-            {'id': 'export-csv-button', 'property': 'n_clicks'}
-        ],
-        'state': [
-            {'id': 'raw-button', 'property': 'n_clicks_timestamp'},
-            {'id': 'processed-button', 'property': 'n_clicks_timestamp'}
-        ],
-        'changedPropIds': ['export-csv-button.n_clicks']
+    """Test streaming the filtered and sorted CSV export."""
+    response = requests.get('http://127.0.0.1:8050/export/processed.csv', params={
+        'filter_query': '{Region} = "Europe"',
+        'sort_by': '[{"column_id": "Total fatalities", "direction": "desc"}]'
     })
-    assert os.path.exists(os.path.join(os.path.expanduser('~'), 'Downloads', 'exported_data.csv'))
+    assert response.status_code == 200
+    exported = pd.read_csv(io.StringIO(response.text))
+    data = load_data('crashes-processed.csv')
+    assert len(exported) == (data['Region'] == 'Europe').sum()
+    assert exported['Total fatalities'].is_monotonic_decreasing
+
+
+def test_export_csv_rejects_malformed_sort(start_dash_app):
+    """Test that a sort_by parameter that is not a list of sort entries is a bad request."""
+    for sort_by in ('{"a": 1}', '[{"column_id": "Date"}]'):
+        response = requests.get('http://127.0.0.1:8050/export/processed.csv', params={'sort_by': sort_by})
+        assert response.status_code == 400, sort_by
+
+
+def test_export_csv_gzip(start_dash_app):
+    """Test the gzip-compressed CSV export."""
+    response = requests.get('http://127.0.0.1:8050/export/processed.csv', params={'gzip': '1'}, stream=True)
+    assert response.status_code == 200
+    exported = pd.read_csv(io.BytesIO(gzip.decompress(response.raw.read())))
+    assert exported.shape == (28536, 11)
 
 
 def test_export_pdf(start_dash_app):
-    """Test clicking the export PDF button."""
-    # Simulate clicking the export PDF button
+    """Test that clicking the export PDF button starts a background job that produces the PDF."""
+    output = next(key for key in dash_app.callback_map if key.startswith('..pdf-job.data'))
     response = requests.post('http://127.0.0.1:8050/_dash-update-component', json={
-        'output': 'download-pdf.data',
+        'output': output,
+        'outputs': [{'id': part.split('.')[0], 'property': part.split('.')[1]}
+                    for part in output.strip('.').split('...')],
         'inputs': [
-            {'id': 'export-pdf-button', 'property': 'n_clicks'}
+            {'id': 'export-pdf-button', 'property': 'n_clicks', 'value': 1}
         ],
         'state': [
-            {'id': 'raw-button', 'property': 'n_clicks_timestamp'},
-            {'id': 'processed-button', 'property': 'n_clicks_timestamp'}
+            {'id': 'raw-button', 'property': 'n_clicks_timestamp', 'value': None},
+            {'id': 'processed-button', 'property': 'n_clicks_timestamp', 'value': 1}
         ],
         'changedPropIds': ['export-pdf-button.n_clicks']
     })
-    assert os.path.exists(os.path.join(os.path.expanduser('~'), 'Downloads', 'exported_data.pdf'))
+    job_id = response.json()['response']['pdf-job']['data']['id']
+    for _ in range(600):
+        state = JOBS.status(job_id)
+        if state['status'] in FINISHED:
+            break
+        time.sleep(0.1)
+    assert state['status'] == DONE
+    with open(state['result'], 'rb') as file:
+        assert file.read(5) == b'%PDF-'
 
 
 def test_create_yearly_incidents_figure():
@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.datastore import categorize_strings, get_dataset, dataset_version, PROCESSED_DATA
+
+
+def test_get_dataset_parses_dtypes_once():
+    """Test that the processed data is parsed once with its analysis dtypes."""
+    data = get_dataset(PROCESSED_DATA)
+    assert data.shape == (28536, 11), "Processed data shape mismatch"
+    assert pd.api.types.is_datetime64_any_dtype(data['Date'])
+    assert isinstance(data['Crash cause'].dtype, pd.CategoricalDtype)
+    assert str(data['Total fatalities'].dtype) == 'Int64'
+    assert np.shares_memory(get_dataset(PROCESSED_DATA)['Date'].values, data['Date'].values)
+
+
+def test_get_dataset_handle_is_isolated():
+    """Test that replacing a column of a handle does not leak into the shared dataset."""
+    data = get_dataset(PROCESSED_DATA)
+    data['Date'] = 'changed'
+    assert pd.api.types.is_datetime64_any_dtype(get_dataset(PROCESSED_DATA)['Date'])
+
+
+def test_dataset_version_is_stable():
+    """Test that the dataset version does not change while the file is untouched."""
+    assert dataset_version(PROCESSED_DATA) == dataset_version(PROCESSED_DATA)
+
+
+def test_loaded_datasets_have_no_object_columns():
+    """Test that every column is backed by a numpy buffer, so forked workers keep sharing it."""
+    data = categorize_strings(pd.DataFrame({'Operator': ['A', 'B', 'A'], 'Crew on board': [1, 2, 3]}))
+    assert isinstance(data['Operator'].dtype, pd.CategoricalDtype)
+    assert data['Crew on board'].dtype == np.int64
+    assert not get_dataset(PROCESSED_DATA).dtypes.eq(object).any()
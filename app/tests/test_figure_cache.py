@@ -0,0 +1,45 @@
+import os
+import sys
+import plotly.graph_objs as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.figure_cache import FigureCache
+
+
+def build_bar():
+    return go.Figure(go.Bar(x=[1, 2, 3], y=[4, 5, 6]))
+
+
+def test_figure_cache_counts_hits_and_misses():
+    """Test that a repeated request is served from the cache."""
+    cache = FigureCache()
+    first = cache.get_or_build('bar', 'v1', build_bar)
+    second = cache.get_or_build('bar', 'v1', build_bar)
+    assert first is second
+    assert first['data'][0]['type'] == 'bar'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_figure_cache_is_keyed_by_version_and_params():
+    """Test that a new dataset version or other parameters build a new figure."""
+    cache = FigureCache()
+    cache.get_or_build('bar', 'v1', build_bar)
+    cache.get_or_build('bar', 'v2', build_bar)
+    cache.get_or_build('bar', 'v2', build_bar, {'top': 5})
+    assert cache.stats()['misses'] == 3
+    assert cache.stats()['entries'] == 3
+
+
+def test_figure_cache_evicts_least_recently_used():
+    """Test that the entry bound evicts the least recently used figure."""
+    cache = FigureCache(max_entries=2)
+    cache.get_or_build('a', 'v1', build_bar)
+    cache.get_or_build('b', 'v1', build_bar)
+    cache.get_or_build('a', 'v1', build_bar)
+    cache.get_or_build('c', 'v1', build_bar)
+    cache.get_or_build('a', 'v1', build_bar)
+    assert cache.stats()['hits'] == 2
+    cache.get_or_build('b', 'v1', build_bar)
+    assert cache.stats()['misses'] == 4
@@ -0,0 +1,37 @@
+import base64
+import os
+import sys
+import numpy as np
+import plotly.graph_objs as go
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.figure_json import compact_figure, encode_array, round_floats
+
+
+def test_encode_array_narrows_whole_floats_and_rounds_others():
+    """Test that whole floats are sent as integers and other floats keep six significant digits."""
+    assert encode_array(np.array([1.0, 2.0, 300.0]), typed_arrays=False) == [1, 2, 300]
+    assert encode_array(np.array([0.1 + 0.2, 2 / 3]), typed_arrays=False) == [0.3, 0.666667]
+    assert list(round_floats(np.array([123456.789, np.nan]))[:1]) == [123457.0]
+
+
+def test_encode_array_typed_arrays_decode_to_the_values():
+    """Test that long arrays become base64 of the smallest dtype holding them."""
+    values = np.arange(1900, 2000, dtype=float)
+    encoded = encode_array(values, typed_arrays=True)
+    assert encoded['dtype'] == 'u2'
+    decoded = np.frombuffer(base64.b64decode(encoded['bdata']), dtype='<u2')
+    np.testing.assert_array_equal(decoded, values)
+    assert encode_array(np.array([1, 2, 3]), typed_arrays=True) == [1, 2, 3]
+
+
+def test_compact_figure_prunes_template_and_keeps_traces():
+    """Test that a compact figure keeps its traces and only the template defaults of its trace types."""
+    fig = go.Figure(go.Bar(x=['a', 'b'], y=[1.5, 2.0], marker=dict(color=['red', 'blue'])))
+    figure = compact_figure(fig, typed_arrays=False)
+    assert figure['data'][0]['x'] == ['a', 'b']
+    assert figure['data'][0]['y'] == [1.5, 2.0]
+    assert figure['data'][0]['marker']['color'] == ['red', 'blue']
+    assert list(figure['layout']['template']['data']) == ['bar']
+    assert figure['layout']['template']['layout'] == fig.layout.template.layout.to_plotly_json()
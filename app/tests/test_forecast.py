@@ -0,0 +1,65 @@
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.forecast import (forecast_frame, load_model, write_forecast_table, ForecastService, ForecastTable,
+                            MODEL_FILE)
+from pages.helpers import load_data
+
+
+def counting_loader(calls):
+    def load(path):
+        calls.append(path)
+        return load_model(path)
+    return load
+
+
+def test_model_is_loaded_once_and_forecasts_are_memoized(tmp_path):
+    """Test that repeated forecasts neither reload the model nor recompute the forecast."""
+    model_path = str(tmp_path / MODEL_FILE)
+    shutil.copyfile(load_data(MODEL_FILE), model_path)
+    calls = []
+    service = ForecastService(model_path, loader=counting_loader(calls))
+
+    first = service.forecast(steps=10)
+    second = service.forecast(steps=10)
+    assert len(first) == 10
+    assert first.equals(second)
+    assert len(calls) == 1
+    assert len(service.forecast(steps=5)) == 5
+    assert len(calls) == 1
+
+    second.iloc[0] = -1
+    assert service.forecast(steps=10).iloc[0] == first.iloc[0]
+
+
+def test_model_is_reloaded_when_the_file_changes(tmp_path):
+    """Test that a rewritten model file is picked up on the next forecast."""
+    model_path = str(tmp_path / MODEL_FILE)
+    shutil.copyfile(load_data(MODEL_FILE), model_path)
+    calls = []
+    service = ForecastService(model_path, loader=counting_loader(calls))
+    service.forecast()
+
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    service.forecast()
+    assert len(calls) == 2
+
+
+def test_forecast_table_matches_the_model(tmp_path):
+    """Test that an exported forecast table serves the model's forecast and confidence bands for every horizon."""
+    model_fit = load_model(load_data(MODEL_FILE))
+    table_path = str(tmp_path / 'forecast.json')
+    write_forecast_table(model_fit, table_path, steps=12)
+    table = ForecastTable(table_path)
+
+    expected = forecast_frame(model_fit, steps=10)
+    actual = table.forecast(steps=10)
+    assert list(actual.columns) == ['mean', 'lower', 'upper']
+    assert actual.index.equals(expected.index)
+    assert abs(actual - expected).max().max() < 1e-5
+    assert (actual['lower'] < actual['mean']).all() and (actual['mean'] < actual['upper']).all()
+    assert len(table.forecast(steps=12)) == 12
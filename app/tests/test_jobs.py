@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.jobs import JobRunner, CANCELLED, DONE, FAILED
+
+
+def wait(runner, job_id, statuses=(DONE, FAILED, CANCELLED), timeout=10):
+    deadline = time.monotonic() + timeout
+    while runner.status(job_id)['status'] not in statuses:
+        assert time.monotonic() < deadline, "The job did not finish in time"
+        time.sleep(0.01)
+    return runner.status(job_id)
+
+
+def write_report(job, rows):
+    path = job.result_path('.csv')
+    with open(path, 'w') as file:
+        for row in range(rows):
+            file.write(f'{row}\n')
+            job.progress(row + 1, rows, f'Wrote {row + 1} rows')
+    return path
+
+
+def test_job_reports_progress_and_expires_with_its_result(tmp_path):
+    """Test that a job's result is kept until the job is older than the TTL, then removed with it."""
+    runner = JobRunner(str(tmp_path), ttl=60)
+    job_id = runner.submit('report', write_report, 3)
+    state = wait(runner, job_id)
+    assert state['status'] == DONE and state['progress'] == 1.0
+    assert state['message'] == 'Wrote 3 rows'
+    assert os.path.exists(state['result'])
+
+    runner.expire(now=state['finished'] + 30)
+    assert runner.status(job_id) is not None
+    runner.expire(now=state['finished'] + 61)
+    assert runner.status(job_id) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancelled_job_stops_at_its_next_progress_report(tmp_path):
+    """Test that cancelling a running job stops it, and that failures are reported with their error."""
+    runner = JobRunner(str(tmp_path))
+    started, resume = threading.Event(), threading.Event()
+
+    def export(job):
+        job.progress(1, 2)
+        started.set()
+        resume.wait(10)
+        job.progress(2, 2)
+        raise AssertionError("The job was not stopped")
+
+    job_id = runner.submit('export', export)
+    assert started.wait(10)
+    assert runner.cancel(job_id)
+    resume.set()
+    state = wait(runner, job_id)
+    assert state['status'] == CANCELLED and state['progress'] == 0.5
+    assert not runner.cancel(job_id)
+
+    failed = wait(runner, runner.submit('export', lambda job: 1 / 0))
+    assert failed['status'] == FAILED and failed['error'].startswith('ZeroDivisionError')
+    assert runner.status('../index') is None
+
+
+def test_status_requests_expire_finished_jobs(tmp_path):
+    """Test that polling the status of jobs removes expired ones without any new job being submitted."""
+    runner = JobRunner(str(tmp_path), ttl=0.5, expire_interval=0)
+    job_id = runner.submit('report', write_report, 1)
+    assert wait(runner, job_id, timeout=10)['status'] == DONE
+    time.sleep(0.6)
+    assert runner.status(job_id) is None
+    assert os.listdir(tmp_path) == []
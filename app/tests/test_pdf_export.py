@@ -0,0 +1,63 @@
+import io
+import multiprocessing.forkserver
+import os
+import runpy
+import sys
+import time
+import pandas as pd
+from pypdf import PdfReader
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.jobs import JobRunner, DONE, FINISHED
+from pages.pdf_export import POOL_START_METHOD, generate_pdf, pool_context, rows_per_page, truncate_strings
+
+
+def test_generate_pdf_splits_rows_into_pages_and_parts():
+    """Test that merged parts keep every page and the header of each page."""
+    data = pd.DataFrame({'Operator': [f'Operator {i}' for i in range(rows_per_page() * 5 + 1)]})
+    output = io.BytesIO()
+    generate_pdf(data, output, workers=1, pages_per_part=2)
+    reader = PdfReader(io.BytesIO(output.getvalue()))
+    assert len(reader.pages) == 6
+    last_page = reader.pages[-1].extract_text()
+    assert 'Operator' in last_page
+    assert f'Operator {len(data) - 1}' in last_page
+
+
+def test_generate_pdf_in_worker_processes_from_a_job(tmp_path):
+    """Test that a job thread can render the parts of an export in a pool of worker processes."""
+    data = pd.DataFrame({'Operator': [f'Operator {i}' for i in range(rows_per_page() * 3)]})
+
+    def export(job):
+        path = job.result_path('.pdf')
+        generate_pdf(data, path, workers=2, pages_per_part=1, progress=job.progress)
+        return path
+
+    runner = JobRunner(str(tmp_path))
+    job_id = runner.submit('pdf', export)
+    deadline = time.monotonic() + 60
+    while runner.status(job_id)['status'] not in FINISHED:
+        assert time.monotonic() < deadline, "The export did not finish in time"
+        time.sleep(0.05)
+    state = runner.status(job_id)
+    assert state['status'] == DONE, state
+    assert len(PdfReader(state['result']).pages) == 3
+
+
+def test_export_workers_do_not_build_the_app():
+    """Test that the fork server does not preload app.py and that importing it as __mp_main__ builds no app."""
+    if POOL_START_METHOD == 'forkserver':
+        pool_context()
+        assert multiprocessing.forkserver._forkserver._preload_modules == ['pages.pdf_export']
+    app_path = os.path.join(os.path.dirname(__file__), '..', 'src', 'app.py')
+    namespace = runpy.run_path(app_path, run_name='__mp_main__')
+    assert 'dash_app' not in namespace and namespace['_app'] is None
+
+
+def test_truncate_strings_matches_categorical_and_plain_values():
+    """Test that categorical columns are truncated per category like plain strings."""
+    values = pd.Series(['Short', 'A very long operator name (cargo)', None])
+    expected = ['Short', 'A very long op...', 'None']
+    assert truncate_strings(values) == expected
+    assert truncate_strings(values.astype('category')) == ['Short', 'A very long op...', 'nan']
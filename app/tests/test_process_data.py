@@ -0,0 +1,136 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from helpers.process_data import process_rows, update, state_path, MONTH_SEASONS
+from pages.columnar_cache import cache_path, read_cache, read_cached_csv
+from pages.datastore import DATASET_SCHEMAS, PROCESSED_DATA, cast_columns
+
+
+def raw_rows(count, start=0):
+    return pd.DataFrame({
+        'Date': [f'{1950 + i % 50}-{i % 12 + 1:02d}-01' for i in range(start, start + count)],
+        'Country': [['Peru', 'France', 'Canada'][i % 3] for i in range(start, start + count)],
+        'Region': [['South America', 'Europe', 'North America'][i % 3] for i in range(start, start + count)],
+        'Aircraft': [f'Aircraft {i % 4}' for i in range(start, start + count)],
+        'Operator': [f'Operator {i % 5}' for i in range(start, start + count)],
+        'Schedule': [f'City {i} - City {i + 1}' for i in range(start, start + count)],
+        'Crew on board': [str(i % 4) for i in range(start, start + count)],
+        'Pax on board': [str(i % 7) if i % 9 else None for i in range(start, start + count)],
+        'Survivors': [['Yes', 'No'][i % 2] for i in range(start, start + count)],
+        'Total fatalities': [str(i % 6) for i in range(start, start + count)],
+        'Crash cause': [['Human factor', 'Weather', 'Technical failure'][i % 3] for i in range(start, start + count)],
+    })
+
+
+def paths(folder):
+    return str(folder / 'raw.csv'), str(folder / 'processed.csv'), str(folder / 'cube.csv')
+
+
+def assert_matches_full_rebuild(tmp_path, raw):
+    """Compares the incremental outputs with a full rebuild from the same raw rows."""
+    incremental = paths(tmp_path)
+    full_folder = tmp_path / 'full'
+    full_folder.mkdir(exist_ok=True)
+    full = paths(full_folder)
+    raw.to_csv(full[0], index=False)
+    update(*full, full=True)
+
+    key = ['Date', 'Schedule']
+    actual = pd.read_csv(incremental[1]).sort_values(key).reset_index(drop=True)
+    expected = pd.read_csv(full[1]).sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected)
+    with open(incremental[2]) as actual_cube, open(full[2]) as expected_cube:
+        assert actual_cube.read() == expected_cube.read()
+
+
+def test_incremental_append_processes_only_new_rows(tmp_path):
+    """Test that appended raw rows are appended to the processed file and applied to the cube."""
+    raw_path, processed_path, cube_path = paths(tmp_path)
+    raw = raw_rows(40)
+    raw.to_csv(raw_path, index=False)
+    assert update(raw_path, processed_path, cube_path) == (40, 0)
+    assert update(raw_path, processed_path, cube_path) == (0, 0)
+
+    with open(processed_path, 'rb') as file:
+        head = file.read()
+    raw = pd.concat([raw, raw_rows(15, start=40), raw.tail(1)], ignore_index=True)
+    raw.to_csv(raw_path, index=False)
+    assert update(raw_path, processed_path, cube_path) == (16, 0)
+    with open(processed_path, 'rb') as file:
+        assert file.read().startswith(head)
+    assert_matches_full_rebuild(tmp_path, raw)
+
+
+def test_incremental_update_handles_changed_rows(tmp_path):
+    """Test that changed and removed raw rows are replaced in the processed file and the cube."""
+    raw_path, processed_path, cube_path = paths(tmp_path)
+    raw = raw_rows(30)
+    raw.to_csv(raw_path, index=False)
+    update(raw_path, processed_path, cube_path)
+
+    raw.loc[3, 'Total fatalities'] = '99'
+    raw = raw.drop(index=[7, 8]).reset_index(drop=True)
+    raw.to_csv(raw_path, index=False)
+    assert update(raw_path, processed_path, cube_path) == (1, 3)
+    assert_matches_full_rebuild(tmp_path, raw)
+
+
+def test_torn_append_is_rolled_back(tmp_path):
+    """Test that a partial append left by an interrupted run is cut off before the next update."""
+    raw_path, processed_path, cube_path = paths(tmp_path)
+    raw = raw_rows(20)
+    raw.to_csv(raw_path, index=False)
+    update(raw_path, processed_path, cube_path)
+    with open(processed_path, 'a') as file:
+        file.write('1999-01-01,Winter,Peru,South Am')
+
+    raw = pd.concat([raw, raw_rows(5, start=20)], ignore_index=True)
+    raw.to_csv(raw_path, index=False)
+    assert update(raw_path, processed_path, cube_path) == (5, 0)
+    assert os.path.exists(state_path(processed_path))
+    assert_matches_full_rebuild(tmp_path, raw)
+
+
+def test_incremental_append_extends_binary_cache(tmp_path):
+    """Test that the binary cache of the processed file is extended with the appended rows."""
+    raw_path, processed_path, cube_path = paths(tmp_path)
+    schema = DATASET_SCHEMAS[PROCESSED_DATA]
+    raw = raw_rows(20)
+    raw.to_csv(raw_path, index=False)
+    update(raw_path, processed_path, cube_path)
+    read_cached_csv(processed_path, lambda data: cast_columns(data, schema))
+
+    pd.concat([raw, raw_rows(10, start=20)], ignore_index=True).to_csv(raw_path, index=False)
+    update(raw_path, processed_path, cube_path)
+    cached = read_cache(cache_path(processed_path), processed_path)
+    assert cached is not None
+    parsed = cast_columns(pd.read_csv(processed_path), schema)
+    pd.testing.assert_frame_equal(cached, parsed)
+
+
+def test_chunked_pipeline_matches_single_chunk(tmp_path):
+    """Test that streaming the raw export in small chunks produces the same outputs as one chunk."""
+    raw = raw_rows(57)
+    outputs = []
+    for chunk_rows in (8, 1000):
+        folder = tmp_path / str(chunk_rows)
+        folder.mkdir()
+        raw_path, processed_path, cube_path = paths(folder)
+        raw.to_csv(raw_path, index=False)
+        assert update(raw_path, processed_path, cube_path, chunk_rows=chunk_rows) == (57, 0)
+        with open(processed_path) as processed, open(cube_path) as cube:
+            outputs.append((processed.read(), cube.read()))
+    assert outputs[0] == outputs[1]
+
+
+def test_season_lookup_covers_every_month():
+    """Test that the vectorized season lookup maps months and missing dates like the old per-row function."""
+    raw = raw_rows(12)
+    raw.loc[0, 'Date'] = 'unknown'
+    seasons = process_rows(raw)['Season'].tolist()
+    assert seasons[0] is None
+    assert seasons[1:] == [MONTH_SEASONS[month] for month in range(2, 13)]
+    assert MONTH_SEASONS[[12, 1, 2, 6]].tolist() == ['Winter', 'Winter', 'Winter', 'Summer']
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from helpers.regression_model import (candidate_orders, parse_range, save_plots, segment_crash_counts, train,
+                                      train_segments, yearly_crash_counts)
+from pages.datastore import get_dataset
+from pages.forecast import ForecastService, ForecastTable, ModelRegistry
+
+
+def test_train_ranks_candidates_and_writes_model_and_report(tmp_path):
+    """Test that training picks the candidate with the lowest criterion and writes a loadable model."""
+    series = yearly_crash_counts()
+    candidates = candidate_orders(parse_range('0-1'), [1], parse_range('0-1'))
+    model_path = str(tmp_path / 'model.json')
+    report_path = str(tmp_path / 'report.json')
+    forecast_path = str(tmp_path / 'forecast.json')
+    train(series, candidates, model_path, report_path, criterion='bic', workers=2, forecast_path=forecast_path)
+
+    with open(report_path) as file:
+        report = json.load(file)
+    scores = [candidate['bic'] for candidate in report['candidates']]
+    assert len(scores) == len(candidates) == 4
+    assert report['best'] == report['candidates'][0]
+    assert report['best']['bic'] == min(scores)
+    assert report['observations'] == len(series)
+    assert len(ForecastService(model_path).forecast(steps=3)) == 3
+    assert len(ForecastTable(forecast_path).forecast(steps=report['forecast_horizon'])) == report['forecast_horizon']
+
+
+def test_plots_are_saved_without_a_display(tmp_path):
+    """Test that the diagnostic plots are written as files."""
+    series = yearly_crash_counts()
+    model_fit, _ = train(series, [((1, 1, 1), (0, 0, 0, 0))], str(tmp_path / 'model.json'),
+                         str(tmp_path / 'report.json'), workers=1)
+    save_plots(series, model_fit, str(tmp_path / 'plots'))
+    assert sorted(os.listdir(tmp_path / 'plots')) == ['acf.png', 'forecast.png', 'pacf.png']
+
+
+def test_segment_series_cover_every_year():
+    """Test that every segment series spans the whole dataset and regions add up to the total."""
+    data = get_dataset()
+    total = yearly_crash_counts(data)
+    segments = segment_crash_counts(data, top_operators=3)
+    assert sum(1 for dimension, _, _ in segments if dimension == 'Operator') == 3
+    regions = [series for dimension, _, series in segments if dimension == 'Region']
+    for series in regions:
+        assert series.index.equals(total.index)
+    assert sum(regions).sum() == data['Region'].notna().sum()
+
+
+def test_registry_loads_segment_models_lazily(tmp_path):
+    """Test that the registry only loads the models of forecast segments and bounds how many it keeps."""
+    segments = [segment for segment in segment_crash_counts(get_dataset(), top_operators=0)
+                if segment[0] == 'Region'][:3]
+    index = train_segments(segments, [((0, 1, 1), (0, 0, 0, 0))], str(tmp_path), workers=2)
+    assert len(index['segments']) == 3
+
+    registry = ModelRegistry(str(tmp_path), max_models=2)
+    keys = [entry['key'] for entry in registry.segments()]
+    assert keys == [f'Region={value}' for _, value, _ in segments]
+    for key in keys:
+        assert len(registry.forecast(key, steps=4)) == 4
+    assert list(registry._services) == keys[1:]
+
+    tables = ModelRegistry(str(tmp_path), tables=True)
+    forecast = tables.forecast(keys[0], steps=4)
+    assert forecast['mean'].equals(registry.forecast(keys[0], steps=4).round(6).rename('mean'))
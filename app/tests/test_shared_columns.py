@@ -0,0 +1,53 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.datastore import cast_columns, categorize_strings
+from pages.shared_columns import shared_dataset, snapshot_path
+
+SCHEMA = {
+    'dates': ['Date'],
+    'categories': ['Season'],
+    'integers': ['Total fatalities'],
+}
+
+
+def sample_data():
+    return categorize_strings(cast_columns(pd.DataFrame({
+        'Date': ['1918-05-02', '1918-06-08', '1919-01-01'],
+        'Season': ['Spring', 'Summer', 'Winter'],
+        'Total fatalities': [2, None, 0],
+        'Schedule': ['Dayton - Dayton', None, 'Cricklewood - Cricklewood'],
+        'Crew on board': [1.0, 2.0, 3.0],
+    }), SCHEMA))
+
+
+def test_workers_attach_read_only_views_of_one_snapshot(tmp_path):
+    """Test that the dataset is loaded once and later attached as read-only memory-mapped columns."""
+    folder = str(tmp_path)
+    loads = []
+
+    def read():
+        loads.append(1)
+        return sample_data()
+
+    published = shared_dataset(folder, 'crashes.csv', 'v1', read)
+    attached = shared_dataset(folder, 'crashes.csv', 'v1', read)
+    assert len(loads) == 1
+    pd.testing.assert_frame_equal(attached, sample_data())
+    pd.testing.assert_frame_equal(published, attached)
+    for array in (attached['Date'].values, attached['Season'].cat.codes.values, attached['Crew on board'].values):
+        assert not array.flags.writeable
+    assert isinstance(attached['Crew on board'].values.base, np.memmap)
+
+
+def test_new_version_replaces_the_old_snapshot(tmp_path):
+    """Test that publishing a new version of a dataset removes the snapshot of the previous one."""
+    folder = str(tmp_path)
+    shared_dataset(folder, 'crashes.csv', 'v1', sample_data)
+    shared_dataset(folder, 'crashes.csv', 'v2', sample_data)
+    assert not os.path.exists(snapshot_path(folder, 'crashes.csv', 'v1'))
+    assert os.path.exists(snapshot_path(folder, 'crashes.csv', 'v2'))
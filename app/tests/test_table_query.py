@@ -0,0 +1,57 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.datastore import get_dataset, PROCESSED_DATA
+from pages.table_query import split_filter_part, query_page, page_count
+
+
+def test_split_filter_part():
+    """Test parsing of DataTable filter expressions."""
+    assert split_filter_part('{Country} contains "Peru"') == ('Country', 'contains', 'Peru')
+    assert split_filter_part('{Total fatalities} > 10') == ('Total fatalities', 'gt', 10.0)
+    assert split_filter_part('{Date} datestartswith 1998') == ('Date', 'datestartswith', 1998.0)
+
+
+def test_query_page_matches_pandas():
+    """Test that server-side filtering, sorting and paging agree with plain pandas."""
+    data = get_dataset(PROCESSED_DATA)
+    query = '{Region} = "Europe" && {Total fatalities} >= 50 && {Date} datestartswith "1972"'
+    sort_by = [{'column_id': 'Total fatalities', 'direction': 'desc'}]
+    page, total = query_page(data, 0, 20, query, sort_by)
+
+    expected = data[(data['Region'] == 'Europe') & (data['Total fatalities'] >= 50) & (data['Date'].dt.year == 1972)]
+    assert total == len(expected)
+    assert page['Total fatalities'].tolist() == \
+        expected['Total fatalities'].sort_values(ascending=False).head(20).tolist()
+
+
+def test_query_page_returns_one_page():
+    """Test that only the rows of the requested page are returned."""
+    data = get_dataset(PROCESSED_DATA)
+    page, total = query_page(data, 3, 20)
+    assert len(page) == 20
+    assert total == len(data)
+    assert page.index.tolist() == list(range(60, 80))
+    assert page_count(total, 20) == 1427
+
+
+def test_contains_unquoted_number():
+    """Test that an unquoted number in a contains filter matches its digits in text, date and integer columns."""
+    data = get_dataset(PROCESSED_DATA)
+    for query, expected in [
+        ('{Aircraft} contains 747', data['Aircraft'].astype(str).str.contains('747', regex=False)),
+        ('{Date} contains 1950', data['Date'].dt.strftime('%Y-%m-%d').str.contains('1950', regex=False)),
+        ('{Total fatalities} contains 5', data['Total fatalities'].astype(str).str.contains('5', regex=False)),
+    ]:
+        assert query_page(data, 0, 20, query)[1] == expected.sum() > 0, query
+
+
+def test_query_page_on_plain_csv_frame():
+    """Test filtering of string columns read without the dataset store."""
+    data = pd.DataFrame({'Operator': ['Aeroflot', 'Air France', None], 'Crew on board': ['3', '4', '5']})
+    page, total = query_page(data, 0, 20, '{Operator} contains "Aero" && {Crew on board} = 3')
+    assert total == 1
+    assert page['Operator'].tolist() == ['Aeroflot']
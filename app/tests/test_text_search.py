@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.datastore import PROCESSED_DATA
+from pages.table_query import query_page
+from pages.export import export_csv_url
+from pages.text_search import SEARCH_COLUMNS, normalize_text, search_rows, search_terms, text_index
+
+
+def test_search_terms_are_normalized_words():
+    """Test that queries are split on whitespace and stripped of punctuation and case."""
+    assert search_terms('  Douglas DC-3 ') == ['douglas', 'dc 3']
+    assert search_terms('Moscow - Paris') == ['moscow', 'paris']
+    assert normalize_text('Aérea del Perú') == 'aérea del perú'
+
+
+def test_search_finds_rows_containing_every_term():
+    """Test that a search selects the rows pandas finds by matching every term in any text column."""
+    search_index = text_index(PROCESSED_DATA)
+    rows = search_index.index.rows
+    positions = search_index.search('aeroflot tupolev')
+    texts = rows[SEARCH_COLUMNS].astype(str).apply(lambda column: column.map(normalize_text))
+    expected = np.ones(len(rows), dtype=bool)
+    for term in ('aeroflot', 'tupolev'):
+        expected &= texts.apply(lambda column: column.str.contains(term, regex=False)).any(axis=1).to_numpy()
+    assert sorted(positions.tolist()) == np.flatnonzero(expected).tolist()
+    assert len(search_index.search('qqqzzz')) == 0
+
+
+def test_search_ranks_whole_words_first():
+    """Test that rows matching a term as a whole word come before rows only containing it."""
+    search_index = text_index(PROCESSED_DATA)
+    aircraft = search_index.index.rows['Aircraft'].astype(str).map(normalize_text)
+    positions = search_index.search('douglas dc-3')
+    assert ' douglas dc 3 ' in f' {aircraft.iloc[positions[0]]} '
+    assert set(positions.tolist()) >= set(np.flatnonzero((aircraft == 'douglas dc 3').to_numpy()).tolist())
+
+
+def test_table_page_keeps_search_order_and_filters():
+    """Test that the DataTable query pages through ranked search results and applies its filter to them."""
+    search_index = text_index(PROCESSED_DATA)
+    index = search_index.index
+    positions = search_index.search('douglas')
+    page, total = query_page(index.rows, 0, 20, None, None, index, positions)
+    assert total == len(positions)
+    assert page.index.tolist() == positions[:20].tolist()
+    page, total = query_page(index.rows, 0, 20, '{Region} = "Europe"', None, index, positions)
+    assert 0 < total < len(positions)
+    assert (page['Region'] == 'Europe').all()
+
+
+def test_punctuation_only_search_keeps_every_row():
+    """Test that a search without terms does not filter the table or the export."""
+    index, positions = search_rows(PROCESSED_DATA, ' - ')
+    assert positions is None
+    assert query_page(index.rows, 0, 20, None, None, index, positions)[1] == len(index.rows)
+    assert export_csv_url('processed', search=' - ') == '/export/processed.csv'
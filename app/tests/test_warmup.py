@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pages.warmup import warm_up, WARMUP_MODULES
+
+SRC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+HEAVY_MODULES = ['scipy', 'statsmodels', 'joblib', 'plotly.express', 'plotly.subplots', 'pypdf', 'reportlab']
+
+
+def test_app_starts_without_heavy_libraries():
+    """Test that starting the app neither imports the libraries pages use on demand nor loads datasets."""
+    code = ('import sys, app; from pages import datastore; '
+            f'print([name for name in {HEAVY_MODULES!r} if name in sys.modules], len(datastore._datasets))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_FOLDER, capture_output=True, text=True, check=True)
+    assert result.stdout.split('\n')[-2] == '[] 0'
+
+
+def test_warm_up_imports_modules_and_loads_datasets():
+    """Test that the warm-up imports the deferred libraries, loads the datasets and skips missing files."""
+    timings = warm_up(datasets=['crashes-processed.csv', 'missing.csv'])
+    for name in WARMUP_MODULES:
+        assert name in sys.modules
+    assert sorted(timings) == sorted(WARMUP_MODULES + ['crashes-processed.csv'])